@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+🎟️ 9 Rocks Tours - Teste de contenção das reservas exclusivas
+
+Muitos clientes a reservar as mesmas datas populares ao mesmo tempo (só um
+por data pode ganhar). Compara as duas formas de tomar a data
+'{tour_id}_{data}':
+  - "antes": transação que lê o documento e escreve se não existir; sob
+    contenção o commit é abortado e a transação repete (até 5 tentativas)
+  - "depois": create() do documento de vaga (booking_slots) com a pré-condição
+    "não pode existir", uma só ida ao Firestore; quem perde recebe
+    AlreadyExists (409)
+
+Sem argumentos corre em memória, simulando o round trip e os conflitos.
+Com --firestore usa o cliente real (ex.: com FIRESTORE_EMULATOR_HOST definido)
+numa coleção descartável:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_booking_contention.py --firestore
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from google.api_core.exceptions import Aborted, AlreadyExists
+
+# Tentativas de uma transação no SDK (google.cloud.firestore, MAX_ATTEMPTS)
+MAX_ATTEMPTS = 5
+
+
+class SimulatedStore:
+    """Documentos em memória com versões: um commit falha se o que leu mudou entretanto"""
+
+    def __init__(self, round_trip_seconds: float, rng: random.Random):
+        self.round_trip_seconds = round_trip_seconds
+        self.rng = rng
+        self.docs = {}
+        self.round_trips = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        # Latência com alguma variação, como na rede real
+        await asyncio.sleep(self.round_trip_seconds * self.rng.uniform(0.8, 1.2))
+
+    async def read(self, doc_id: str):
+        await self._round_trip()
+        return self.docs.get(doc_id, (0, None))
+
+    async def commit_if_unchanged(self, doc_id: str, read_version: int, data):
+        await self._round_trip()
+        version, _ = self.docs.get(doc_id, (0, None))
+        if version != read_version:
+            raise Aborted("Transação em conflito")
+        self.docs[doc_id] = (version + 1, data)
+
+    async def create(self, doc_id: str, data):
+        await self._round_trip()
+        if doc_id in self.docs:
+            raise AlreadyExists("Documento já existe")
+        self.docs[doc_id] = (1, data)
+
+
+async def book_transaction_simulated(store: SimulatedStore, doc_id: str, data, stats):
+    """Ler e escrever numa transação, repetindo com backoff como o SDK"""
+    for attempt in range(MAX_ATTEMPTS):
+        version, existing = await store.read(doc_id)
+        if existing is not None:
+            return False
+        try:
+            await store.commit_if_unchanged(doc_id, version, data)
+            return True
+        except Aborted:
+            stats["retries"] += 1
+            await asyncio.sleep(min(0.001 * 2 ** attempt, 0.05) * store.rng.random())
+    raise Aborted("Transação abortada depois de todas as tentativas")
+
+
+async def book_create_simulated(store: SimulatedStore, doc_id: str, data, stats):
+    try:
+        await store.create(doc_id, data)
+        return True
+    except AlreadyExists:
+        return False
+
+
+def firestore_bookers(client):
+    """As duas formas de reservar sobre o Firestore real/emulador"""
+    from google.cloud import firestore
+
+    @firestore.async_transactional
+    async def create_in_transaction(transaction, doc_ref, data):
+        snapshot = await doc_ref.get(transaction=transaction)
+        if snapshot.exists:
+            return False
+        transaction.set(doc_ref, data)
+        return True
+
+    async def book_transaction(collection, doc_id, data, stats):
+        return await create_in_transaction(client.transaction(), collection.document(doc_id), data)
+
+    async def book_create(collection, doc_id, data, stats):
+        try:
+            await collection.document(doc_id).create(data)
+            return True
+        except AlreadyExists:
+            return False
+
+    return book_transaction, book_create
+
+
+async def run_burst(target, book, requests):
+    """Todos os pedidos ao mesmo tempo; devolve latências, sucessos, 409 e erros"""
+    stats = {"retries": 0, "created": 0, "conflicts": 0, "errors": 0, "latencies": []}
+    started = time.perf_counter()
+
+    async def one_booking(doc_id):
+        request_started = time.perf_counter()
+        try:
+            if await book(target, doc_id, {"selected_date": doc_id, "requested_at": time.time()}, stats):
+                stats["created"] += 1
+            else:
+                stats["conflicts"] += 1
+        except Exception:
+            stats["errors"] += 1
+        stats["latencies"].append(time.perf_counter() - request_started)
+
+    await asyncio.gather(*(one_booking(doc_id) for doc_id in requests))
+    stats["wall"] = time.perf_counter() - started
+    return stats
+
+
+def report(label: str, stats, expected_winners: int, round_trips=None):
+    ordered = sorted(stats["latencies"])
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    correct = stats["created"] == expected_winners
+    extra = f"   idas ao Firestore={round_trips}" if round_trips is not None else ""
+    print(f"   {label:<22} p50={statistics.median(ordered) * 1000:7.1f} ms   p95={p95 * 1000:7.1f} ms   "
+          f"max={ordered[-1] * 1000:7.1f} ms   total={stats['wall'] * 1000:7.1f} ms")
+    print(f"   {'':<22} criadas={stats['created']}/{expected_winners} {'✅' if correct else '❌'}   "
+          f"409={stats['conflicts']}   erros={stats['errors']}   repetições={stats['retries']}{extra}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Teste de contenção das reservas exclusivas")
+    parser.add_argument("--requests", type=int, default=200, help="Pedidos simultâneos")
+    parser.add_argument("--dates", type=int, default=5, help="Datas disputadas (um vencedor por data)")
+    parser.add_argument("--round-trip-ms", type=float, default=20.0, help="Latência simulada do Firestore")
+    parser.add_argument("--firestore", action="store_true", help="Usar o Firestore real/emulador")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    dates = [f"benchmark_{run_id}_2030-01-{day + 1:02d}" for day in range(args.dates)]
+    rng = random.Random(42)
+    requests = [rng.choice(dates) for _ in range(args.requests)]
+
+    print("=" * 60)
+    print(f"🎟️ TESTE: {args.requests} reservas simultâneas em {args.dates} datas")
+    print("=" * 60)
+
+    if args.firestore:
+        from google.cloud import firestore
+        client = firestore.AsyncClient()
+        book_transaction, book_create = firestore_bookers(client)
+        for label, book in (("antes (transação)", book_transaction), ("depois (create)", book_create)):
+            collection = client.collection(f"benchmark_bookings_{uuid.uuid4().hex[:8]}")
+            stats = await run_burst(collection, book, requests)
+            report(label, stats, args.dates)
+            async for doc in collection.stream():
+                await doc.reference.delete()
+        return
+
+    for label, book in (("antes (transação)", book_transaction_simulated),
+                        ("depois (create)", book_create_simulated)):
+        store = SimulatedStore(args.round_trip_ms / 1000, random.Random(7))
+        stats = await run_burst(store, book, requests)
+        report(label, stats, args.dates, store.round_trips)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
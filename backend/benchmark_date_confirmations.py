@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+🔒 9 Rocks Tours - Teste de concorrência das confirmações de datas
+
+N pagamentos do mesmo tour confirmados ao mesmo tempo, cada um com uma data
+diferente. Compara os dois caminhos de escrita de occupied_dates:
+  - "antes": ler o tour, acrescentar a data em Python e escrever a lista inteira
+  - "depois": uma única escrita com ArrayUnion, sem leitura prévia
+
+Sem argumentos corre em memória, simulando o round trip ao Firestore.
+Com --firestore usa o cliente real (ex.: com FIRESTORE_EMULATOR_HOST definido)
+numa coleção descartável:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_date_confirmations.py --firestore
+"""
+
+import argparse
+import asyncio
+import copy
+import statistics
+import time
+from datetime import date, timedelta
+
+from google.cloud.firestore_v1.transforms import ArrayRemove, ArrayUnion
+
+
+class SimulatedDocument:
+    """Documento em memória com a latência de um round trip por operação"""
+
+    def __init__(self, round_trip_seconds: float):
+        self.round_trip_seconds = round_trip_seconds
+        self.data = {"occupied_dates": []}
+
+    async def get(self):
+        await asyncio.sleep(self.round_trip_seconds / 2)
+        snapshot = copy.deepcopy(self.data)
+        await asyncio.sleep(self.round_trip_seconds / 2)
+        return snapshot
+
+    async def update(self, fields):
+        await asyncio.sleep(self.round_trip_seconds / 2)
+        # As transformações são aplicadas no servidor, no momento do commit
+        for key, value in fields.items():
+            if isinstance(value, ArrayUnion):
+                current = self.data.setdefault(key, [])
+                current.extend(item for item in value.values if item not in current)
+            elif isinstance(value, ArrayRemove):
+                self.data[key] = [item for item in self.data.get(key, []) if item not in value.values]
+            else:
+                self.data[key] = copy.deepcopy(value)
+        await asyncio.sleep(self.round_trip_seconds / 2)
+
+
+class FirestoreDocument:
+    """Mesmo contrato que SimulatedDocument, sobre um documento real"""
+
+    def __init__(self, doc_ref):
+        self.doc_ref = doc_ref
+
+    async def get(self):
+        snapshot = await self.doc_ref.get()
+        return snapshot.to_dict() or {}
+
+    async def update(self, fields):
+        await self.doc_ref.update(fields)
+
+    async def occupied_dates(self):
+        return (await self.get()).get("occupied_dates", [])
+
+
+async def confirm_read_modify_write(doc, selected_date: str):
+    data = await doc.get()
+    occupied_dates = data.get("occupied_dates", [])
+    if selected_date not in occupied_dates:
+        occupied_dates.append(selected_date)
+        await doc.update({"occupied_dates": occupied_dates})
+
+
+async def confirm_array_union(doc, selected_date: str):
+    await doc.update({"occupied_dates": ArrayUnion([selected_date])})
+
+
+async def run_burst(doc, confirm, dates):
+    started = time.perf_counter()
+
+    async def one_confirmation(selected_date):
+        await confirm(doc, selected_date)
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(one_confirmation(selected_date) for selected_date in dates))
+
+
+def report(label: str, latencies, stored_dates, expected):
+    ordered = sorted(latencies)
+    lost = len(set(expected) - set(stored_dates))
+    print(f"   {label:<20} p50={statistics.median(ordered) * 1000:7.1f} ms   "
+          f"max={ordered[-1] * 1000:7.1f} ms   datas guardadas={len(set(stored_dates))}/{len(expected)}   "
+          f"{'✅ nenhuma perdida' if lost == 0 else f'❌ {lost} perdidas'}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Teste de concorrência das confirmações de datas")
+    parser.add_argument("--confirmations", type=int, default=50)
+    parser.add_argument("--round-trip-ms", type=float, default=20.0, help="Latência simulada do Firestore")
+    parser.add_argument("--firestore", action="store_true", help="Usar o Firestore real/emulador")
+    args = parser.parse_args()
+
+    dates = [(date(2030, 1, 1) + timedelta(days=offset)).isoformat() for offset in range(args.confirmations)]
+
+    print("=" * 60)
+    print(f"🔒 TESTE: {args.confirmations} confirmações simultâneas no mesmo tour")
+    print("=" * 60)
+
+    if args.firestore:
+        from google.cloud import firestore
+        client = firestore.AsyncClient()
+        collection = client.collection("benchmark_tours")
+        for label, confirm in (("antes (ler+escrever)", confirm_read_modify_write),
+                               ("depois (ArrayUnion)", confirm_array_union)):
+            doc_ref = collection.document()
+            await doc_ref.set({"occupied_dates": []})
+            doc = FirestoreDocument(doc_ref)
+            latencies = await run_burst(doc, confirm, dates)
+            report(label, latencies, await doc.occupied_dates(), dates)
+            await doc_ref.delete()
+        return
+
+    for label, confirm in (("antes (ler+escrever)", confirm_read_modify_write),
+                           ("depois (ArrayUnion)", confirm_array_union)):
+        doc = SimulatedDocument(args.round_trip_ms / 1000)
+        latencies = await run_burst(doc, confirm, dates)
+        report(label, latencies, doc.data["occupied_dates"], dates)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
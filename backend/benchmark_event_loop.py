@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+⏱️ 9 Rocks Tours - Benchmark de concorrência do event loop
+
+Mede a latência (p50/p99) de N pedidos concorrentes a uma rota async que lê
+um tour diretamente do Firestore (sem o cache do catálogo), em dois cenários:
+  - "antes": a rota chama o cliente Firestore síncrono (bloqueia o loop)
+  - "depois": a rota usa o cliente assíncrono (AsyncClient)
+
+As duas rotas fazem a mesma leitura (collection('tours').document(id).get());
+só muda o cliente.
+
+Sem argumentos usa clientes simulados com a latência de um round trip real
+(mediana --round-trip-ms, cauda log-normal com alguns pedidos bem mais lentos).
+Com --firestore usa os clientes reais (ex.: com FIRESTORE_EMULATOR_HOST
+definido), lendo um tour criado numa coleção descartável:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_event_loop.py --firestore
+Com --url mede um servidor real numa rota que lê o Firestore (ex.: antes/depois de um deploy):
+    python benchmark_event_loop.py --url http://localhost:8000/api/bookings/check-date-availability/TOUR_ID/2030-01-01
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+
+# Dispersão da latência simulada (log-normal): p99 ≈ 3x a mediana
+LATENCY_SIGMA = 0.5
+
+
+class SimulatedSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class SimulatedDocument:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.id = path.rsplit("/", 1)[-1]
+        self._path = path
+
+    def get(self):
+        return self._client._read(self._path, self.id)
+
+
+class SimulatedCollection:
+    def __init__(self, client, name: str):
+        self._client = client
+        self._name = name
+
+    def document(self, doc_id: str):
+        return SimulatedDocument(self._client, f"{self._name}/{doc_id}")
+
+
+class SimulatedClient:
+    """Firestore em memória com latência de rede; o síncrono bloqueia como o SDK síncrono"""
+
+    def __init__(self, docs, round_trip_seconds: float, rng: random.Random):
+        self.docs = docs
+        self.round_trip_seconds = round_trip_seconds
+        self.rng = rng
+        self.round_trips = 0
+
+    def collection(self, name: str):
+        return SimulatedCollection(self, name)
+
+    def _latency(self) -> float:
+        self.round_trips += 1
+        return self.round_trip_seconds * self.rng.lognormvariate(0, LATENCY_SIGMA)
+
+    def _read(self, path: str, doc_id: str):
+        time.sleep(self._latency())
+        return SimulatedSnapshot(doc_id, self.docs.get(path))
+
+
+class SimulatedAsyncClient(SimulatedClient):
+    async def _read_async(self, path: str, doc_id: str):
+        await asyncio.sleep(self._latency())
+        return SimulatedSnapshot(doc_id, self.docs.get(path))
+
+    def _read(self, path: str, doc_id: str):
+        return self._read_async(path, doc_id)
+
+
+def build_app(sync_client, async_client, collection: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync-client/{tour_id}")
+    async def sync_client_route(tour_id: str):
+        # Como as rotas antes da mudança: cliente síncrono dentro de uma rota async
+        doc = sync_client.collection(collection).document(tour_id).get()
+        return {"id": doc.id, "exists": doc.exists}
+
+    @app.get("/async-client/{tour_id}")
+    async def async_client_route(tour_id: str):
+        # Como as rotas agora: await async_db.collection(...).document(...).get()
+        doc = await async_client.collection(collection).document(tour_id).get()
+        return {"id": doc.id, "exists": doc.exists}
+
+    return app
+
+
+async def run_burst(client: httpx.AsyncClient, url: str, concurrency: int):
+    # Todos os pedidos chegam ao mesmo tempo: a latência conta desde o início da rajada
+    started = time.perf_counter()
+
+    async def one_request():
+        response = await client.get(url)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(one_request() for _ in range(concurrency)))
+
+
+def summarize(label: str, latencies, round_trips=None):
+    ordered = sorted(latencies)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    extra = f"   idas ao Firestore={round_trips}" if round_trips is not None else ""
+    print(f"   {label:<14} p50={statistics.median(ordered) * 1000:8.1f} ms   "
+          f"p99={p99 * 1000:8.1f} ms   max={ordered[-1] * 1000:8.1f} ms{extra}")
+
+
+async def compare(sync_client, async_client, collection: str, tour_id: str, concurrency: int, simulated: bool):
+    app = build_app(sync_client, async_client, collection)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for label, path, db_client in (("antes (sync)", "sync-client", sync_client),
+                                       ("depois (async)", "async-client", async_client)):
+            latencies = await run_burst(client, f"/{path}/{tour_id}", concurrency)
+            summarize(label, latencies, db_client.round_trips if simulated else None)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência do event loop")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--round-trip-ms", type=float, default=20.0, help="Latência mediana simulada do Firestore")
+    parser.add_argument("--firestore", action="store_true", help="Usar os clientes Firestore reais/emulador")
+    parser.add_argument("--url", help="Medir um servidor real em vez da simulação")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⏱️  BENCHMARK: {args.concurrency} pedidos concorrentes")
+    print("=" * 60)
+
+    if args.url:
+        async with httpx.AsyncClient(timeout=120) as client:
+            summarize("servidor", await run_burst(client, args.url, args.concurrency))
+        return
+
+    tour_id = "benchmark-tour"
+    tour = {"name": {"pt": "Tour de teste"}, "active": True, "price": 50}
+
+    if args.firestore:
+        from google.cloud import firestore
+        sync_client, async_client = firestore.Client(), firestore.AsyncClient()
+        collection = f"benchmark_tours_{uuid.uuid4().hex[:8]}"
+        doc_ref = sync_client.collection(collection).document(tour_id)
+        doc_ref.set(tour)
+        try:
+            await compare(sync_client, async_client, collection, tour_id, args.concurrency, simulated=False)
+        finally:
+            doc_ref.delete()
+        return
+
+    docs = {f"tours/{tour_id}": tour}
+    round_trip = args.round_trip_ms / 1000
+    await compare(SimulatedClient(docs, round_trip, random.Random(7)),
+                  SimulatedAsyncClient(docs, round_trip, random.Random(7)),
+                  "tours", tour_id, args.concurrency, simulated=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
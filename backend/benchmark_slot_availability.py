@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+🕘 9 Rocks Tours - Benchmark do motor de horários livres
+
+Um ano de disponibilidade para vários tours, com um calendário denso,
+calculado de duas formas:
+  - "antes": dia a dia, strptime por horário e comparação com todos os
+    eventos do dia (o algoritmo antigo de get_available_dates_for_tour)
+  - "depois": intervalos ordenados e fundidos uma vez + varrimento único
+    (utils/slot_availability)
+
+Tudo em memória, sem Google Calendar:
+    python benchmark_slot_availability.py --tours 50 --events-per-day 6
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from utils.slot_availability import BusyIntervals, WEEKDAYS, available_slots_for_tours
+
+
+def legacy_available_dates(tour_schedule, busy_slots, start_date, end_date):
+    """Algoritmo anterior (um horário por dia), para comparação"""
+    available_dates = []
+    busy_dict = {}
+    for slot in busy_slots:
+        busy_dict.setdefault(slot['start'].strftime('%Y-%m-%d'), []).append(slot)
+
+    current_date = datetime.strptime(start_date, '%Y-%m-%d')
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+    while current_date <= end_dt:
+        date_str = current_date.strftime('%Y-%m-%d')
+        weekday = WEEKDAYS[current_date.weekday()]
+        if tour_schedule.get(weekday, {}).get('active', False):
+            tour_start = tour_schedule[weekday]['start']
+            tour_end = tour_schedule[weekday]['end']
+            tour_start_dt = datetime.strptime(f"{date_str} {tour_start}", '%Y-%m-%d %H:%M')
+            tour_end_dt = datetime.strptime(f"{date_str} {tour_end}", '%Y-%m-%d %H:%M')
+            is_available = True
+            for busy_slot in busy_dict.get(date_str, []):
+                if not (tour_end_dt <= busy_slot['start'] or tour_start_dt >= busy_slot['end']):
+                    is_available = False
+                    break
+            if is_available:
+                available_dates.append({'date': date_str, 'start_time': tour_start, 'end_time': tour_end})
+        current_date += timedelta(days=1)
+    return available_dates
+
+
+def random_calendar(rng, start, days, events_per_day):
+    slots = []
+    for offset in range(days):
+        day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+        for _ in range(rng.randint(0, events_per_day * 2)):
+            begin = day + timedelta(minutes=rng.randrange(6 * 60, 20 * 60, 15))
+            slots.append({'start': begin, 'end': begin + timedelta(minutes=rng.choice((30, 60, 90, 120))),
+                          'summary': 'Ocupado'})
+    return slots
+
+
+def random_schedule(rng, slots_per_day):
+    schedule = {}
+    for name in WEEKDAYS:
+        if rng.random() < 0.25:
+            schedule[name] = {'active': False}
+            continue
+        first = rng.randrange(7, 10)
+        slots = [{'start': f"{first + 3 * index:02d}:00", 'end': f"{first + 3 * index + 2:02d}:30"}
+                 for index in range(slots_per_day)]
+        schedule[name] = ({'active': True, **slots[0]} if slots_per_day == 1
+                          else {'active': True, 'slots': slots})
+    return schedule
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de horários livres")
+    parser.add_argument("--tours", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--events-per-day", type=int, default=6, help="Média de eventos por dia no calendário")
+    parser.add_argument("--slots-per-day", type=int, default=3, help="Horários por dia da semana nos tours")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    start = date(2030, 1, 1)
+    end = start + timedelta(days=args.days - 1)
+    busy_slots = random_calendar(rng, start, args.days, args.events_per_day)
+
+    print("=" * 60)
+    print(f"🕘 BENCHMARK: {args.tours} tours × {args.days} dias, {len(busy_slots)} eventos no calendário")
+    print("=" * 60)
+
+    # Resultados iguais ao algoritmo antigo com um horário por dia
+    single = {f"tour-{index}": random_schedule(rng, 1) for index in range(args.tours)}
+    busy = BusyIntervals.from_slots(busy_slots)
+    engine = available_slots_for_tours(single, busy, start, end)
+    legacy = {tour_id: legacy_available_dates(schedule, busy_slots, start.isoformat(), end.isoformat())
+              for tour_id, schedule in single.items()}
+    print(f"   resultados iguais ao algoritmo antigo: {'✅' if engine == legacy else '❌'}")
+
+    legacy_ms, _ = timed(lambda: {
+        tour_id: legacy_available_dates(schedule, busy_slots, start.isoformat(), end.isoformat())
+        for tour_id, schedule in single.items()
+    }, args.repeat)
+    engine_ms, _ = timed(lambda: available_slots_for_tours(
+        single, BusyIntervals.from_slots(busy_slots), start, end), args.repeat)
+    print(f"   {'antes (1 horário/dia)':<28} {legacy_ms:9.1f} ms")
+    print(f"   {'depois (1 horário/dia)':<28} {engine_ms:9.1f} ms   ({legacy_ms / engine_ms:.0f}x)")
+
+    multi = {f"tour-{index}": random_schedule(rng, args.slots_per_day) for index in range(args.tours)}
+    index_ms, busy = timed(lambda: BusyIntervals.from_slots(busy_slots), args.repeat)
+    sweep_ms, result = timed(lambda: available_slots_for_tours(multi, busy, start, end), args.repeat)
+    total_slots = sum(len(slots) for slots in result.values())
+    print(f"   {f'depois ({args.slots_per_day} horários/dia)':<28} {sweep_ms:9.1f} ms   "
+          f"(+ {index_ms:.1f} ms a ordenar {len(busy_slots)} eventos em {len(busy)} intervalos; "
+          f"{total_slots} horários livres)")
+
+
+if __name__ == "__main__":
+    main()
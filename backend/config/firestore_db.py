@@ -1,8 +1,11 @@
 # config/firestore_db.py
 
+import os
 import firebase_admin
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 # ✅ CORREÇÃO CRÍTICA: Este ficheiro já não tenta inicializar a aplicação.
 # Ele assume que a inicialização já foi feita no main.py e apenas
@@ -24,15 +27,33 @@ try:
     # Estas linhas não causavam o erro e foram restauradas.
     tours_collection = db.collection("tours")
 
-    async def get_async_query(query):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: list(query.stream()))
-
-    __all__ = ["db", "tours_collection", "get_async_query"]
+    # Cliente assíncrono (google.cloud.firestore.AsyncClient): é este que as
+    # rotas async devem usar, para que um round trip lento ao Firestore não
+    # bloqueie o event loop do uvicorn.
+    async_db = firestore_async.client()
+    print("✅ Cliente Firestore assíncrono obtido com sucesso.")
 
 except Exception as e:
     print(f"❌ Erro ao obter o cliente Firestore: {e}")
     db = None
     tours_collection = None
-    __all__ = ["db"]
+    async_db = None
+
+# Executor limitado para o que só existe em versão síncrona (Storage,
+# listeners, SDKs de terceiros). Limitar as threads evita que um pico de
+# pedidos abra centenas de ligações em paralelo.
+db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FIRESTORE_EXECUTOR_WORKERS", "16")),
+    thread_name_prefix="firestore-sync"
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """Executar uma chamada síncrona no executor limitado, fora do event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+async def get_async_query(query):
+    return await run_blocking(lambda: list(query.stream()))
+
+__all__ = ["db", "async_db", "tours_collection", "get_async_query", "run_blocking", "db_executor"]
 
@@ -2,6 +2,7 @@
 # 📦 Importações de Módulos Essenciais
 # ============================================================================
 import os
+import asyncio
 import uvicorn
 import firebase_admin
 from fastapi import FastAPI
@@ -34,8 +35,12 @@ except Exception as e:
 # ============================================================================
 # 🚚 Importações dos Módulos da Aplicação (DEPOIS da inicialização)
 # ============================================================================
-from routers import tours_fixed, config_routes, booking_routes, payment_routes, admin_routes, hero_images_routes
+from routers import tours_fixed, config_routes, booking_routes, payment_routes, admin_routes, hero_images_routes, home_routes, availability_routes
 from services import paypal_service, stripe_service
+from services.tour_catalog import tour_catalog
+from routers.hero_images_routes import hero_images_cache
+from utils.google_calendar import calendar_cache
+from services.availability_prewarm import availability_prewarmer
 
 # ============================================================================
 # 🚀 Criação e Configuração da Aplicação FastAPI
@@ -70,6 +75,8 @@ app.include_router(tours_fixed.router, prefix=f"{api_prefix}/tours", tags=["Tour
 app.include_router(config_routes.router, prefix=f"{api_prefix}/config", tags=["Config"])
 app.include_router(booking_routes.router, prefix=f"{api_prefix}/bookings", tags=["Bookings"])
 app.include_router(hero_images_routes.router, prefix=f"{api_prefix}/hero-images", tags=["Hero Images"])
+app.include_router(home_routes.router, prefix=f"{api_prefix}/home", tags=["Home"])
+app.include_router(availability_routes.router, prefix=f"{api_prefix}/availability", tags=["Availability"])
 
 # As rotas de Admin e Pagamentos podem ser adicionadas aqui conforme necessário
 app.include_router(payment_routes.router, prefix=f"{api_prefix}/payments", tags=["Payments"])
@@ -78,6 +85,28 @@ app.include_router(admin_routes.router, prefix=f"{api_prefix}/admin", tags=["Adm
 
 print("✅ Todos os routers da API foram montados com sucesso.")
 
+# ============================================================================
+# 🗂️ Caches em Memória (listeners on_snapshot)
+# ============================================================================
+@app.on_event("startup")
+async def start_snapshot_caches():
+    # O primeiro snapshot é esperado fora do event loop para não bloquear o arranque
+    loop = asyncio.get_running_loop()
+    for cache in (tour_catalog, hero_images_cache):
+        loaded = await loop.run_in_executor(None, cache.start)
+        print(f"✅ Coleção '{cache.name}' em cache." if loaded else f"⚠️ Coleção '{cache.name}' ainda não carregada; a usar o Firestore diretamente.")
+    # O Google Calendar é sincronizado num thread próprio; os pedidos nunca esperam pela API
+    calendar_cache.start()
+    # Disponibilidade dos próximos dias pré-calculada em segundo plano
+    availability_prewarmer.start()
+
+@app.on_event("shutdown")
+async def stop_snapshot_caches():
+    tour_catalog.stop()
+    hero_images_cache.stop()
+    calendar_cache.stop()
+    availability_prewarmer.stop()
+
 # ============================================================================
 # ❤️ Endpoint de Verificação de Saúde
 # ============================================================================
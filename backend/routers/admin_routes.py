@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+from google.api_core.exceptions import NotFound
+from typing import Dict, Optional
 # CORRIGIDO: Importações absolutas
 from config.firestore_db import db as db_firestore
+from services.booking_rollups import load_rollups
+from services.booking_service import (
+    BookingRejected, backfill_booking_created_at, rebuild_booking_rollups, repair_occupied_dates, update_booking_status
+)
 from utils.auth import verify_firebase_token
 from models.booking import BookingStats  # Importa BookingStats do módulo de modelos
 from datetime import datetime, timedelta
 
-router = APIRouter(prefix="/api/admin", tags=["Admin & Debug"])
+# O prefixo é controlado pelo main.py (/api/admin)
+router = APIRouter(tags=["Admin & Debug"])
+
+class BookingStatusUpdate(BaseModel):
+    status: str
+    reason: Optional[str] = None
 
 # Debug Payment Methods
 @router.get("/debug/payment-methods")
@@ -28,28 +39,65 @@ async def sync_occupied_dates(user=Depends(verify_firebase_token)):
         raise HTTPException(401, "Autenticação necessária")
     
     try:
-        # Lógica completa de sync do server.py
-        sync_results = []  # Processa tours e bookings
-        # ... (copia do server.py para sync)
-        
-        return {"success": True, "results": sync_results}
+        # Reparação rara: o dia a dia é mantido pelas transições de estado das reservas
+        return await repair_occupied_dates()
     except Exception as e:
         raise HTTPException(500, str(e))
 
-# Outros admin endpoints (ex.: stats, export bookings)
-@router.get("/stats")
-async def get_booking_stats(user=Depends(verify_firebase_token)):
+# Backfill de created_at nas reservas V1 (a listagem paginada ordena por created_at)
+@router.post("/backfill-booking-created-at")
+async def backfill_created_at(user=Depends(verify_firebase_token)):
     if not user:
         raise HTTPException(401, "Autenticação necessária")
     
-    # Lógica para stats (ex.: count bookings, revenue)
-    # Exemplo de retorno de BookingStats (assumindo que você tem os dados para preencher)
-    # Para um exemplo real, você buscaria os dados do Firestore e os agregaria.
-    mock_stats = BookingStats(
-        total_bookings=100,
-        total_revenue=5000.00,
-        bookings_by_tour={"tour_a": 50, "tour_b": 30, "tour_c": 20},
-        bookings_by_date={"2024-07-01": 10, "2024-07-02": 15},
-        bookings_by_status={"confirmed": 80, "pending": 15, "cancelled": 5}
-    )
-    return mock_stats
+    try:
+        return await backfill_booking_created_at()
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+# Transição de estado de uma reserva (confirmed/completed ocupam a data, cancelled/refunded libertam-na)
+@router.post("/bookings/{booking_id}/status")
+async def set_booking_status(booking_id: str, update: BookingStatusUpdate, user=Depends(verify_firebase_token)):
+    if not user:
+        raise HTTPException(401, "Autenticação necessária")
+    
+    extra_fields = {"status_reason": update.reason} if update.reason else {}
+    try:
+        return await update_booking_status(booking_id, update.status, extra_fields)
+    except NotFound:
+        raise HTTPException(404, "Reserva não encontrada")
+    except BookingRejected as e:
+        raise HTTPException(e.status_code, e.detail)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+# Estatísticas das reservas a partir dos contadores de booking_rollups (nunca lê as reservas)
+@router.get("/stats", response_model=BookingStats)
+async def get_booking_stats(
+    start_date: Optional[str] = Query(None, description="Primeira data do tour (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Última data do tour (YYYY-MM-DD)"),
+    tour_id: Optional[str] = Query(None, description="Só este tour (sem intervalo de datas)"),
+    user=Depends(verify_firebase_token)
+):
+    if not user:
+        raise HTTPException(401, "Autenticação necessária")
+    
+    try:
+        return BookingStats(**await load_rollups(start_date, end_date, tour_id))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+# Reconstrução dos contadores (backfill; o dia a dia é incremental)
+@router.post("/stats/rebuild")
+async def rebuild_stats(user=Depends(verify_firebase_token)):
+    if not user:
+        raise HTTPException(401, "Autenticação necessária")
+    
+    try:
+        return await rebuild_booking_rollups()
+    except Exception as e:
+        raise HTTPException(500, str(e))
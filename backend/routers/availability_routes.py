@@ -0,0 +1,228 @@
+# backend/routers/availability_routes.py
+# Matriz de disponibilidade tours × dias numa só resposta, para o calendário
+# de reservas e para a vista geral do admin. Calculada a partir dos bitmaps
+# em memória (occupied_dates e available_dates do catálogo em cache).
+# Os horários livres (availability_schedule × Google Calendar) vêm do motor de
+# intervalos em utils/slot_availability.
+#
+# Dentro do horizonte pré-calculado (services/availability_prewarm) os
+# endpoints só recortam o resultado guardado e indicam a sua idade; fora
+# dele calculam na hora.
+
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from config.firestore_db import async_db as db_firestore
+from services.availability_prewarm import age_seconds, availability_prewarmer, compute_tour_availability
+from services.tour_calendar import (AVAILABLE, MAX_CALENDAR_DAYS, NOT_OFFERED, OCCUPIED,
+                                    availability_row, calendar_bitmaps, tour_calendar)
+from services.tour_catalog import MAX_BATCH_SIZE, get_tours_by_ids, tour_catalog
+from utils.date_bitmap import parse_window
+from utils.google_calendar import calendar_cache, get_calendar_availability
+from utils.http_cache import conditional_response, make_etag
+from utils.tour_projection import parse_fields
+
+# O prefixo é controlado pelo main.py
+router = APIRouter()
+
+
+async def load_calendars(tour_ids: Optional[list]):
+    """{tour_id: (ocupadas, oferecidas)} do cache, ou do Firestore se o cache não estiver pronto"""
+    if tour_catalog.is_fresh():
+        if tour_ids is None:
+            tour_ids = [tour["id"] for tour in tour_catalog.list_tours(active_only=True)]
+        return {
+            tour_id: (tour_calendar.get(tour_id), tour_calendar.available(tour_id))
+            for tour_id in tour_ids if tour_calendar.get(tour_id) is not None
+        }
+
+    if tour_ids is None:
+        query = db_firestore.collection('tours').where('active', '==', True)
+        tours = [dict(doc.to_dict(), id=doc.id) async for doc in query.stream()]
+    else:
+        tours = [tour for tour in (await get_tours_by_ids(tour_ids)).values() if tour]
+    return {tour["id"]: calendar_bitmaps(tour) for tour in tours}
+
+
+async def load_tours(tour_ids: Optional[list]):
+    """Tours pedidos (ou todos os ativos) do cache, ou do Firestore se o cache não estiver pronto"""
+    if tour_ids is None:
+        if tour_catalog.is_fresh():
+            return tour_catalog.list_tours(active_only=True)
+        query = db_firestore.collection('tours').where('active', '==', True)
+        return [dict(doc.to_dict(), id=doc.id) async for doc in query.stream()]
+    return [tour for tour in (await get_tours_by_ids(tour_ids)).values() if tour]
+
+
+def prewarmed_availability(tour_ids: Optional[list], first_day: date, last_day: date) -> Optional[Dict[str, Any]]:
+    """{tour_id: resultado pré-calculado}, ou None se a janela ou algum tour não estiver pré-calculado"""
+    if not tour_catalog.is_fresh() or not availability_prewarmer.covers(first_day, last_day):
+        return None
+    if tour_ids is None:
+        tour_ids = [tour["id"] for tour in tour_catalog.list_tours(active_only=True)]
+    results = {}
+    for tour_id in tour_ids:
+        if tour_catalog.get(tour_id) is None:
+            continue  # Inexistente: vai para "missing"
+        result = availability_prewarmer.get(tour_id, first_day, last_day)
+        if result is None:
+            return None
+        results[tour_id] = result
+    return results
+
+
+async def load_availability(tour_ids: Optional[list], first_day: date, last_day: date):
+    """({tour_id: resultado}, pré-calculado?) com datas reserváveis e horários livres"""
+    results = prewarmed_availability(tour_ids, first_day, last_day)
+    if results is not None:
+        return results, True
+
+    tours = await load_tours(tour_ids)
+    busy = calendar_cache.busy_intervals()
+    calendar_dates = get_calendar_availability(first_day.isoformat(), last_day.isoformat(), cache=calendar_cache)
+    return {
+        tour["id"]: compute_tour_availability(tour, busy, calendar_dates, first_day, last_day)
+        for tour in tours
+    }, False
+
+
+def freshness(results: Dict[str, Any], precomputed: bool) -> Dict[str, Any]:
+    """Idade do resultado mais antigo da resposta"""
+    computed_at = min((result["computed_at"] for result in results.values()), default=time.time())
+    return {
+        "precomputed": precomputed,
+        "computed_at": datetime.fromtimestamp(computed_at, tz=timezone.utc).isoformat(),
+        "age_seconds": age_seconds(computed_at),
+    }
+
+
+@router.get("/", summary="Matriz de disponibilidade de vários tours")
+async def get_availability_matrix(
+    request: Request,
+    response: Response,
+    from_date: Optional[str] = Query(None, alias="from", description="Primeiro dia (YYYY-MM-DD); hoje por omissão"),
+    to_date: Optional[str] = Query(None, alias="to", description="Último dia (YYYY-MM-DD); from + 30 dias por omissão"),
+    tour_ids: Optional[str] = Query(None, description="Ids separados por vírgulas; todos os tours ativos por omissão"),
+):
+    """📅 DISPONIBILIDADE TOURS × DIAS
+
+    Cada tour tem uma string com um carácter por dia da janela:
+    A = disponível, O = ocupado, X = fora das available_dates do tour.
+    Ids inexistentes vêm em "missing".
+    """
+    first_day, last_day = parse_window(from_date, to_date, MAX_CALENDAR_DAYS)
+    requested = list(dict.fromkeys(parse_fields(tour_ids) or [])) or None
+    if requested and len(requested) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} tours por pedido")
+
+    try:
+        if tour_catalog.is_fresh():
+            digest, _ = tour_catalog.fingerprint()
+            etag = make_etag("availability", digest, first_day, last_day, requested)
+            not_modified = conditional_response(request, response, etag, "occupied_dates")
+            if not_modified:
+                return not_modified
+
+        results = prewarmed_availability(requested, first_day, last_day)
+        if results is not None:
+            rows = {tour_id: result["row"] for tour_id, result in sorted(results.items())}
+        else:
+            calendars = await load_calendars(requested)
+            rows = {
+                tour_id: availability_row(occupied, available, first_day, last_day)
+                for tour_id, (occupied, available) in sorted(calendars.items())
+            }
+
+        print(f"✅ Matriz de disponibilidade: {len(rows)} tours × {(last_day - first_day).days + 1} dias")
+        return {
+            "from": first_day.isoformat(),
+            "to": last_day.isoformat(),
+            "days": (last_day - first_day).days + 1,
+            "legend": {AVAILABLE: "available", OCCUPIED: "occupied", NOT_OFFERED: "not_offered"},
+            "tours": rows,
+            "missing": [tour_id for tour_id in requested or [] if tour_id not in rows],
+            **freshness(results or {}, results is not None),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao calcular a matriz de disponibilidade: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/slots", summary="Horários livres de vários tours")
+async def get_available_slots(
+    from_date: Optional[str] = Query(None, alias="from", description="Primeiro dia (YYYY-MM-DD); hoje por omissão"),
+    to_date: Optional[str] = Query(None, alias="to", description="Último dia (YYYY-MM-DD); from + 30 dias por omissão"),
+    tour_ids: Optional[str] = Query(None, description="Ids separados por vírgulas; todos os tours ativos por omissão"),
+):
+    """🕘 HORÁRIOS LIVRES (availability_schedule × GOOGLE CALENDAR)
+
+    Para cada tour com availability_schedule, os horários da semana que não
+    colidem com eventos do calendário nem caem em datas ocupadas. Tudo em
+    memória: o calendário vem do cache sincronizado em segundo plano. Ids
+    inexistentes ou sem availability_schedule vêm em "missing".
+    """
+    first_day, last_day = parse_window(from_date, to_date, MAX_CALENDAR_DAYS)
+    requested = list(dict.fromkeys(parse_fields(tour_ids) or [])) or None
+    if requested and len(requested) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} tours por pedido")
+
+    try:
+        results, precomputed = await load_availability(requested, first_day, last_day)
+        slots = {tour_id: result["slots"] for tour_id, result in sorted(results.items()) if result["scheduled"]}
+
+        print(f"✅ Horários livres: {len(slots)} tours × {(last_day - first_day).days + 1} dias")
+        return {
+            "from": first_day.isoformat(),
+            "to": last_day.isoformat(),
+            "calendar_synced": calendar_cache.is_fresh(),
+            "tours": slots,
+            "missing": [tour_id for tour_id in requested or [] if tour_id not in slots],
+            **freshness(results, precomputed),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao calcular os horários livres: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{tour_id}/dates", summary="Datas reserváveis de um tour")
+async def get_bookable_dates(
+    tour_id: str,
+    from_date: Optional[str] = Query(None, alias="from", description="Primeiro dia (YYYY-MM-DD); hoje por omissão"),
+    to_date: Optional[str] = Query(None, alias="to", description="Último dia (YYYY-MM-DD); from + 30 dias por omissão"),
+):
+    """📆 DATAS RESERVÁVEIS DE UM TOUR
+
+    available_dates do tour (ou os dias livres do Google Calendar, se não as
+    tiver) menos as datas ocupadas, mais os horários livres de cada dia.
+    """
+    first_day, last_day = parse_window(from_date, to_date, MAX_CALENDAR_DAYS)
+    try:
+        results, precomputed = await load_availability([tour_id], first_day, last_day)
+        result = results.get(tour_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Tour não encontrado")
+
+        return {
+            "tour_id": tour_id,
+            "from": first_day.isoformat(),
+            "to": last_day.isoformat(),
+            "dates": result["dates"],
+            "slots": result["slots"],
+            "calendar_synced": calendar_cache.is_fresh(),
+            **freshness(results, precomputed),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao calcular as datas reserváveis de {tour_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
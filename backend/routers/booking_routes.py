@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timezone
-from typing import List
-from google.cloud import firestore
-from google.cloud.firestore_v1.client import Client
-from google.cloud.firestore_v1.transaction import Transaction
+from typing import Dict, List, Optional
 
 # Importação absoluta
-from config.firestore_db import db
+from services.aggregations import aggregation_cache
+from services.booking_service import BookingRejected, date_rejection, parse_selected_date, place_booking
+from services.capacity_service import capacity_id, get_capacity
+from services.tour_availability import booking_stats, load_months, load_tour_months, month_key, occupied_dates
+from services.tour_catalog import get_tours_by_ids
 
 # ✅ CORREÇÃO: O prefixo foi removido. Será controlado pelo main.py.
 router = APIRouter(
@@ -21,16 +22,15 @@ class BookingRequest(BaseModel):
     user_email: EmailStr
     num_participants: int
 
-@firestore.transactional
-def create_booking_in_transaction(transaction: Transaction, booking_ref: firestore.DocumentReference, booking_data: dict):
-    """
-    Executa a verificação e a escrita dentro de uma transação atómica do Firestore.
-    """
-    snapshot = booking_ref.get(transaction=transaction)
-    if snapshot.exists:
-        return False
-    transaction.set(booking_ref, booking_data)
-    return True
+class DateCheck(BaseModel):
+    tour_id: str
+    date: str
+
+class DateAvailabilityBatchRequest(BaseModel):
+    checks: List[DateCheck]
+
+# Limite de pares (tour_id, data) por verificação em lote (um mês para alguns tours)
+MAX_AVAILABILITY_CHECKS = 200
 
 def parse_booking_date(iso_string: str) -> datetime:
     """
@@ -56,94 +56,88 @@ def format_date_string(date_obj: datetime) -> str:
     return date_obj.strftime('%Y-%m-%d')
 
 @router.get("/occupied-dates/{tour_id}", response_model=dict[str, List[str]])
-async def get_occupied_dates(tour_id: str, db_client: Client = Depends(lambda: db)):
+async def get_occupied_dates(tour_id: str, month: Optional[str] = None):
     """
     Retorna uma lista de datas ('YYYY-MM-DD') que já estão reservadas.
+    Lê os documentos mensais de tour_availability (com month='YYYY-MM', um único documento).
     """
     try:
-        bookings_ref = db_client.collection("bookings")
-        query = bookings_ref.where("tourId", "==", tour_id)
-        docs = query.stream()
-        occupied_dates = set()
-        
-        for doc in docs:
-            booking = doc.to_dict()
-            date_value = booking.get('bookingDate') or booking.get('date') or booking.get('selected_date')
-            if date_value:
-                if isinstance(date_value, datetime):
-                    occupied_dates.add(format_date_string(date_value))
-                elif isinstance(date_value, str) and len(date_value) >= 10:
-                    occupied_dates.add(date_value[:10])
-        
-        occupied_dates_list = sorted(list(occupied_dates))
-        return {"occupied_dates": occupied_dates_list}
+        return {"occupied_dates": occupied_dates(await load_months(tour_id, month))}
     except Exception as e:
         print(f"❌ Erro ao buscar datas ocupadas para o tour {tour_id}: {e}")
         return {"occupied_dates": []}
 
 @router.post("/book-tour", status_code=201)
-async def book_tour(request: BookingRequest, db_client: Client = Depends(lambda: db)):
+async def book_tour(request: BookingRequest):
     """
-    Endpoint para criar uma nova reserva de forma segura e atómica.
+    Endpoint para criar uma nova reserva confirmada (adaptador do pipeline de booking_service).
     """
     try:
-        parsed_date = parse_booking_date(request.selected_date_iso)
-        date_str_ymd = format_date_string(parsed_date)
-        
-        booking_id = f"{request.tour_id}_{date_str_ymd}"
-        booking_ref = db_client.collection("bookings").document(booking_id)
-        
-        booking_data = {
-            "tourId": request.tour_id,
-            "bookingDate": parsed_date,
-            "dateString": date_str_ymd,
-            "userName": request.user_name,
-            "userEmail": request.user_email,
-            "numParticipants": request.num_participants,
-            "createdAt": firestore.SERVER_TIMESTAMP,
-            "status": "confirmed",
-            "originalDateInput": request.selected_date_iso,
-            "version": "2.0"
-        }
-
-        was_successful = create_booking_in_transaction(db_client.transaction(), booking_ref, booking_data)
-
-        if not was_successful:
-            raise HTTPException(
-                status_code=409, # Conflict
-                detail=f"Esta data ({date_str_ymd}) para o tour selecionado já está reservada."
-            )
-        
-        return {
-            "status": "success", 
-            "bookingId": booking_id,
+        date_str_ymd = format_date_string(parse_booking_date(request.selected_date_iso))
+        placed = await place_booking(
+            request.tour_id, date_str_ymd, request.num_participants,
+            {"name": request.user_name, "email": request.user_email},
+            confirm=True, source="v1"
+        )
+        response = {
+            "status": "success",
+            "bookingId": placed["booking"]["id"],
             "dateBooked": date_str_ymd,
             "message": f"Reserva confirmada para {date_str_ymd}"
         }
+        if placed["capacity"] is not None:
+            response["remainingSpots"] = placed["capacity"]["remaining"]
+        return response
+    except BookingRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
         print(f"❌ Erro inesperado ao criar reserva: {e}")
         raise HTTPException(status_code=500, detail="Ocorreu um erro interno no servidor.")
 
+@router.get("/capacity/{tour_id}/{date}")
+async def get_date_capacity(tour_id: str, date: str):
+    """
+    Lugares ocupados e livres de um tour numa data (soma dos contadores, sem ler reservas).
+    """
+    try:
+        tour = (await get_tours_by_ids([tour_id])).get(tour_id)
+        if tour is None:
+            raise HTTPException(status_code=404, detail="Tour não encontrado")
+        if not tour.get("max_participants"):
+            raise HTTPException(status_code=404, detail="Este tour não tem lotação definida")
+        return await get_capacity(tour_id, date, tour["max_participants"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao ler a lotação de {capacity_id(tour_id, date)}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+def date_check_result(tour_id: str, date: str, tour: Optional[dict], months_occupied) -> dict:
+    """Resultado de uma verificação com as mesmas regras de place_booking (date_rejection):
+    catálogo (occupied_dates, available_dates) e datas ocupadas em tour_availability"""
+    try:
+        rejection = date_rejection(tour, parse_selected_date(date), months_occupied)
+    except BookingRejected as e:
+        rejection = e
+    return {
+        "tour_id": tour_id,
+        "date": date,
+        "is_available": rejection is None,
+        "booking_id": f"{tour_id}_{date}" if rejection is not None and rejection.status_code == 409 else None
+    }
+
 @router.get("/check-date-availability/{tour_id}/{date}")
-async def check_date_availability(tour_id: str, date: str, db_client: Client = Depends(lambda: db)):
+async def check_date_availability(tour_id: str, date: str):
     """
     Verifica se uma data específica está disponível para um tour.
+    Tour do catálogo em memória e o documento do mês de tour_availability (um get_all).
     """
     try:
-        booking_id = f"{tour_id}_{date}"
-        booking_ref = db_client.collection("bookings").document(booking_id)
-        doc = booking_ref.get()
-        
-        is_available = not doc.exists
-        
-        return {
-            "tour_id": tour_id,
-            "date": date,
-            "is_available": is_available,
-            "booking_id": booking_id if not is_available else None
-        }
+        tour = (await get_tours_by_ids([tour_id])).get(tour_id)
+        months = await load_months(tour_id, month_key(date)) if tour else []
+        return date_check_result(tour_id, date, tour, set(occupied_dates(months)))
         
     except Exception as e:
         print(f"❌ Erro ao verificar disponibilidade da data: {e}")
@@ -154,39 +148,50 @@ async def check_date_availability(tour_id: str, date: str, db_client: Client = D
             "error": "Erro interno"
         }
 
-@router.get("/stats/{tour_id}")
-async def get_booking_stats(tour_id: str, db_client: Client = Depends(lambda: db)):
+@router.post("/check-date-availability")
+async def check_dates_availability(request: DateAvailabilityBatchRequest):
     """
-    Retorna estatísticas de reservas para um tour específico.
+    Verifica vários pares (tour_id, data) com as mesmas regras do endpoint GET:
+    tours do catálogo em memória e os documentos mensais de todos os pares num só get_all.
+    Devolve um mapa "{tour_id}_{data}" -> resultado, no formato do endpoint GET.
     """
+    if len(request.checks) > MAX_AVAILABILITY_CHECKS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_AVAILABILITY_CHECKS} verificações por pedido")
+
+    checks = {f"{check.tour_id}_{check.date}": check for check in request.checks}
     try:
-        bookings_ref = db_client.collection("bookings")
-        query = bookings_ref.where("tourId", "==", tour_id)
-        docs = query.stream()
-        
-        total_bookings = 0
-        total_participants = 0
-        dates_booked = set()
-        
-        for doc in docs:
-            booking = doc.to_dict()
-            total_bookings += 1
-            total_participants += booking.get("numParticipants", 0)
-            
-            date_value = booking.get('bookingDate') or booking.get('dateString')
-            if date_value:
-                if isinstance(date_value, datetime):
-                    dates_booked.add(format_date_string(date_value))
-                elif isinstance(date_value, str) and len(date_value) >= 10:
-                    dates_booked.add(date_value[:10])
-        
-        return {
-            "tour_id": tour_id,
-            "total_bookings": total_bookings,
-            "total_participants": total_participants,
-            "unique_dates_booked": len(dates_booked),
-            "dates_booked": sorted(list(dates_booked))
+        tours = await get_tours_by_ids(list(dict.fromkeys(check.tour_id for check in checks.values())))
+        months = await load_tour_months(
+            (check.tour_id, month_key(check.date)) for check in checks.values() if tours.get(check.tour_id)
+        )
+        occupied_by_tour: Dict[str, set] = {}
+        for month in months:
+            occupied_by_tour.setdefault(month["tour_id"], set()).update(occupied_dates([month]))
+
+        results = {
+            key: date_check_result(check.tour_id, check.date, tours.get(check.tour_id),
+                                   occupied_by_tour.get(check.tour_id, set()))
+            for key, check in checks.items()
         }
+        return {"results": results}
+        
+    except Exception as e:
+        print(f"❌ Erro ao verificar disponibilidade das datas: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+@router.get("/stats/{tour_id}")
+async def get_booking_stats(tour_id: str, month: Optional[str] = None):
+    """
+    Retorna estatísticas de reservas confirmadas para um tour específico.
+    Lê os documentos mensais de tour_availability em vez de percorrer as reservas,
+    com um cache curto à frente (aggregation_cache).
+    """
+    try:
+        months = await aggregation_cache.get(
+            ("booking_stats", tour_id, month),
+            lambda: load_months(tour_id, month)
+        )
+        return {"tour_id": tour_id, **booking_stats(months)}
         
     except Exception as e:
         print(f"❌ Erro ao buscar estatísticas: {e}")
@@ -1,24 +1,57 @@
 # backend/routers/config_routes.py
 # VERSÃO CORRIGIDA: Sem prefixo e com dados estáticos para garantir o funcionamento imediato.
 
-from fastapi import APIRouter
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Request, Response
+
+from services.tour_catalog import tour_catalog
+from services.tour_facets import tour_facets
+from utils.http_cache import conditional_response, make_etag
 
 # O prefixo foi REMOVIDO daqui. Ele será controlado pelo main.py.
 router = APIRouter()
 
+TOUR_FILTERS = [
+    {"key": "all", "labels": {"pt": "Todos os Tours", "en": "All Tours", "es": "Todos los Tours"}, "order": 0},
+    {"key": "cultural", "labels": {"pt": "Cultural", "en": "Cultural", "es": "Cultural"}, "order": 1},
+    {"key": "gastronomic", "labels": {"pt": "Gastronómico", "en": "Gastronomic", "es": "Gastronómico"}, "order": 2},
+    {"key": "adventure", "labels": {"pt": "Aventura", "en": "Adventure", "es": "Aventura"}, "order": 3},
+    {"key": "nature", "labels": {"pt": "Natureza", "en": "Nature", "es": "Naturaleza"}, "order": 4}
+]
+
+def build_tour_filters() -> List[Dict[str, Any]]:
+    """Filtros com o número de tours ativos de cada tipo (do catálogo em cache).
+
+    Tipos que existam no catálogo mas não na lista acima entram no fim;
+    sem cache devolve a lista estática sem contagens.
+    """
+    if not tour_catalog.is_fresh():
+        return TOUR_FILTERS
+
+    counts = tour_facets.type_counts()
+    filters = [
+        dict(tour_filter, count=len(tour_facets) if tour_filter["key"] == "all" else counts.get(tour_filter["key"], 0))
+        for tour_filter in TOUR_FILTERS
+    ]
+    known = {tour_filter["key"] for tour_filter in TOUR_FILTERS}
+    for position, tour_type in enumerate(sorted(set(counts) - known), start=len(TOUR_FILTERS)):
+        label = tour_facets.type_label(tour_type)
+        filters.append({"key": tour_type, "labels": {"pt": label, "en": label, "es": label},
+                        "order": position, "count": counts[tour_type]})
+    return filters
+
 @router.get("/tour-filters")
-async def get_tour_filters():
+async def get_tour_filters(request: Request, response: Response):
     """
     Retorna a lista de filtros de tour para o frontend.
-    Esta lógica é idêntica à do server.py original.
+    Cada filtro traz "count" com o número de tours ativos desse tipo.
     """
-    return [
-        {"key": "all", "labels": {"pt": "Todos os Tours", "en": "All Tours", "es": "Todos los Tours"}, "order": 0},
-        {"key": "cultural", "labels": {"pt": "Cultural", "en": "Cultural", "es": "Cultural"}, "order": 1},
-        {"key": "gastronomic", "labels": {"pt": "Gastronómico", "en": "Gastronomic", "es": "Gastronómico"}, "order": 2},
-        {"key": "adventure", "labels": {"pt": "Aventura", "en": "Adventure", "es": "Aventura"}, "order": 3},
-        {"key": "nature", "labels": {"pt": "Natureza", "en": "Nature", "es": "Naturaleza"}, "order": 4}
-    ]
+    filters = build_tour_filters()
+    not_modified = conditional_response(request, response, make_etag("tour_filters", filters), "tour_filters")
+    if not_modified:
+        return not_modified
+    return filters
 
 @router.get("/hero-images")
 async def get_hero_images():
@@ -1,7 +1,9 @@
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Body, Request, Response
 from firebase_admin import firestore, storage, auth
-from config.firestore_db import db as db_firestore
+from config.firestore_db import async_db as db_firestore, db as db_sync, run_blocking
+from services.snapshot_cache import SnapshotCache
+from utils.http_cache import conditional_response, make_etag
 import uuid
 import json
 from PIL import Image
@@ -9,37 +11,72 @@ import io
 
 router = APIRouter(tags=["Hero Images"])
 
+# Cache em memória da coleção hero_images (listener on_snapshot)
+hero_images_cache = SnapshotCache(db_sync.collection('hero_images') if db_sync else None, "hero_images")
+
 # Função de autenticação admin via header Authorization
 async def get_current_admin(authorization: str = Header(None)):
     try:
         if not authorization:
             raise HTTPException(401, "Token de autenticação não fornecido")
         token = authorization.split("Bearer ")[1] if "Bearer " in authorization else authorization
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await run_blocking(auth.verify_id_token, token)
         if not decoded_token.get('admin', False):
             raise HTTPException(403, "Permissão de administrador necessária")
         return decoded_token
     except Exception as e:
         raise HTTPException(401, f"Token inválido: {str(e)}")
 
+def compress_image(content: bytes) -> bytes:
+    img = Image.open(io.BytesIO(content))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+def upload_to_storage(storage_path: str, content: bytes) -> str:
+    bucket = storage.bucket()
+    blob = bucket.blob(storage_path)
+    blob.upload_from_string(content, content_type='image/jpeg')
+    blob.make_public()
+    return blob.public_url
+
+async def list_hero_images(active_only: bool = False):
+    """Hero images ordenadas por 'order' (do cache em memória, ou do Firestore)"""
+    # Como o order_by('order') do Firestore, só entram imagens com o campo 'order'
+    images = hero_images_cache.list(
+        lambda image: 'order' in image and (not active_only or image.get('active') is True)
+    )
+    if images is not None:
+        return sorted(images, key=lambda image: image['order'])
+
+    query = db_firestore.collection('hero_images')
+    if active_only:
+        query = query.where('active', '==', True)
+    query = query.order_by('order')
+    images = []
+    async for doc in query.stream():
+        data = doc.to_dict()
+        data['id'] = doc.id
+        images.append(data)
+    if not images and active_only:
+        print("⚠️ Nenhuma hero image ativa encontrada.")
+    else:
+        print(f"✅ Retornando {len(images)} hero images (active_only={active_only})")
+    return images
+
 @router.get("/")
-async def get_hero_images(active_only: bool = False):
+async def get_hero_images(request: Request, response: Response, active_only: bool = False):
     try:
-        query = db_firestore.collection('hero_images')
-        if active_only:
-            query = query.where('active', '==', True)
-        query = query.order_by('order')
-        docs = query.stream()
-        images = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            images.append(data)
-        if not images and active_only:
-            print("⚠️ Nenhuma hero image ativa encontrada.")
-        else:
-            print(f"✅ Retornando {len(images)} hero images (active_only={active_only})")
-        return images
+        if hero_images_cache.is_fresh():
+            digest, _ = hero_images_cache.fingerprint()
+            etag = make_etag("hero_images", digest, active_only)
+            not_modified = conditional_response(request, response, etag, "hero_images")
+            if not_modified:
+                return not_modified
+
+        return await list_hero_images(active_only)
     except Exception as e:
         print(f"❌ Erro ao buscar hero images: {e}")
         raise HTTPException(500, f"Erro ao buscar hero images: {str(e)}")
@@ -64,24 +101,15 @@ async def create_hero_image(
         if len(content) > 5 * 1024 * 1024:
             raise HTTPException(400, "Arquivo muito grande. Máximo 5MB.")
 
-        # Comprimir imagem
-        img = Image.open(io.BytesIO(content))
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True)
-        compressed_content = output.getvalue()
+        # Comprimir imagem (CPU) fora do event loop
+        compressed_content = await run_blocking(compress_image, content)
 
         # Gerar nome único para o arquivo
         filename = f"hero_{uuid.uuid4()}.jpg"
         storage_path = f"hero-images/{filename}"
 
         # Upload para Firebase Storage
-        bucket = storage.bucket()
-        blob = bucket.blob(storage_path)
-        blob.upload_from_string(compressed_content, content_type='image/jpeg')
-        blob.make_public()
-        image_url = blob.public_url
+        image_url = await run_blocking(upload_to_storage, storage_path, compressed_content)
 
         # Salvar metadados no Firestore
         doc_ref = db_firestore.collection('hero_images').document()
@@ -99,7 +127,7 @@ async def create_hero_image(
             'createdAt': firestore.SERVER_TIMESTAMP,
             'updatedAt': firestore.SERVER_TIMESTAMP
         }
-        doc_ref.set(doc_data)
+        await doc_ref.set(doc_data)
 
         print(f"✅ Hero image criada: {doc_ref.id}")
         return {"message": "Hero image criada", "data": doc_data}
@@ -115,14 +143,14 @@ async def update_hero_image(
 ):
     try:
         doc_ref = db_firestore.collection('hero_images').document(image_id)
-        if not doc_ref.get().exists:
+        if not (await doc_ref.get()).exists:
             raise HTTPException(404, "Hero image não encontrada")
         
         update_data = {
             **data,
             'updatedAt': firestore.SERVER_TIMESTAMP
         }
-        doc_ref.update(update_data)
+        await doc_ref.update(update_data)
         print(f"✅ Hero image atualizada: {image_id}")
         return {"message": "Hero image atualizada"}
     except Exception as e:
@@ -136,7 +164,7 @@ async def delete_hero_image(
 ):
     try:
         doc_ref = db_firestore.collection('hero_images').document(image_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         if not doc.exists:
             raise HTTPException(404, "Hero image não encontrada")
         
@@ -144,15 +172,14 @@ async def delete_hero_image(
         data = doc.to_dict()
         if 'fileName' in data:
             try:
-                bucket = storage.bucket()
-                blob = bucket.blob(f"hero-images/{data['fileName']}")
-                blob.delete()
+                blob = storage.bucket().blob(f"hero-images/{data['fileName']}")
+                await run_blocking(blob.delete)
                 print(f"✅ Arquivo removido do Storage: {data['fileName']}")
             except Exception as storage_error:
                 print(f"⚠️ Aviso: Não foi possível deletar do Storage: {storage_error}")
 
         # Deletar documento do Firestore
-        doc_ref.delete()
+        await doc_ref.delete()
         print(f"✅ Hero image deletada: {image_id}")
         return {"message": "Hero image deletada"}
     except Exception as e:
@@ -0,0 +1,98 @@
+# backend/routers/home_routes.py
+# Pacote único para a página inicial: hero images, tours em destaque, filtros
+# e dados SEO num só pedido. As partes vêm das caches em memória e são
+# montadas em paralelo; o JSON fica pré-serializado por idioma e só é refeito
+# quando uma das fontes muda.
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+
+from routers.config_routes import build_tour_filters
+from routers.hero_images_routes import hero_images_cache, list_hero_images
+from routers.seo_routes import build_seo_data
+from routers.tours_fixed import list_featured_tours
+from services.tour_catalog import tour_catalog
+from utils.http_cache import conditional_response, make_etag
+from utils.tour_projection import localize, project_tour, resolve_language
+
+router = APIRouter()
+
+FEATURED_LIMIT = 6
+
+# Pacotes já serializados por idioma: {lang: (chave das fontes, etag, corpo)}
+_bundles: Dict[str, Tuple[Tuple, str, bytes]] = {}
+
+
+def localize_hero_image(image: Dict[str, Any], language: str) -> Dict[str, Any]:
+    return {key: localize(value, language) if key in ("title", "subtitle") else value
+            for key, value in image.items()}
+
+
+async def build_home_bundle(language: str) -> Dict[str, Any]:
+    """Montar as quatro partes da página inicial em paralelo"""
+    hero_images, featured, seo = await asyncio.gather(
+        list_hero_images(active_only=True),
+        list_featured_tours(FEATURED_LIMIT),
+        build_seo_data("home", language),
+    )
+    filters = [
+        {"key": tour_filter["key"], "label": localize(tour_filter["labels"], language),
+         "order": tour_filter["order"], "count": tour_filter.get("count")}
+        for tour_filter in build_tour_filters()
+    ]
+    return {
+        "language": language,
+        "hero_images": [localize_hero_image(image, language) for image in hero_images],
+        "featured_tours": [project_tour(tour, language, shape="card") for tour in featured],
+        "tour_filters": filters,
+        "seo": seo.dict() if seo else None,
+    }
+
+
+def sources_key() -> Optional[Tuple]:
+    """Versão das fontes do pacote, ou None se alguma não estiver em cache"""
+    if not (tour_catalog.is_fresh() and hero_images_cache.is_fresh()):
+        return None
+    catalog_digest, _ = tour_catalog.fingerprint()
+    hero_digest, _ = hero_images_cache.fingerprint()
+    return (catalog_digest, hero_digest)
+
+
+@router.get("/", summary="Dados da página inicial num só pedido")
+async def get_home_bundle(
+    request: Request,
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es)"),
+    accept_language: Optional[str] = Header(None),
+):
+    """🏠 HERO IMAGES + TOURS EM DESTAQUE + FILTROS + SEO
+
+    O corpo é reutilizado enquanto o catálogo e as hero images não mudarem
+    (a contagem de clientes nos dados SEO é a da última montagem); um
+    If-None-Match com o ETag atual recebe 304.
+    """
+    try:
+        language = resolve_language(lang, accept_language)
+        key = sources_key()
+
+        cached = _bundles.get(language)
+        if key is not None and cached is not None and cached[0] == key:
+            _, etag, body = cached
+        else:
+            bundle = await build_home_bundle(language)
+            body = json.dumps(bundle, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+            etag = make_etag("home", language, key) if key is not None else make_etag("home", body)
+            if key is not None:
+                _bundles[language] = (key, etag, body)
+
+        response = Response(content=body, media_type="application/json", headers={"Content-Language": language})
+        not_modified = conditional_response(request, response, etag, "home")
+        return not_modified or response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao montar a página inicial: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
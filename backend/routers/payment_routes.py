@@ -1,11 +1,12 @@
 # backend/routers/payment_routes.py - VERSÃO FINAL E COMPLETA
 
-from fastapi import APIRouter, HTTPException, Request, Response, Query
-from typing import Dict
+from fastapi import APIRouter, Header, HTTPException, Request, Response, Query
+from typing import Dict, Optional
 from models.payment import CreatePaymentIntentRequest
 from services.stripe_service import stripe_service
-from services.booking_service import handle_successful_payment
-from config.firestore_db import db as db_firestore
+from services.booking_service import BookingRejected, handle_successful_payment, place_booking
+from services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyError, idempotency_store
+from config.firestore_db import async_db as db_firestore, run_blocking
 from datetime import datetime
 import json
 import uuid
@@ -24,35 +25,38 @@ router = APIRouter(tags=["Payments"])
 # ## SECÇÃO BOOKING (SUA LÓGICA ORIGINAL MANTIDA) ##
 # ===================================================================
 @router.post("/create-booking")
-async def create_booking_endpoint(request: Dict):
-    """Endpoint para criar booking e iniciar processo de pagamento"""
-    try:
-        booking_data = {
-            "tour_id": request.get("tour_id"),
-            "customer_name": f"{request.get('firstName', '')} {request.get('lastName', '')}",
-            "customer_email": request.get("email"),
-            "customer_phone": request.get("phone"),
-            "participants": request.get("numberOfPeople", 1),
-            "selected_date": request.get("selectedDate"),
-            "special_requests": request.get("specialRequests", ""),
-            "status": "pending",
-            "payment_status": "pending",
-            "created_at": datetime.utcnow()
+async def create_booking_endpoint(request: Dict, idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)):
+    """Endpoint para criar booking e iniciar processo de pagamento.
+
+    Com o cabeçalho Idempotency-Key, as repetições do mesmo pedido devolvem a
+    primeira resposta em vez de criarem outra reserva.
+    """
+    async def create():
+        placed = await place_booking(
+            request.get("tour_id"), request.get("selectedDate") or "", request.get("numberOfPeople", 1), {
+                "name": f"{request.get('firstName', '')} {request.get('lastName', '')}",
+                "email": request.get("email"),
+                "phone": request.get("phone"),
+                "special_requests": request.get("specialRequests", ""),
+            }, source="payments"
+        )
+        return 201, {
+            "success": True,
+            "bookingId": placed["booking"]["id"],
+            "message": "Booking criado com sucesso"
         }
 
-        booking_ref = db_firestore.collection('bookings').add(booking_data)
-        booking_id = booking_ref[1].id
-
+    try:
+        result = await idempotency_store.run("payments.create-booking", idempotency_key, request, create)
         return Response(
-            status_code=201,
-            content=json.dumps({
-                "success": True,
-                "bookingId": booking_id,
-                "message": "Booking criado com sucesso"
-            }),
-            media_type="application/json"
+            status_code=result["status_code"],
+            content=json.dumps(result["body"]),
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"} if result["replayed"] else None
         )
 
+    except (BookingRejected, IdempotencyError) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         print(f"❌ Erro ao criar booking: {e}")
         traceback.print_exc()
@@ -81,14 +85,14 @@ async def create_stripe_intent(request: CreatePaymentIntentRequest):
     try:
         print(f"🔍 DEBUG: Recebido request para criar Payment Intent: {request.dict()}")
 
-        booking_doc = db_firestore.collection('bookings').document(request.booking_id).get()
+        booking_doc = await db_firestore.collection('bookings').document(request.booking_id).get()
         if not booking_doc.exists:
             raise HTTPException(status_code=404, detail="Reserva não encontrada para iniciar o pagamento.")
 
         booking_data = booking_doc.to_dict()
         print(f"✅ DEBUG: Booking encontrado: {request.booking_id}")
 
-        tour_doc = db_firestore.collection('tours').document(request.tour_id).get()
+        tour_doc = await db_firestore.collection('tours').document(request.tour_id).get()
         if not tour_doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado.")
 
@@ -105,7 +109,7 @@ async def create_stripe_intent(request: CreatePaymentIntentRequest):
         }
 
         print(f"🔍 DEBUG: Chamando stripe_service.create_payment_intent...")
-        intent_result = stripe_service.create_payment_intent(stripe_payment_data)
+        intent_result = await run_blocking(stripe_service.create_payment_intent, stripe_payment_data)
         print(f"🔍 DEBUG: Resultado do stripe_service: {intent_result}")
 
         payment_intent_id = intent_result.get("payment_intent_id")
@@ -130,7 +134,7 @@ async def create_stripe_intent(request: CreatePaymentIntentRequest):
         }
 
         print(f"🔍 DEBUG: Criando transação no Firestore: {transaction_id}")
-        db_firestore.collection('payment_transactions').document(transaction_id).set(transaction_data)
+        await db_firestore.collection('payment_transactions').document(transaction_id).set(transaction_data)
 
         response_data = {
             "success": True,
@@ -170,8 +174,8 @@ async def stripe_webhook(request: Request):
                 payment_intent_id = payment_intent.get("id")
 
                 if payment_intent_id:
-                    transaction_docs = db_firestore.collection('payment_transactions').where('payment_intent_id', '==', payment_intent_id).stream()
-                    transaction_doc = next(transaction_docs, None)
+                    transaction_docs = await db_firestore.collection('payment_transactions').where('payment_intent_id', '==', payment_intent_id).limit(1).get()
+                    transaction_doc = transaction_docs[0] if transaction_docs else None
 
                     if transaction_doc:
                         transaction_data = transaction_doc.to_dict()
@@ -180,15 +184,15 @@ async def stripe_webhook(request: Request):
                         tour_id = transaction_data.get("tour_id")
                         if booking_id and tour_id:
                             booking_ref = db_firestore.collection('bookings').document(booking_id)
-                            booking_doc = booking_ref.get()
+                            booking_doc = await booking_ref.get()
                             if booking_doc.exists:
                                 booking_data = booking_doc.to_dict()
                                 selected_date = booking_data.get('selected_date')
                                 if selected_date:
-                                    handle_successful_payment(booking_id, tour_id, selected_date)
+                                    await handle_successful_payment(booking_id, tour_id, selected_date)
                                     
                         # Adicionar um finally para garantir o update
-                        transaction_doc.reference.update({
+                        await transaction_doc.reference.update({
                             "status": "completed",
                             "webhook_received_at": datetime.utcnow()
                         })
@@ -225,13 +229,13 @@ async def create_paypal_payment(request_data: Dict):
     try:
         # Extrair dados do booking para passar ao PayPal
         booking_id = request_data.get("booking_id")
-        booking_doc = db_firestore.collection('bookings').document(booking_id).get()
+        booking_doc = await db_firestore.collection('bookings').document(booking_id).get()
         if not booking_doc.exists:
             raise HTTPException(status_code=404, detail="Reserva associada não encontrada.")
         
         booking_data = booking_doc.to_dict()
         tour_id = booking_data.get("tour_id")
-        tour_doc = db_firestore.collection('tours').document(tour_id).get()
+        tour_doc = await db_firestore.collection('tours').document(tour_id).get()
         if not tour_doc.exists:
             raise HTTPException(status_code=404, detail="Tour associado não encontrado.")
         tour_data = tour_doc.to_dict()
@@ -246,7 +250,7 @@ async def create_paypal_payment(request_data: Dict):
             "cancel_url": f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/reservar/{tour_id}",
         }
 
-        result = paypal_service.create_payment(payment_data)
+        result = await run_blocking(paypal_service.create_payment, payment_data)
         if result.get("status") == "created":
             return {"approval_url": result.get("approval_url")}
         else:
@@ -270,13 +274,13 @@ async def execute_paypal_payment(request: Request):
         if not all([payment_id, payer_id, booking_id]):
             raise HTTPException(status_code=400, detail="Dados para execução do pagamento incompletos.")
 
-        result = paypal_service.execute_payment(payment_id=payment_id, payer_id=payer_id)
+        result = await run_blocking(paypal_service.execute_payment, payment_id=payment_id, payer_id=payer_id)
         
         if result.get("status") == "completed":
-            booking_doc = db_firestore.collection('bookings').document(booking_id).get()
+            booking_doc = await db_firestore.collection('bookings').document(booking_id).get()
             if booking_doc.exists:
                 booking_data = booking_doc.to_dict()
-                handle_successful_payment(
+                await handle_successful_payment(
                     booking_id=booking_id,
                     tour_id=booking_data.get("tour_id"),
                     selected_date=booking_data.get("selected_date")
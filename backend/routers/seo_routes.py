@@ -6,7 +6,9 @@ from typing import List, Optional, Dict
 from pydantic import BaseModel
 import xml.etree.ElementTree as ET
 
-from config.firestore_db import db as db_firestore
+from config.firestore_db import async_db as db_firestore
+from services.aggregations import aggregation_cache, count_documents
+from services.tour_catalog import get_tours_by_ids
 
 # 🎯 SEO Configuration
 class SEOConfig:
@@ -49,25 +51,28 @@ class SEOData(BaseModel):
 # 🗄️ Firestore Data Access Functions
 # ============================================================================
 
+# The customer count only feeds marketing copy: a few minutes stale is fine
+CUSTOMER_COUNT_TTL_SECONDS = 300
+
 async def get_tour_count() -> int:
-    """🎯 Count active tours in Firestore"""
+    """🎯 Count active tours with a Firestore count aggregation (cached)"""
     try:
-        # Usa a instância db_firestore importada
-        query = db_firestore.collection('tours').where('active', '==', True)
-        docs = query.stream()
-        count = sum(1 for _ in docs)
-        return count
+        return await aggregation_cache.get(
+            ("seo", "active_tours"),
+            lambda: count_documents(db_firestore.collection('tours').where('active', '==', True))
+        )
     except Exception as e:
         print(f"Error counting tours: {e}")
         return 47  # Fallback
 
 async def get_customer_count() -> int:
-    """🌟 Count customers/bookings in Firestore"""
+    """🌟 Count customers/bookings with a Firestore count aggregation (cached for CUSTOMER_COUNT_TTL_SECONDS)"""
     try:
-        # Usa a instância db_firestore importada
-        query = db_firestore.collection('bookings')
-        docs = query.stream()
-        count = sum(1 for _ in docs)
+        count = await aggregation_cache.get(
+            ("seo", "bookings"),
+            lambda: count_documents(db_firestore.collection('bookings')),
+            CUSTOMER_COUNT_TTL_SECONDS
+        )
         return count if count > 0 else 1250  # Fallback if no bookings
     except Exception as e:
         print(f"Error counting customers: {e}")
@@ -78,10 +83,9 @@ async def get_all_tours() -> List[TourData]:
     try:
         # Usa a instância db_firestore importada
         query = db_firestore.collection('tours').where('active', '==', True)
-        docs = query.stream()
         tours = []
         seen_ids = set()  # To handle potential duplicates
-        for doc in docs:
+        async for doc in query.stream():
             tour_doc = doc.to_dict()
             doc_id = doc.id
             if doc_id in seen_ids:
@@ -131,9 +135,8 @@ async def get_featured_tours(language: str = "pt") -> List[TourData]:
     try:
         # Usa a instância db_firestore importada
         query = db_firestore.collection('tours').where('active', '==', True).where('rating', '>=', 4.5).limit(6)
-        docs = query.stream()
         tours = []
-        for doc in docs:
+        async for doc in query.stream():
             tour_doc = doc.to_dict()
             tour_data = {
                 "slug": tour_doc.get("id", "tour-" + str(doc.id)),
@@ -152,14 +155,22 @@ async def get_featured_tours(language: str = "pt") -> List[TourData]:
         all_tours = await get_all_tours()
         return all_tours[:3]
 
+async def get_tours_data(tour_ids: List[str]) -> Dict[str, Optional[TourData]]:
+    """🎢 Fetch several tours in one read (catalog cache or a single get_all)"""
+    try:
+        found = await get_tours_by_ids(tour_ids)
+    except Exception as e:
+        print(f"Error fetching tours by ID: {e}")
+        return {tour_id: None for tour_id in tour_ids}
+    return {tour_id: build_tour_data(tour_id, tour_doc) if tour_doc else None
+            for tour_id, tour_doc in found.items()}
+
 async def get_tour_by_id(tour_id: str) -> Optional[TourData]:
     """🎢 Fetch a tour by ID from Firestore"""
+    return (await get_tours_data([tour_id])).get(tour_id)
+
+def build_tour_data(tour_id: str, tour_doc: Dict) -> Optional[TourData]:
     try:
-        # Usa a instância db_firestore importada
-        doc = db_firestore.collection('tours').document(tour_id).get()
-        if not doc.exists:
-            return None
-        tour_doc = doc.to_dict()
         tour_data = {
             "slug": tour_doc.get("id", tour_id),
             "name": tour_doc.get("name", {"pt": "Tour", "en": "Tour"}),
@@ -172,9 +183,45 @@ async def get_tour_by_id(tour_id: str) -> Optional[TourData]:
         }
         return TourData(**tour_data)
     except Exception as e:
-        print(f"Error fetching tour by ID: {e}")
+        print(f"Error building tour {tour_id}: {e}")
         return None
 
+async def build_seo_data(page: str, language: str = "pt") -> Optional[SEOData]:
+    """🔥 SEO data for a page (None if the page/language is unknown)"""
+    tour_count = await get_tour_count()
+    customer_count = await get_customer_count()
+    
+    dynamic_data = {
+        "home": {
+            "pt": SEOData(
+                title=f"{SEOConfig.COMPANY_NAME} - Aventuras Épicas em Portugal | +{tour_count} Tours Únicos",
+                description=f"Descubra paraísos escondidos com {tour_count}+ tours exclusivos. Já transformámos {customer_count}+ vidas através de aventuras únicas!",
+                keywords="tours portugal, aventuras portugal, turismo portugal, excursões lisboa, viagens portugal",
+                tours_count=tour_count,
+                customers_served=customer_count,
+                lastModified=datetime.now().isoformat()
+            ),
+            "en": SEOData(
+                title=f"{SEOConfig.COMPANY_NAME} - Epic Adventures in Portugal | +{tour_count} Unique Tours",
+                description=f"Discover hidden paradises with {tour_count}+ exclusive tours. We've transformed {customer_count}+ lives through unique adventures!",
+                keywords="portugal tours, portugal adventures, portugal tourism, lisbon excursions, portugal travel",
+                tours_count=tour_count,
+                customers_served=customer_count,
+                lastModified=datetime.now().isoformat()
+            ),
+            "es": SEOData(
+                title=f"{SEOConfig.COMPANY_NAME} - Aventuras Épicas en Portugal | +{tour_count} Tours Únicos",
+                description=f"Descubre paraísos ocultos con {tour_count}+ tours exclusivos. ¡Hemos transformado {customer_count}+ vidas a través de aventuras únicas!",
+                keywords="tours portugal, aventuras portugal, turismo portugal, excursiones lisboa, viajes portugal",
+                tours_count=tour_count,
+                customers_served=customer_count,
+                lastModified=datetime.now().isoformat()
+            )
+        }
+    }
+    
+    return dynamic_data.get(page, {}).get(language)
+
 # ============================================================================
 # 🗺️ Dynamic Sitemap Generator
 # ============================================================================
@@ -303,39 +350,7 @@ Crawl-delay: 0"""
         if language not in SEOConfig.LANGUAGES:
             raise HTTPException(status_code=400, detail="Idioma não suportado")
         
-        tour_count = await get_tour_count()
-        customer_count = await get_customer_count()
-        
-        dynamic_data = {
-            "home": {
-                "pt": SEOData(
-                    title=f"{SEOConfig.COMPANY_NAME} - Aventuras Épicas em Portugal | +{tour_count} Tours Únicos",
-                    description=f"Descubra paraísos escondidos com {tour_count}+ tours exclusivos. Já transformámos {customer_count}+ vidas através de aventuras únicas!",
-                    keywords="tours portugal, aventuras portugal, turismo portugal, excursões lisboa, viagens portugal",
-                    tours_count=tour_count,
-                    customers_served=customer_count,
-                    lastModified=datetime.now().isoformat()
-                ),
-                "en": SEOData(
-                    title=f"{SEOConfig.COMPANY_NAME} - Epic Adventures in Portugal | +{tour_count} Unique Tours",
-                    description=f"Discover hidden paradises with {tour_count}+ exclusive tours. We've transformed {customer_count}+ lives through unique adventures!",
-                    keywords="portugal tours, portugal adventures, portugal tourism, lisbon excursions, portugal travel",
-                    tours_count=tour_count,
-                    customers_served=customer_count,
-                    lastModified=datetime.now().isoformat()
-                ),
-                "es": SEOData(
-                    title=f"{SEOConfig.COMPANY_NAME} - Aventuras Épicas en Portugal | +{tour_count} Tours Únicos",
-                    description=f"Descubre paraísos ocultos con {tour_count}+ tours exclusivos. ¡Hemos transformado {customer_count}+ vidas a través de aventuras únicas!",
-                    keywords="tours portugal, aventuras portugal, turismo portugal, excursiones lisboa, viajes portugal",
-                    tours_count=tour_count,
-                    customers_served=customer_count,
-                    lastModified=datetime.now().isoformat()
-                )
-            }
-        }
-        
-        page_data = dynamic_data.get(page, {}).get(language)
+        page_data = await build_seo_data(page, language)
         if not page_data:
             raise HTTPException(status_code=404, detail="Página não encontrada")
         return page_data.dict()
@@ -420,7 +435,7 @@ Crawl-delay: 0"""
         """✅ Health check with Firestore status"""
         try:
             # Usa a instância db_firestore importada
-            db_firestore.collection('tours').limit(1).get()
+            await db_firestore.collection('tours').limit(1).get()
             db_status = "healthy"
         except Exception as e:
             db_status = f"error: {str(e)}"
@@ -5,6 +5,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import sys
 
+from utils.text import fold_text
+
 # ✅ INICIALIZAR ROUTER (ESSENCIAL!)
 router = APIRouter()
 
@@ -91,8 +93,8 @@ async def get_firestore_tours(filters: Dict = None) -> List[Dict]:
             
             # Filtro de localização (client-side porque Firestore)
             if filters and 'location' in filters:
-                tour_location = tour_data.get('location', '').lower()
-                if filters['location'].lower() not in tour_location:
+                tour_location = fold_text(tour_data.get('location', ''))
+                if fold_text(filters['location']) not in tour_location:
                     continue
             
             tours.append(tour_data)
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header, Request, Response
 from typing import List, Optional
 import asyncio
+import time
 import os
 import json
 
 # Importações absolutas para a nova estrutura
-from config.firestore_db import db as db_firestore
+from config.firestore_db import async_db as db_firestore
 from models.tour import Tour
+from services.tour_catalog import MAX_BATCH_SIZE, get_tours_by_ids, tour_catalog
+from services.tour_search import MAX_SEARCH_RESULTS, build_index, tour_search
+from services.tour_calendar import MAX_CALENDAR_DAYS, tour_calendar
+from services.tour_facets import build_facet_index, tour_facets
+from services.tour_suggest import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, build_suggest_index, format_suggestions, tour_suggest
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_in_memory
+from utils.tour_projection import parse_fields, project_tour, resolve_language, wants_projection
+from utils.http_cache import conditional_response, make_etag
+from utils.date_bitmap import DateBitmap, encode_bitmap, parse_window
 
 router = APIRouter()
 
@@ -28,43 +38,290 @@ def debug_map_locations(data, context=""):
     else:
         print(f"  - ❌ Campo map_locations não encontrado!")
 
+def tour_sort_key(tour):
+    """Ordenação estável da listagem: campo 'order' (999 por omissão) e depois id"""
+    order = tour.get("order")
+    return (order if isinstance(order, (int, float)) else 999, tour.get("id", ""))
+
+def tour_cursor_fields(tour):
+    order, tour_id = tour_sort_key(tour)
+    return {"order": order, "id": tour_id}
+
 # ✅ CORREÇÃO: O caminho agora é "/" para corresponder a /api/tours/
 @router.get("/")
-async def get_tours(active_only: bool = False, featured: bool = False):
-    """🎯 OBTER TODOS OS TOURS COM FILTROS"""
+async def get_tours(
+    request: Request,
+    response: Response,
+    active_only: bool = False,
+    featured: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página (ativa a paginação)"),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) para achatar os campos multilingues"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgulas"),
+    shape: Optional[str] = Query(None, pattern="^(card|full)$", description="'card' para a forma compacta de listagem"),
+    accept_language: Optional[str] = Header(None),
+):
+    """🎯 OBTER TODOS OS TOURS COM FILTROS
+
+    Sem limit/cursor devolve a lista completa (compatibilidade); com eles
+    devolve {"items": [...], "next_cursor": ...} ordenado por order e id.
+    Com lang/fields/shape os tours vêm num só idioma e só com os campos pedidos.
+    O ETag deriva dos update_time do catálogo em cache: um 304 não lista nem serializa nada.
+    """
     try:
-        query = db_firestore.collection('tours')
-        
-        if active_only:
-            query = query.where('active', '==', True)
-        if featured:
-            query = query.where('featured', '==', True)
+        if tour_catalog.is_fresh():
+            digest, _ = tour_catalog.fingerprint()
+            language = resolve_language(lang, accept_language) if wants_projection(lang, fields, shape) else None
+            etag = make_etag("tours", digest, active_only, featured, limit, cursor, language, fields, shape)
+            not_modified = conditional_response(request, response, etag, "tours")
+            if not_modified:
+                return not_modified
+
+        tours = tour_catalog.list_tours(active_only=active_only, featured=featured)
+        if tours is None:
+            query = db_firestore.collection('tours')
             
-        docs = query.stream()
-        tours = [await tour_helper(doc) for doc in docs]
-        
-        print(f"✅ Retornando {len(tours)} tours (active_only={active_only}, featured={featured})")
-        return tours
+            if active_only:
+                query = query.where('active', '==', True)
+            if featured:
+                query = query.where('featured', '==', True)
+                
+            tours = [await tour_helper(doc) async for doc in query.stream()]
+            
+            print(f"✅ Retornando {len(tours)} tours (active_only={active_only}, featured={featured})")
+
+        project = None
+        if wants_projection(lang, fields, shape):
+            language = resolve_language(lang, accept_language)
+            field_list = parse_fields(fields)
+            response.headers["Content-Language"] = language
+            project = lambda tour: project_tour(tour, language, field_list, shape)
+
+        if limit is None and cursor is None:
+            return [project(tour) for tour in tours] if project else tours
+
+        page = paginate_in_memory(tours, tour_sort_key, tour_cursor_fields, limit or DEFAULT_PAGE_SIZE, cursor)
+        if project:
+            page["items"] = [project(tour) for tour in page["items"]]
+        return page
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ ERRO CRÍTICO na rota GET /: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar tours: {str(e)}")
 
+# As rotas fixas são declaradas antes de "/{tour_id}" para não serem interpretadas como ids
+@router.get("/search", summary="Pesquisar tours por texto")
+async def search_tours(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a pesquisar (sem distinção de acentos)"),
+    active_only: bool = True,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) para achatar os campos multilingues"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgulas"),
+    shape: Optional[str] = Query(None, pattern="^(card|full)$", description="'card' para a forma compacta"),
+    accept_language: Optional[str] = Header(None),
+):
+    """🔎 PESQUISA DE TEXTO NOS TOURS
+
+    Pesquisa em name, short_description, description (pt/en/es) e location,
+    ignorando acentos ("Évora" == "evora"). Devolve os tours por relevância.
+    """
+    try:
+        if tour_catalog.is_fresh():
+            ranked = tour_search.search(q, active_only=active_only, limit=limit)
+            tours = [tour_catalog.get(tour_id) for tour_id, _ in ranked]
+        else:
+            # Sem cache: índice temporário a partir de uma leitura da coleção
+            all_tours = [await tour_helper(doc) async for doc in db_firestore.collection('tours').stream()]
+            by_id = {tour["id"]: tour for tour in all_tours}
+            ranked = build_index(all_tours).search(q, active_only=active_only, limit=limit)
+            tours = [by_id.get(tour_id) for tour_id, _ in ranked]
+
+        tours = [tour for tour in tours if tour]
+        if wants_projection(lang, fields, shape):
+            language = resolve_language(lang, accept_language)
+            field_list = parse_fields(fields)
+            response.headers["Content-Language"] = language
+            tours = [project_tour(tour, language, field_list, shape) for tour in tours]
+
+        print(f"🔎 Pesquisa '{q}': {len(tours)} tours")
+        return tours
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro na pesquisa de tours: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/facets", summary="Filtrar tours por facetas com contagens")
+async def get_tours_by_facets(
+    response: Response,
+    tour_type: Optional[str] = Query(None, description="Tipos separados por vírgulas (qualquer um)"),
+    location: Optional[str] = Query(None, description="Localização (sem distinção de acentos)"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_duration: Optional[float] = Query(None, ge=0, description="Duração mínima em horas"),
+    max_duration: Optional[float] = Query(None, ge=0, description="Duração máxima em horas"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página (ativa a paginação)"),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) para achatar os campos multilingues"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgulas"),
+    shape: Optional[str] = Query(None, pattern="^(card|full)$", description="'card' para a forma compacta"),
+    accept_language: Optional[str] = Header(None),
+):
+    """🧮 TOURS ATIVOS FILTRADOS + CONTAGENS POR FACETA NUM SÓ PEDIDO
+
+    Devolve {"items", "total", "facets", "next_cursor"}. Cada faceta é contada
+    com todos os filtros aplicados menos o seu.
+    """
+    try:
+        if tour_catalog.is_fresh():
+            index, get_tour = tour_facets, tour_catalog.get
+        else:
+            all_tours = [await tour_helper(doc) async for doc in db_firestore.collection('tours').stream()]
+            by_id = {tour["id"]: tour for tour in all_tours}
+            index, get_tour = build_facet_index(all_tours), by_id.get
+
+        result = index.search(
+            tour_types=parse_fields(tour_type),
+            location=location,
+            min_price=min_price, max_price=max_price,
+            min_duration=min_duration, max_duration=max_duration,
+        )
+        tours = sorted((tour for tour in map(get_tour, result["ids"]) if tour), key=tour_sort_key)
+        page = paginate_in_memory(tours, tour_sort_key, tour_cursor_fields, limit or len(tours) or 1, cursor)
+
+        if wants_projection(lang, fields, shape):
+            language = resolve_language(lang, accept_language)
+            field_list = parse_fields(fields)
+            response.headers["Content-Language"] = language
+            page["items"] = [project_tour(tour, language, field_list, shape) for tour in page["items"]]
+
+        return {**page, "total": len(tours), "facets": result["facets"]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro na filtragem por facetas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/suggest", summary="Sugestões de pesquisa por prefixo")
+async def suggest_tours(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Prefixo escrito pelo utilizador"),
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) dos nomes sugeridos"),
+    accept_language: Optional[str] = Header(None),
+):
+    """⌨️ AUTOCOMPLETE DE NOMES DE TOURS E LOCALIZAÇÕES
+
+    Servido de um array ordenado em memória (bisect): sem acesso ao Firestore
+    quando o catálogo está em cache. O tempo de servidor vai no Server-Timing.
+    """
+    started = time.perf_counter()
+    try:
+        language = resolve_language(lang, accept_language)
+        if tour_catalog.is_fresh():
+            matches = tour_suggest.suggest(q, limit)
+            tours = {value: tour_catalog.get(value) for kind, value in matches if kind == "tour"}
+        else:
+            all_tours = [await tour_helper(doc) async for doc in db_firestore.collection('tours').stream()]
+            matches = build_suggest_index(all_tours).suggest(q, limit)
+            tours = {tour["id"]: tour for tour in all_tours}
+
+        suggestions = format_suggestions(matches, tours, language)
+        response.headers["Content-Language"] = language
+        response.headers["Server-Timing"] = f"suggest;dur={(time.perf_counter() - started) * 1000:.2f}"
+        return suggestions
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro nas sugestões de tours: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/batch", summary="Obter vários tours numa só leitura")
+async def get_tours_batch(
+    response: Response,
+    ids: str = Query(..., description="Ids dos tours separados por vírgulas"),
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) para achatar os campos multilingues"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgulas"),
+    shape: Optional[str] = Query(None, pattern="^(card|full)$", description="'card' para a forma compacta"),
+    accept_language: Optional[str] = Header(None),
+):
+    """🎯 BUSCAR VÁRIOS TOURS POR ID
+
+    Devolve uma lista na ordem dos ids pedidos, com null para ids inexistentes.
+    """
+    tour_ids = [tour_id.strip() for tour_id in ids.split(",") if tour_id.strip()]
+    if not tour_ids:
+        raise HTTPException(status_code=400, detail="Parâmetro ids vazio")
+    if len(set(tour_ids)) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} tours por pedido")
+
+    try:
+        found = await get_tours_by_ids(tour_ids)
+
+        if wants_projection(lang, fields, shape):
+            language = resolve_language(lang, accept_language)
+            field_list = parse_fields(fields)
+            response.headers["Content-Language"] = language
+            found = {
+                tour_id: project_tour(tour, language, field_list, shape) if tour else None
+                for tour_id, tour in found.items()
+            }
+
+        print(f"✅ Lote de tours: {sum(1 for tour in found.values() if tour)}/{len(found)} encontrados")
+        return [found.get(tour_id) for tour_id in tour_ids]
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao buscar lote de tours: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ✅ CORREÇÃO: O caminho agora é "/{tour_id}" para corresponder a /api/tours/{tour_id}
 @router.get("/{tour_id}")
-async def get_tour_by_id(tour_id: str):
+async def get_tour_by_id(
+    tour_id: str,
+    request: Request,
+    response: Response,
+    lang: Optional[str] = Query(None, description="Idioma (pt, en, es) para achatar os campos multilingues"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgulas"),
+    shape: Optional[str] = Query(None, pattern="^(card|full)$", description="'card' para a forma compacta"),
+    accept_language: Optional[str] = Header(None),
+):
     """🎯 BUSCAR TOUR POR ID COM DEBUG MELHORADO"""
     try:
-        doc_ref = db_firestore.collection('tours').document(tour_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
+        tour_data = tour_catalog.get(tour_id)
+        update_time = tour_catalog.update_time(tour_id)
+        if tour_data is None and tour_catalog.is_fresh():
             raise HTTPException(status_code=404, detail="Tour não encontrado")
-        
-        tour_data = await tour_helper(doc)
+
+        if tour_data is None:
+            doc_ref = db_firestore.collection('tours').document(tour_id)
+            doc = await doc_ref.get()
+            
+            if not doc.exists:
+                raise HTTPException(status_code=404, detail="Tour não encontrado")
+            
+            tour_data = await tour_helper(doc)
+            update_time = doc.update_time
+
+        language = resolve_language(lang, accept_language) if wants_projection(lang, fields, shape) else None
+        etag = make_etag("tour", tour_id, update_time, language, fields, shape)
+        not_modified = conditional_response(request, response, etag, "tour_detail", update_time)
+        if not_modified:
+            return not_modified
+
         debug_map_locations(tour_data, f"GET tour {tour_id}")
         
         print(f"✅ Tour encontrado: {tour_data.get('name', {}).get('pt', 'Sem nome')}")
+        if language:
+            response.headers["Content-Language"] = language
+            return project_tour(tour_data, language, parse_fields(fields), shape)
         return tour_data
         
     except HTTPException:
@@ -73,19 +330,36 @@ async def get_tour_by_id(tour_id: str):
         print(f"❌ Erro ao buscar tour {tour_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats", summary="Estado do cache do catálogo de tours")
+async def get_catalog_cache_stats():
+    """📊 Hits/misses e frescura do cache em memória do catálogo"""
+    return {
+        **tour_catalog.stats(),
+        "search_index": tour_search.stats(),
+        "suggest_index": tour_suggest.stats(),
+        "facet_index": tour_facets.stats(),
+        "calendar_index": tour_calendar.stats(),
+    }
+
+async def list_featured_tours(limit: int = 6):
+    """Tours ativos em destaque (do catálogo em cache, ou do Firestore)"""
+    tours = tour_catalog.list_tours(active_only=True, featured=True, limit=limit)
+    if tours is not None:
+        print(f"✅ Retornando {len(tours)} tours em destaque (cache)")
+        return tours
+
+    query = db_firestore.collection('tours').where("active", "==", True).where("featured", "==", True)
+    tours = [await tour_helper(doc) async for doc in query.limit(limit).stream()]
+    
+    print(f"✅ Retornando {len(tours)} tours em destaque")
+    return tours
+
 # ✅ CORREÇÃO: O caminho agora é "/featured/list"
 @router.get("/featured/list", summary="Obter tours em destaque")
 async def get_featured_tours(limit: int = Query(6, description="Limite de tours")):
     """🎯 ENDPOINT ESPECÍFICO PARA TOURS EM DESTAQUE"""
     try:
-        query = db_firestore.collection('tours').where("active", "==", True).where("featured", "==", True)
-        docs = query.limit(limit).stream()
-        
-        tours = [await tour_helper(doc) for doc in docs]
-        
-        print(f"✅ Retornando {len(tours)} tours em destaque")
-        return tours
-        
+        return await list_featured_tours(limit)
     except Exception as e:
         print(f"❌ Erro ao buscar tours em destaque: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -104,9 +378,9 @@ async def create_tour(tour_data: dict):
         tour_data["updated_at"] = asyncio.get_event_loop().time()
         
         doc_ref = db_firestore.collection('tours').document()
-        doc_ref.set(tour_data)
+        await doc_ref.set(tour_data)
         
-        saved_doc = doc_ref.get()
+        saved_doc = await doc_ref.get()
         result = await tour_helper(saved_doc)
         
         print(f"✅ Tour criado: {result.get('name', {}).get('pt', 'Sem nome')}")
@@ -124,7 +398,7 @@ async def update_tour(tour_id: str, tour_update: dict):
         debug_map_locations(tour_update, f"UPDATE {tour_id} - Input")
         
         doc_ref = db_firestore.collection('tours').document(tour_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado")
@@ -134,9 +408,9 @@ async def update_tour(tour_id: str, tour_update: dict):
         
         tour_update["updated_at"] = asyncio.get_event_loop().time()
         
-        doc_ref.update(tour_update)
+        await doc_ref.update(tour_update)
         
-        updated_doc = doc_ref.get()
+        updated_doc = await doc_ref.get()
         result = await tour_helper(updated_doc)
         
         print(f"✅ Tour atualizado: {result.get('name', {}).get('pt', 'Sem nome')}")
@@ -154,12 +428,12 @@ async def delete_tour(tour_id: str):
     """🎯 DELETAR TOUR"""
     try:
         doc_ref = db_firestore.collection('tours').document(tour_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado")
         
-        doc_ref.delete()
+        await doc_ref.delete()
         
         print(f"✅ Tour deletado: {tour_id}")
         return {"message": "Tour deletado com sucesso", "id": tour_id}
@@ -172,13 +446,26 @@ async def delete_tour(tour_id: str):
 
 # Este endpoint parece ser relativo ao tour_id, pelo que o caminho está correto
 @router.get("/{tour_id}/occupied-dates")
-async def get_occupied_dates(tour_id: str):
+async def get_occupied_dates(tour_id: str, request: Request, response: Response):
     """Retorna as datas ocupadas para um tour específico"""
     try:
-        tour_doc = db_firestore.collection('tours').document(tour_id).get()
-        if not tour_doc.exists:
+        data = tour_catalog.get(tour_id)
+        update_time = tour_catalog.update_time(tour_id)
+        if data is None and tour_catalog.is_fresh():
             raise HTTPException(status_code=404, detail="Tour não encontrado")
-        data = tour_doc.to_dict()
+
+        if data is None:
+            tour_doc = await db_firestore.collection('tours').document(tour_id).get()
+            if not tour_doc.exists:
+                raise HTTPException(status_code=404, detail="Tour não encontrado")
+            data = tour_doc.to_dict()
+            update_time = tour_doc.update_time
+
+        etag = make_etag("occupied_dates", tour_id, update_time)
+        not_modified = conditional_response(request, response, etag, "occupied_dates", update_time)
+        if not_modified:
+            return not_modified
+
         occupied_dates = data.get('occupied_dates', [])
         print(f"✅ Retornando {len(occupied_dates)} datas ocupadas para o tour {tour_id}")
         return {"occupied_dates": occupied_dates}
@@ -187,3 +474,59 @@ async def get_occupied_dates(tour_id: str):
     except Exception as e:
         print(f"❌ Erro ao buscar datas ocupadas para o tour {tour_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar datas ocupadas: {str(e)}")
+
+@router.get("/{tour_id}/calendar", summary="Calendário de datas ocupadas numa janela")
+async def get_tour_calendar(
+    tour_id: str,
+    request: Request,
+    response: Response,
+    start: Optional[str] = Query(None, description="Primeiro dia (YYYY-MM-DD); hoje por omissão"),
+    end: Optional[str] = Query(None, description="Último dia (YYYY-MM-DD); start + 30 dias por omissão"),
+    format: str = Query("rle", pattern="^(bitmap|rle|dates)$", description="bitmap, rle ou dates"),
+):
+    """📅 DATAS OCUPADAS DE UM TOUR NUMA JANELA
+
+    - bitmap: base64 com um bit por dia (bit i = start + i, LSB-first em cada byte)
+    - rle: [[ocupado, dias], ...] a partir de start
+    - dates: listas de dias ocupados e livres
+    """
+    first_day, last_day = parse_window(start, end, MAX_CALENDAR_DAYS)
+
+    try:
+        bitmap = tour_calendar.get(tour_id) if tour_catalog.is_fresh() else None
+        update_time = tour_catalog.update_time(tour_id)
+        if bitmap is None and tour_catalog.is_fresh():
+            raise HTTPException(status_code=404, detail="Tour não encontrado")
+
+        if bitmap is None:
+            tour_doc = await db_firestore.collection('tours').document(tour_id).get()
+            if not tour_doc.exists:
+                raise HTTPException(status_code=404, detail="Tour não encontrado")
+            bitmap = DateBitmap.from_dates(tour_doc.to_dict().get('occupied_dates'))
+            update_time = tour_doc.update_time
+
+        etag = make_etag("calendar", tour_id, update_time, first_day, last_day, format)
+        not_modified = conditional_response(request, response, etag, "occupied_dates", update_time)
+        if not_modified:
+            return not_modified
+
+        result = {
+            "tour_id": tour_id,
+            "start": first_day.isoformat(),
+            "end": last_day.isoformat(),
+            "format": format,
+        }
+        if format == "bitmap":
+            result["bitmap"] = encode_bitmap(bitmap.window(first_day, last_day))
+        elif format == "rle":
+            result["runs"] = [[occupied, days] for occupied, days in bitmap.run_lengths(first_day, last_day)]
+        else:
+            result["occupied"] = [day.isoformat() for day in bitmap.days_in_range(first_day, last_day)]
+            result["free"] = [day.isoformat() for day in bitmap.days_in_range(first_day, last_day, occupied=False)]
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Erro ao montar o calendário do tour {tour_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
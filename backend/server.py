@@ -31,10 +31,11 @@ import asyncio
 import aiohttp
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import uuid
 
-from fastapi import FastAPI, APIRouter, HTTPException, Query, UploadFile, File, Depends, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Response, UploadFile, File, Depends, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, EmailStr
@@ -45,6 +46,7 @@ from google.oauth2 import service_account
 from firebase_admin import firestore
 
 from google.cloud import secretmanager
+from google.api_core.exceptions import NotFound
 
 def access_secret(secret_id):
     client = secretmanager.SecretManagerServiceClient()
@@ -77,10 +79,20 @@ except ImportError:
     STRIPE_AVAILABLE = False
     stripe_service = None
 
+# utils.google_calendar lê o calendário do ambiente: o mesmo do Secret Manager
+os.environ.setdefault("GOOGLE_CALENDAR_ID", GOOGLE_CALENDAR_ID)
+os.environ.setdefault("GOOGLE_CALENDAR_API_KEY", GOOGLE_CALENDAR_API_KEY)
+
 # ✅ CORREÇÃO: IMPORTAR OS MÓDULOS DOS ROUTERS
 from routers import tours_fixed as tours
 from routers import booking_routes
 from routers.seo_routes import setup_seo_routes
+from services.booking_service import (
+    BookingRejected, place_booking, release_tour_date, repair_occupied_dates, update_booking_status
+)
+from services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyError, idempotency_store
+from utils.google_calendar import calendar_cache, get_calendar_availability as calendar_available_dates
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
 
 
 # Set up root directory and load environment variables
@@ -91,7 +103,7 @@ load_dotenv(ROOT_DIR / '.env')
 # ✅ FIREBASE INITIALIZATION - IMPORTAR DO CONFIG
 # ================================
 try:
-    from config.firestore_db import db as db_firestore
+    from config.firestore_db import async_db as db_firestore, run_blocking
     print("✅ Firebase importado do config centralizado")
     print("🔍 Após Firebase - STRIPE_SECRET_KEY:", STRIPE_SECRET_KEY)
 except ImportError as e:
@@ -308,51 +320,26 @@ def upload_image_to_firebase(image_data: str, filename: str) -> str:
 # ================================
 # 🔒 FUNÇÃO PARA MARCAR DATA COMO OCUPADA
 # ================================
-def handle_successful_payment(booking_id: str, tour_id: str, selected_date: str):
+async def handle_successful_payment(booking_id: str, tour_id: str, selected_date: str):
     """
     Marcar data como ocupada após pagamento confirmado
     """
     try:
         print(f"🔒 Marcando data {selected_date} como ocupada para tour {tour_id}")
         
-        # Buscar tour atual
-        tour_ref = db_firestore.collection('tours').document(tour_id)
-        tour_doc = tour_ref.get()
-        
-        if not tour_doc.exists:
-            print(f"❌ Tour {tour_id} não encontrado")
-            return False
-        
-        tour_data = tour_doc.to_dict()
+        # Transição para confirmed: occupied_dates do tour (ArrayUnion), reserva e
+        # documento mensal de disponibilidade atualizados numa só transação
+        await update_booking_status(booking_id, "confirmed", {
+            'date_blocked': True,
+            'date_blocked_at': datetime.utcnow()
+        })
         
-        # Obter lista atual de datas ocupadas
-        occupied_dates = tour_data.get('occupied_dates', [])
+        print(f"✅ Data {selected_date} marcada como ocupada no tour {tour_id}")
+        return True
         
-        # Adicionar nova data se não existir
-        if selected_date not in occupied_dates:
-            occupied_dates.append(selected_date)
-            
-            # Atualizar documento do tour
-            tour_ref.update({
-                'occupied_dates': occupied_dates,
-                'updated_at': datetime.utcnow()
-            })
-            
-            print(f"✅ Data {selected_date} adicionada às datas ocupadas do tour {tour_id}")
-            
-            # Atualizar status da reserva
-            booking_ref = db_firestore.collection('bookings').document(booking_id)
-            booking_ref.update({
-                'date_blocked': True,
-                'date_blocked_at': datetime.utcnow(),
-                'updated_at': datetime.utcnow()
-            })
-            
-            return True
-        else:
-            print(f"⚠️ Data {selected_date} já estava ocupada para tour {tour_id}")
-            return True
-            
+    except NotFound:
+        print(f"❌ Tour {tour_id} ou reserva {booking_id} não encontrados")
+        return False
     except Exception as e:
         print(f"❌ Erro ao marcar data como ocupada: {e}")
         return False
@@ -360,28 +347,23 @@ def handle_successful_payment(booking_id: str, tour_id: str, selected_date: str)
 # ================================
 # GOOGLE CALENDAR UTILITIES
 # ================================
+# Cache partilhado de utils.google_calendar (um só thread de sincronização por processo)
+# Espera máxima pela primeira sincronização, em segundos
+CALENDAR_READY_TIMEOUT = 5
+
 def get_calendar_availability(start_date: str, end_date: str) -> List[str]:
-    """Get available dates from Google Calendar"""
+    """Get available dates from the in-memory Google Calendar cache.
+
+    Antes da primeira sincronização espera até CALENDAR_READY_TIMEOUT; se o
+    calendário continuar por sincronizar não devolve datas, em vez de dar
+    todos os dias úteis como livres (como o pré-cálculo em segundo plano).
+    """
     try:
-        service = build('calendar', 'v3', developerKey=GOOGLE_CALENDAR_API_KEY)
-        events_result = service.events().list(
-            calendarId=GOOGLE_CALENDAR_ID,
-            timeMin=f"{start_date}T00:00:00Z",
-            timeMax=f"{end_date}T23:59:59Z",
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date)
-        available_dates = []
-        current = start
-        while current <= end:
-            if current.weekday() < 5:
-                available_dates.append(current.strftime("%Y-%m-%d"))
-            current += timedelta(days=1)
-        return available_dates
+        calendar_cache.start()  # Sem efeito se o thread de sincronização já estiver a correr
+        if not calendar_cache.wait_ready(CALENDAR_READY_TIMEOUT):
+            print(f"⚠️ Google Calendar ainda não sincronizado: {calendar_cache.last_error or 'a aguardar'}")
+            return []
+        return calendar_available_dates(start_date, end_date, cache=calendar_cache)
     except Exception:
         start = datetime.fromisoformat(start_date)
         available_dates = []
@@ -555,7 +537,7 @@ async def get_tour_occupied_dates(tour_id: str):
     """
     try:
         tour_ref = db_firestore.collection('tours').document(tour_id)
-        tour_doc = tour_ref.get()
+        tour_doc = await tour_ref.get()
         
         if not tour_doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado")
@@ -591,36 +573,19 @@ async def release_occupied_date(tour_id: str, date: str, user=Depends(verify_fir
     try:
         print(f"🔓 Liberando data {date} do tour {tour_id}")
         
-        tour_ref = db_firestore.collection('tours').document(tour_id)
-        tour_doc = tour_ref.get()
-        
-        if not tour_doc.exists:
-            raise HTTPException(status_code=404, detail="Tour não encontrado")
-        
-        tour_data = tour_doc.to_dict()
-        occupied_dates = tour_data.get('occupied_dates', [])
+        # Só liberta se nenhuma reserva confirmada nem lugares na lotação ocuparem a data;
+        # tour, vaga, vista de lotação e documento mensal atualizados numa só transação
+        await release_tour_date(tour_id, date)
         
-        if date in occupied_dates:
-            occupied_dates.remove(date)
-            
-            tour_ref.update({
-                'occupied_dates': occupied_dates,
-                'updated_at': datetime.utcnow()
-            })
-            
-            return {
-                "success": True,
-                "message": f"Data {date} liberada com sucesso",
-                "tour_id": tour_id,
-                "date_released": date
-            }
-        else:
-            return {
-                "success": False,
-                "message": f"Data {date} não estava ocupada",
-                "tour_id": tour_id
-            }
+        return {
+            "success": True,
+            "message": f"Data {date} liberada com sucesso",
+            "tour_id": tour_id,
+            "date_released": date
+        }
             
+    except BookingRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
@@ -634,7 +599,7 @@ async def debug_tour_dates_status(tour_id: str):
     """
     try:
         tour_ref = db_firestore.collection('tours').document(tour_id)
-        tour_doc = tour_ref.get()
+        tour_doc = await tour_ref.get()
         
         if not tour_doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado")
@@ -643,7 +608,7 @@ async def debug_tour_dates_status(tour_id: str):
         
         # Buscar reservas confirmadas para este tour
         bookings_ref = db_firestore.collection('bookings')
-        confirmed_bookings = bookings_ref.where('tour_id', '==', tour_id).where('status', '==', 'confirmed').stream()
+        confirmed_bookings = await bookings_ref.where('tour_id', '==', tour_id).where('status', '==', 'confirmed').get()
         
         booking_dates = []
         for booking in confirmed_bookings:
@@ -681,49 +646,8 @@ async def sync_occupied_dates(user=Depends(verify_firebase_token)):
     
     try:
         print("🔄 Sincronizando datas ocupadas...")
-        
-        # Buscar todos os tours
-        tours_ref = db_firestore.collection('tours')
-        tours = tours_ref.stream()
-        
-        sync_results = []
-        
-        for tour_doc in tours:
-            tour_id = tour_doc.id
-            tour_data = tour_doc.to_dict()
-            
-            # Buscar reservas confirmadas para este tour
-            bookings_ref = db_firestore.collection('bookings')
-            confirmed_bookings = bookings_ref.where('tour_id', '==', tour_id).where('status', '==', 'confirmed').stream()
-            
-            occupied_dates = []
-            for booking in confirmed_bookings:
-                booking_data = booking.to_dict()
-                selected_date = booking_data.get('selected_date')
-                if selected_date and selected_date not in occupied_dates:
-                    occupied_dates.append(selected_date)
-            
-            # Atualizar tour com datas ocupadas
-            if occupied_dates:
-                tour_doc.reference.update({
-                    'occupied_dates': occupied_dates,
-                    'updated_at': datetime.utcnow()
-                })
-            
-            sync_results.append({
-                "tour_id": tour_id,
-                "tour_name": tour_data.get('name', {}),
-                "occupied_dates": occupied_dates,
-                "total_occupied": len(occupied_dates)
-            })
-        
-        return {
-            "success": True,
-            "message": "Sincronização concluída",
-            "tours_processed": len(sync_results),
-            "results": sync_results,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        # Reparação: as datas são mantidas incrementalmente pelas transições de estado
+        return await repair_occupied_dates()
         
     except Exception as e:
         print(f"❌ Erro na sincronização: {e}")
@@ -795,8 +719,8 @@ async def debug_payment_methods():
         try:
             # Testar conexão Firestore
             test_doc = db_firestore.collection('_test').document('connection_test')
-            test_doc.set({"test": True, "timestamp": datetime.utcnow()})
-            test_doc.delete()
+            await test_doc.set({"test": True, "timestamp": datetime.utcnow()})
+            await test_doc.delete()
             
             debug_info["firebase"] = {
                 "status": "connected",
@@ -940,7 +864,7 @@ async def get_payment_logs(booking_id: str):
     try:
         # Buscar transações relacionadas
         transactions_ref = db_firestore.collection('payment_transactions')
-        docs = transactions_ref.where('booking_id', '==', booking_id).stream()
+        docs = await transactions_ref.where('booking_id', '==', booking_id).get()
         
         transactions = []
         for doc in docs:
@@ -955,7 +879,7 @@ async def get_payment_logs(booking_id: str):
             transactions.append(data)
         
         # Buscar booking
-        booking_doc = db_firestore.collection('bookings').document(booking_id).get()
+        booking_doc = await db_firestore.collection('bookings').document(booking_id).get()
         booking_data = None
         if booking_doc.exists:
             booking_data = booking_doc.to_dict()
@@ -983,18 +907,18 @@ async def clear_test_payment_data():
         
         # Limpar transações de teste
         transactions_ref = db_firestore.collection('payment_transactions')
-        test_transactions = transactions_ref.where('tour_id', '==', 'test_tour_debug').stream()
+        test_transactions = await transactions_ref.where('tour_id', '==', 'test_tour_debug').get()
         
         for doc in test_transactions:
-            doc.reference.delete()
+            await doc.reference.delete()
             deleted_count += 1
         
         # Limpar bookings de teste
         bookings_ref = db_firestore.collection('bookings')
-        test_bookings = bookings_ref.where('tour_id', '==', 'test_tour_debug').stream()
+        test_bookings = await bookings_ref.where('tour_id', '==', 'test_tour_debug').get()
         
         for doc in test_bookings:
-            doc.reference.delete()
+            await doc.reference.delete()
             deleted_count += 1
         
         return {
@@ -1056,7 +980,7 @@ async def live_payment_monitor():
         two_hours_ago = datetime.utcnow() - timedelta(hours=2)
         
         transactions_ref = db_firestore.collection('payment_transactions')
-        docs = transactions_ref.where('created_at', '>=', two_hours_ago).order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+        docs = await transactions_ref.where('created_at', '>=', two_hours_ago).order_by('created_at', direction=firestore.Query.DESCENDING).get()
         
         recent_transactions = []
         status_counts = {"created": 0, "completed": 0, "failed": 0, "pending": 0}
@@ -1245,7 +1169,7 @@ async def simulate_complete_payment_flow(
         simulation_log["duration_seconds"] = (simulation_log["completed_at"] - simulation_log["started_at"]).total_seconds()
         
         # Salvar simulação no Firestore
-        db_firestore.collection('payment_simulations').document(simulation_id).set(simulation_log)
+        await db_firestore.collection('payment_simulations').document(simulation_id).set(simulation_log)
         
         return {
             "success": True,
@@ -1490,7 +1414,7 @@ async def test_google_pay_complete_flow():
             "is_test": True
         }
         
-        db_firestore.collection('payment_transactions').document(transaction_data["id"]).set(transaction_data)
+        await db_firestore.collection('payment_transactions').document(transaction_data["id"]).set(transaction_data)
         
         return {
             "success": True,
@@ -1551,7 +1475,7 @@ async def stripe_webhook_debug(request: Request):
             "processed": True
         }
         
-        db_firestore.collection('webhook_logs').add(webhook_log)
+        await db_firestore.collection('webhook_logs').add(webhook_log)
         
         return {"received": True, "result": webhook_result}
         
@@ -1566,7 +1490,7 @@ async def stripe_webhook_debug(request: Request):
         }
         
         try:
-            db_firestore.collection('webhook_logs').add(error_log)
+            await db_firestore.collection('webhook_logs').add(error_log)
         except:
             pass  # Não falhar se não conseguir salvar log
         
@@ -1585,7 +1509,7 @@ async def get_payment_analytics(days: int = 7):
         
         # Buscar transações
         transactions_ref = db_firestore.collection('payment_transactions')
-        docs = transactions_ref.where('created_at', '>=', start_date).stream()
+        docs = await transactions_ref.where('created_at', '>=', start_date).get()
         
         transactions = []
         for doc in docs:
@@ -1789,12 +1713,12 @@ async def create_paypal_payment(payment_request: PaymentRequest):
         raise HTTPException(status_code=503, detail="PayPal não está disponível")
     
     try:
-        booking_doc = db_firestore.collection('bookings').document(payment_request.booking_id).get()
+        booking_doc = await db_firestore.collection('bookings').document(payment_request.booking_id).get()
         if not booking_doc.exists:
             raise HTTPException(status_code=404, detail="Reserva não encontrada")
         
         booking_data = booking_doc.to_dict()
-        tour_doc = db_firestore.collection('tours').document(payment_request.tour_id).get()
+        tour_doc = await db_firestore.collection('tours').document(payment_request.tour_id).get()
         if not tour_doc.exists:
             raise HTTPException(status_code=404, detail="Tour não encontrado")
         
@@ -1809,7 +1733,7 @@ async def create_paypal_payment(payment_request: PaymentRequest):
             "cancel_url": payment_request.cancel_url
         }
         
-        payment_result = paypal_service.create_payment(paypal_data)
+        payment_result = await run_blocking(paypal_service.create_payment, paypal_data)
         transaction = PaymentTransaction(
             payment_id=payment_result["payment_id"],
             booking_id=payment_request.booking_id,
@@ -1824,7 +1748,7 @@ async def create_paypal_payment(payment_request: PaymentRequest):
         )
         
         transaction_dict = transaction.dict()
-        db_firestore.collection('payment_transactions').document(transaction_dict['id']).set(transaction_dict)
+        await db_firestore.collection('payment_transactions').document(transaction_dict['id']).set(transaction_dict)
         
         return PaymentResponse(
             payment_id=payment_result["payment_id"],
@@ -1847,7 +1771,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
         print(f"💰 Executando pagamento PayPal: {payment_id}")
         
         # Buscar transação
-        transaction_docs = db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).stream()
+        transaction_docs = await db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).get()
         transaction_doc = None
         for doc in transaction_docs:
             transaction_doc = doc
@@ -1862,7 +1786,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
             return {"message": "Pagamento já processado", "status": "completed"}
         
         # Executar pagamento
-        execution_result = paypal_service.execute_payment(payment_id, execution.payer_id)
+        execution_result = await run_blocking(paypal_service.execute_payment, payment_id, execution.payer_id)
         
         # Atualizar transação
         update_data = {
@@ -1873,7 +1797,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
             "completed_at": datetime.utcnow()
         }
         
-        db_firestore.collection('payment_transactions').document(transaction_doc.id).update(update_data)
+        await db_firestore.collection('payment_transactions').document(transaction_doc.id).update(update_data)
         
         # ✅ NOVO: BLOQUEAR DATA APÓS PAGAMENTO PAYPAL CONFIRMADO
         booking_id = transaction_data.get("booking_id")
@@ -1882,7 +1806,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
         if booking_id and tour_id:
             # Buscar dados da reserva
             booking_ref = db_firestore.collection('bookings').document(booking_id)
-            booking_doc = booking_ref.get()
+            booking_doc = await booking_ref.get()
             
             if booking_doc.exists:
                 booking_data = booking_doc.to_dict()
@@ -1890,7 +1814,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
                 
                 # ✅ MARCAR DATA COMO OCUPADA
                 if selected_date:
-                    success = handle_successful_payment(booking_id, tour_id, selected_date)
+                    success = await handle_successful_payment(booking_id, tour_id, selected_date)
                     print(f"🔒 Data bloqueada: {success}")
                 
                 # Atualizar reserva
@@ -1900,7 +1824,7 @@ async def execute_paypal_payment(payment_id: str, execution: PaymentExecution):
                     "payment_transaction_id": execution_result.get("transaction_id"),
                     "updated_at": datetime.utcnow()
                 }
-                booking_ref.update(booking_update)
+                await booking_ref.update(booking_update)
         
         return execution_result
         
@@ -1917,12 +1841,12 @@ async def get_paypal_payment_status(payment_id: str):
         raise HTTPException(status_code=503, detail="PayPal não está disponível")
     
     try:
-        payment_details = paypal_service.get_payment_details(payment_id)
-        transaction_docs = db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).stream()
+        payment_details = await run_blocking(paypal_service.get_payment_details, payment_id)
+        transaction_docs = await db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).get()
         for doc in transaction_docs:
             current_data = doc.to_dict()
             if current_data.get("status") != payment_details["status"]:
-                db_firestore.collection('payment_transactions').document(doc.id).update({
+                await db_firestore.collection('payment_transactions').document(doc.id).update({
                     "status": payment_details["status"],
                     "updated_at": datetime.utcnow()
                 })
@@ -1949,7 +1873,7 @@ async def paypal_webhook(request: Request):
             payment_id = resource.get('parent_payment')
             
             if payment_id:
-                transaction_docs = db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).stream()
+                transaction_docs = await db_firestore.collection('payment_transactions').where('payment_id', '==', payment_id).get()
                 for doc in transaction_docs:
                     transaction_data = doc.to_dict()
                     
@@ -1960,17 +1884,17 @@ async def paypal_webhook(request: Request):
                     if booking_id and tour_id:
                         # Buscar dados da reserva
                         booking_ref = db_firestore.collection('bookings').document(booking_id)
-                        booking_doc = booking_ref.get()
+                        booking_doc = await booking_ref.get()
                         
                         if booking_doc.exists:
                             booking_data = booking_doc.to_dict()
                             selected_date = booking_data.get('selected_date')
                             
                             if selected_date:
-                                success = handle_successful_payment(booking_id, tour_id, selected_date)
+                                success = await handle_successful_payment(booking_id, tour_id, selected_date)
                                 print(f"🔗 PayPal Webhook - Data bloqueada: {success}")
                     
-                    db_firestore.collection('payment_transactions').document(doc.id).update({
+                    await db_firestore.collection('payment_transactions').document(doc.id).update({
                         "status": "completed",
                         "webhook_received_at": datetime.utcnow()
                     })
@@ -2011,7 +1935,7 @@ async def get_all_payments_detailed():
     """✅ Retorna todos os pagamentos com detalhes e segurança (PayPal, Stripe, Google Pay)"""
     try:
         transactions_ref = db_firestore.collection('payment_transactions')
-        docs = transactions_ref.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+        docs = await transactions_ref.order_by('created_at', direction=firestore.Query.DESCENDING).get()
         
         payments = []
         for doc in docs:
@@ -2052,39 +1976,50 @@ async def get_all_payments_detailed():
 # BOOKING API ENDPOINTS
 # ================================
 @api_router.post("/bookings", response_model=Booking)
-async def create_booking(booking_data: BookingCreate):
-    """Create a new booking"""
+async def create_booking(booking_data: BookingCreate, response: Response,
+                         idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)):
+    """Create a new booking (retries with the same Idempotency-Key return the first booking)"""
+    async def create():
+        placed = await place_booking(
+            booking_data.tour_id, booking_data.selected_date, booking_data.participants, {
+                "name": booking_data.customer_name,
+                "email": booking_data.customer_email,
+                "phone": booking_data.customer_phone,
+                "special_requests": booking_data.special_requests,
+                "payment_method": booking_data.payment_method,
+            }
+        )
+        return 200, jsonable_encoder(Booking(**placed["booking"]))
+
     try:
-        tour_doc_ref = db_firestore.collection('tours').document(booking_data.tour_id)
-        tour_doc = tour_doc_ref.get()
-        if not tour_doc.exists or not tour_doc.to_dict().get('active'):
-            raise HTTPException(status_code=404, detail="Tour not found or inactive")
-        tour = tour_doc.to_dict()
-        
-        tour_availability = tour.get("availability_dates", [])
-        if not tour_availability:
-            tour_availability = [(datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30)]
-
-        if booking_data.selected_date not in tour_availability:
-            raise HTTPException(status_code=400, detail="Selected date is not available")
-            
-        total_amount = tour["price"] * booking_data.participants
-        booking = Booking(**booking_data.dict(), total_amount=total_amount)
-        booking_dict = booking.dict()
-        booking_id = booking_dict['id']
-        db_firestore.collection('bookings').document(booking_id).set(booking_dict)
-        
-        return booking
+        result = await idempotency_store.run("bookings.create", idempotency_key, booking_data.dict(), create)
+        if result["replayed"]:
+            response.headers[REPLAYED_HEADER] = "true"
+        return result["body"]
+    except (BookingRejected, IdempotencyError) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@api_router.get("/bookings", response_model=List[Booking])
+class BookingPage(BaseModel):
+    items: List[Booking]
+    next_cursor: Optional[str] = None
+
+@api_router.get("/bookings", response_model=Union[List[Booking], BookingPage])
 async def get_bookings(
     status: Optional[str] = Query(None, description="Filter by booking status"),
     tour_id: Optional[str] = Query(None, description="Filter by tour ID"),
-    customer_email: Optional[str] = Query(None, description="Filter by customer email")
+    customer_email: Optional[str] = Query(None, description="Filter by customer email"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (enables pagination)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
-    """Get all bookings with filters"""
+    """Get all bookings with filters
+
+    With limit/cursor the result is a page ordered by created_at (newest first)
+    using Firestore start_after, so memory and latency stay bounded. V1 bookings
+    that only have createdAt need POST /api/admin/backfill-booking-created-at once;
+    the filtered pages use the composite indexes in frontend/firestore.indexes.json.
+    """
     try:
         query = db_firestore.collection('bookings')
         if status:
@@ -2093,13 +2028,39 @@ async def get_bookings(
             query = query.where('tour_id', '==', tour_id)
         if customer_email:
             query = query.where('customer_email', '==', customer_email)
-        docs = query.stream()
-        bookings_list = []
-        for doc in docs:
+
+        if limit is None and cursor is None:
+            docs = await query.get()
+            bookings_list = []
+            for doc in docs:
+                booking_data = doc.to_dict()
+                booking_data['id'] = doc.id
+                bookings_list.append(Booking(**booking_data))
+            return bookings_list
+
+        page_size = limit or DEFAULT_PAGE_SIZE
+        query = query.order_by('created_at', direction=firestore.Query.DESCENDING) \
+                     .order_by('__name__', direction=firestore.Query.DESCENDING)
+        if cursor:
+            after = decode_cursor(cursor)
+            query = query.start_after({'created_at': after.get('created_at'), '__name__': after.get('id')})
+
+        # Pedir um documento a mais para saber se existe página seguinte
+        docs = await query.limit(page_size + 1).get()
+        page_docs = docs[:page_size]
+        items = []
+        for doc in page_docs:
             booking_data = doc.to_dict()
             booking_data['id'] = doc.id
-            bookings_list.append(Booking(**booking_data))
-        return bookings_list
+            items.append(Booking(**booking_data))
+
+        next_cursor = None
+        if len(docs) > page_size:
+            last = page_docs[-1]
+            next_cursor = encode_cursor({"created_at": last.get('created_at'), "id": last.id})
+        return BookingPage(items=items, next_cursor=next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2110,7 +2071,7 @@ async def get_bookings(
 async def get_booking(booking_id: str):
     """Get specific booking by ID - VERSÃO CORRIGIDA"""
     try:
-        booking_doc = db_firestore.collection('bookings').document(booking_id).get()
+        booking_doc = await db_firestore.collection('bookings').document(booking_id).get()
         if not booking_doc.exists:
             raise HTTPException(status_code=404, detail="Booking not found")
         booking_data = booking_doc.to_dict()
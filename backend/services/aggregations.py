@@ -0,0 +1,74 @@
+# backend/services/aggregations.py
+# Contagens calculadas no servidor (aggregation query count()):
+# o Firestore cobra uma leitura por cada 1000 entradas de índice e não transfere
+# documentos, por isso contar custa poucas leituras seja qual for o volume.
+# À frente fica um cache curto (AGGREGATION_TTL_SECONDS) que também junta os
+# pedidos simultâneos da mesma chave num único cálculo.
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Os números servem páginas e estatísticas: alguns segundos de atraso são aceitáveis
+AGGREGATION_TTL_SECONDS = 60
+
+
+async def count_documents(query) -> int:
+    """Contagem no servidor (aggregation count) sem transferir os documentos"""
+    results = await query.count(alias="count").get()
+    return int(results[0][0].value or 0)
+
+
+class AggregationCache:
+    def __init__(self, ttl_seconds: int = AGGREGATION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._values: Dict[Any, Tuple[float, Any]] = {}
+        self._inflight: Dict[Any, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key, compute: Callable[[], Awaitable[Any]], ttl_seconds: Optional[int] = None) -> Any:
+        """Valor em cache da chave ou compute(); pedidos simultâneos esperam pelo mesmo cálculo"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        cached = self._values.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            self.hits += 1
+            return cached[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Sem pedidos à espera, o erro não fica por recolher
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._values[key] = (time.monotonic(), value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key=None):
+        """Esquecer uma chave (ou tudo)"""
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._values), "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
+
+
+# Instância global
+aggregation_cache = AggregationCache()
@@ -0,0 +1,219 @@
+# backend/services/availability_prewarm.py
+# Disponibilidade pré-calculada de todos os tours ativos para os próximos
+# HORIZON_DAYS dias. Um thread em segundo plano recalcula só os tours
+# alterados no catálogo (as reservas confirmadas mudam occupied_dates do
+# tour), todos quando o Google Calendar muda ou o dia avança, e tudo a cada
+# REFRESH_SECONDS. Os endpoints leem o resultado e indicam a sua idade.
+# Nada é calculado antes da primeira sincronização do Google Calendar.
+
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from services.tour_calendar import AVAILABLE, availability_row, calendar_bitmaps
+from services.tour_catalog import tour_catalog
+from utils.google_calendar import calendar_cache, get_calendar_availability
+from utils.slot_availability import BusyIntervals, available_slots, normalize_schedule
+
+logger = logging.getLogger(__name__)
+
+HORIZON_DAYS = 90
+REFRESH_SECONDS = 300
+
+
+def compute_tour_availability(tour: Dict[str, Any], busy: BusyIntervals, calendar_dates: List[str],
+                              start: date, end: date) -> Dict[str, Any]:
+    """Disponibilidade de um tour em [start, end]: linha A/O/X, datas reserváveis e horários livres.
+
+    Com available_dates, as datas reserváveis são essas menos as ocupadas; sem
+    elas, os dias do Google Calendar (calendar_dates) menos as ocupadas.
+    """
+    occupied, available = calendar_bitmaps(tour)
+    row = availability_row(occupied, available, start, end)
+    if available is not None:
+        dates = [(start + timedelta(days=index)).isoformat() for index, state in enumerate(row) if state == AVAILABLE]
+    else:
+        dates = [day for day in calendar_dates if day not in occupied]
+
+    slots = []
+    schedule = tour.get("availability_schedule")
+    if schedule:
+        slots = [slot for slot in available_slots(normalize_schedule(schedule), busy, start, end)
+                 if slot["date"] not in occupied]
+
+    return {"row": row, "dates": dates, "slots": slots, "scheduled": bool(schedule), "computed_at": time.time()}
+
+
+class AvailabilityPrewarmer:
+    def __init__(self, catalog, calendar, horizon_days: int = HORIZON_DAYS, refresh_seconds: int = REFRESH_SECONDS):
+        """Inicializar (o thread só arranca em start())"""
+        self._catalog = catalog
+        self._calendar = calendar
+        self.horizon_days = horizon_days
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dirty: Set[str] = set()
+        self._all_dirty = True
+        self._refreshing = False
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._start_day: Optional[date] = None
+
+        self.refreshes = 0
+        self.tours_computed = 0
+        self.last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida do thread
+    # ------------------------------------------------------------------
+    def start(self):
+        """Ligar o thread de pré-cálculo (o primeiro cálculo é imediato)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, name="availability-prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._wake.wait(self.refresh_seconds):
+                self._all_dirty = True  # Refrescamento periódico
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.refresh()
+
+    # ------------------------------------------------------------------
+    # Invalidação
+    # ------------------------------------------------------------------
+    def on_catalog_change(self, catalog, changed_ids: Set[str]):
+        """Listener do catálogo: recalcular só os tours alterados"""
+        with self._lock:
+            self._dirty.update(changed_ids)
+        self._wake.set()
+
+    def on_calendar_change(self, calendar):
+        """Listener do Google Calendar: os eventos afetam todos os tours"""
+        self._all_dirty = True
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+    def horizon(self):
+        start = date.today()
+        return start, start + timedelta(days=self.horizon_days - 1)
+
+    def refresh(self) -> int:
+        """Recalcular os tours pendentes; devolve quantos foram calculados"""
+        if not self._catalog.is_fresh():
+            return 0  # Sem catálogo em memória; tenta-se de novo no próximo ciclo
+        if not self._calendar.is_ready():
+            # Antes da primeira sincronização o calendário parece vazio: nada é
+            # marcado como atual; a sincronização acorda o thread (on_calendar_change)
+            return 0
+
+        start, end = self.horizon()
+        with self._lock:
+            full = self._all_dirty or self._start_day != start
+            dirty, self._dirty, self._all_dirty = set(self._dirty), set(), False
+            self._refreshing = True
+
+        try:
+            active = {tour["id"]: tour for tour in self._catalog.list_tours(active_only=True)}
+            tour_ids = set(active) if full else dirty
+            busy = self._calendar.busy_intervals()
+            calendar_dates = get_calendar_availability(start.isoformat(), end.isoformat(), cache=self._calendar)
+
+            computed = {tour_id: compute_tour_availability(active[tour_id], busy, calendar_dates, start, end)
+                        for tour_id in tour_ids if tour_id in active}
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ Erro no pré-cálculo da disponibilidade: {e}")
+            with self._lock:
+                self._dirty.update(dirty)
+                self._all_dirty = self._all_dirty or full
+                self._refreshing = False
+            return 0
+
+        with self._lock:
+            if full:
+                self._results = computed
+            else:
+                for tour_id in tour_ids:
+                    if tour_id in computed:
+                        self._results[tour_id] = computed[tour_id]
+                    else:
+                        self._results.pop(tour_id, None)  # Removido ou inativo
+            self._start_day = start
+            self._refreshing = False
+
+        self.refreshes += 1
+        self.tours_computed += len(computed)
+        self.last_error = None
+        return len(computed)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def is_current(self) -> bool:
+        """Sem alterações pendentes: o resultado corresponde ao catálogo e ao calendário atuais"""
+        with self._lock:
+            return (not self._dirty and not self._all_dirty and not self._refreshing
+                    and self._start_day == date.today())
+
+    def covers(self, first_day: date, last_day: date) -> bool:
+        """A janela está dentro do horizonte pré-calculado e o resultado está em dia?"""
+        start = self._start_day
+        return (start is not None and start <= first_day
+                and last_day < start + timedelta(days=self.horizon_days) and self.is_current())
+
+    def get(self, tour_id: str, first_day: date, last_day: date) -> Optional[Dict[str, Any]]:
+        """Resultado de um tour recortado a [first_day, last_day], ou None se não estiver pré-calculado"""
+        if not self.covers(first_day, last_day):
+            return None
+        with self._lock:
+            result, start = self._results.get(tour_id), self._start_day
+        if result is None:
+            return None
+        first, last = first_day.isoformat(), last_day.isoformat()
+        offset = (first_day - start).days
+        return {
+            "row": result["row"][offset:offset + (last_day - first_day).days + 1],
+            "dates": [day for day in result["dates"] if first <= day <= last],
+            "slots": [slot for slot in result["slots"] if first <= slot["date"] <= last],
+            "scheduled": result["scheduled"],
+            "computed_at": result["computed_at"],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tours": len(self._results),
+            "horizon_start": self._start_day.isoformat() if self._start_day else None,
+            "horizon_days": self.horizon_days,
+            "refreshes": self.refreshes,
+            "tours_computed": self.tours_computed,
+            "last_error": self.last_error,
+        }
+
+
+def age_seconds(computed_at: float) -> float:
+    return round(max(time.time() - computed_at, 0.0), 1)
+
+
+# Instância global, ligada ao catálogo e ao Google Calendar
+availability_prewarmer = AvailabilityPrewarmer(tour_catalog, calendar_cache)
+tour_catalog.add_listener(availability_prewarmer.on_catalog_change)
+calendar_cache.add_listener(availability_prewarmer.on_calendar_change)
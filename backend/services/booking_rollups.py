@@ -0,0 +1,169 @@
+# backend/services/booking_rollups.py
+# Contadores agregados das reservas, atualizados em cada criação e em cada
+# mudança de estado (incluindo a confirmação pelo pagamento), no mesmo commit:
+#   booking_rollups_daily/{YYYY-MM-DD} = {date, total_bookings, total_revenue,
+#                                         by_tour: {tour_id: n}, by_status: {estado: n}}
+#   booking_rollups_tours/{tour_id}    = {tour_id, total_bookings, total_revenue,
+#                                         by_date: {data: n}, by_status: {estado: n}}
+# A data é a do tour (selected_date). A receita soma total_amount das reservas
+# em REVENUE_STATUSES. As estatísticas juntam estes documentos pequenos (um por
+# dia do intervalo, ou um por tour) e nunca leem as reservas.
+#
+# Cada alteração vai para um de ROLLUP_SHARDS documentos ({id} ou {id}__{1..}),
+# escolhido ao acaso: as reservas de uma data ou de um tour populares não
+# disputam um só documento. Os contadores são somas, por isso a leitura junta
+# os shards sem passos extra (merge_rollups); a reconstrução volta a pôr tudo
+# no documento principal.
+
+import random
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.cloud import firestore
+
+from config.firestore_db import async_db as db_firestore
+
+DAILY_ROLLUPS_COLLECTION = "booking_rollups_daily"
+TOUR_ROLLUPS_COLLECTION = "booking_rollups_tours"
+ROLLUP_SHARDS = 5
+# Estados cuja reserva conta para a receita
+REVENUE_STATUSES = {"confirmed", "completed"}
+# Estado das reservas antigas sem campo status
+UNKNOWN_STATUS = "unknown"
+
+
+def booking_amount(booking: Dict) -> float:
+    return float(booking.get('total_amount') or 0)
+
+
+def rollup_id(key: str, shard: int = 0) -> str:
+    """Id do documento principal (a data ou o tour_id) ou de um dos seus shards"""
+    return key if shard == 0 else f"{key}__{shard}"
+
+
+def record_rollup_change(writer, tour_id: str, date_key: str, amount: float,
+                         previous_status: Optional[str], new_status: str):
+    """Acrescentar a um batch ou transação a criação (previous_status=None) ou a
+    mudança de estado de uma reserva (set com merge + Increment, sem leitura)"""
+    if previous_status == new_status:
+        return
+    by_status: Dict[str, Any] = {new_status: firestore.Increment(1)}
+    if previous_status is not None:
+        by_status[previous_status] = firestore.Increment(-1)
+
+    daily: Dict[str, Any] = {"date": date_key, "by_status": by_status, "updated_at": datetime.utcnow()}
+    tour: Dict[str, Any] = {"tour_id": tour_id, "by_status": dict(by_status), "updated_at": datetime.utcnow()}
+    if previous_status is None:
+        daily["total_bookings"] = firestore.Increment(1)
+        daily["by_tour"] = {tour_id: firestore.Increment(1)}
+        tour["total_bookings"] = firestore.Increment(1)
+        tour["by_date"] = {date_key: firestore.Increment(1)}
+
+    revenue = amount * ((new_status in REVENUE_STATUSES) - (previous_status in REVENUE_STATUSES))
+    if revenue:
+        daily["total_revenue"] = firestore.Increment(revenue)
+        tour["total_revenue"] = firestore.Increment(revenue)
+
+    writer.set(db_firestore.collection(DAILY_ROLLUPS_COLLECTION)
+               .document(rollup_id(date_key, random.randrange(ROLLUP_SHARDS))), daily, merge=True)
+    writer.set(db_firestore.collection(TOUR_ROLLUPS_COLLECTION)
+               .document(rollup_id(tour_id, random.randrange(ROLLUP_SHARDS))), tour, merge=True)
+
+
+def _add_counts(target: Dict[str, int], counts: Optional[Dict[str, Any]]):
+    for key, value in (counts or {}).items():
+        if value:
+            target[key] += value
+
+
+def merge_rollups(daily: Iterable[Dict[str, Any]] = (), tours: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """Campos de BookingStats a partir de documentos diários ou por tour (um dos dois;
+    vários shards do mesmo dia ou tour somam-se)"""
+    total_bookings, total_revenue = 0, 0.0
+    by_tour: Dict[str, int] = defaultdict(int)
+    by_date: Dict[str, int] = defaultdict(int)
+    by_status: Dict[str, int] = defaultdict(int)
+    for doc in daily:
+        total_bookings += doc.get("total_bookings", 0)
+        total_revenue += doc.get("total_revenue", 0)
+        if doc.get("total_bookings"):
+            by_date[doc["date"]] += doc["total_bookings"]
+        _add_counts(by_tour, doc.get("by_tour"))
+        _add_counts(by_status, doc.get("by_status"))
+    for doc in tours:
+        total_bookings += doc.get("total_bookings", 0)
+        total_revenue += doc.get("total_revenue", 0)
+        if doc.get("total_bookings"):
+            by_tour[doc["tour_id"]] += doc["total_bookings"]
+        _add_counts(by_date, doc.get("by_date"))
+        _add_counts(by_status, doc.get("by_status"))
+    return {
+        "total_bookings": total_bookings,
+        "total_revenue": round(total_revenue, 2),
+        "bookings_by_tour": dict(by_tour),
+        "bookings_by_date": dict(sorted(by_date.items())),
+        "bookings_by_status": dict(by_status),
+    }
+
+
+async def load_rollups(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       tour_id: Optional[str] = None) -> Dict[str, Any]:
+    """Estatísticas de um intervalo de datas (documentos diários), de um tour (os
+    seus shards, num get_all) ou de tudo (documentos por tour). Intervalo e tour não se combinam:
+    os documentos diários só guardam a contagem de cada tour, não o estado nem a receita."""
+    if start_date or end_date:
+        if tour_id:
+            raise ValueError("Use um intervalo de datas ou um tour, não os dois")
+        for value in filter(None, (start_date, end_date)):
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Data inválida: {value}. Use YYYY-MM-DD.")
+        query = db_firestore.collection(DAILY_ROLLUPS_COLLECTION)
+        if start_date:
+            query = query.where("date", ">=", start_date)
+        if end_date:
+            query = query.where("date", "<=", end_date)
+        return merge_rollups(daily=[doc.to_dict() async for doc in query.stream()])
+
+    if tour_id:
+        refs = [db_firestore.collection(TOUR_ROLLUPS_COLLECTION).document(rollup_id(tour_id, shard))
+                for shard in range(ROLLUP_SHARDS)]
+        return merge_rollups(tours=[doc.to_dict() async for doc in db_firestore.get_all(refs) if doc.exists])
+    return merge_rollups(tours=[doc.to_dict() async for doc in db_firestore.collection(TOUR_ROLLUPS_COLLECTION).stream()])
+
+
+def build_rollup_documents(bookings: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Documentos principais completos (sem shards) a partir de reservas já
+    normalizadas ({tour_id, date, status, amount}): {"daily": {...}, "tours": {...}}"""
+    now = datetime.utcnow()
+    daily: Dict[str, Dict[str, Any]] = {}
+    tours: Dict[str, Dict[str, Any]] = {}
+    for booking in bookings:
+        tour_id, date_key, status = booking["tour_id"], booking["date"], booking["status"]
+        revenue = booking["amount"] if status in REVENUE_STATUSES else 0
+        day = daily.setdefault(date_key, {"date": date_key, "total_bookings": 0, "total_revenue": 0.0,
+                                          "by_tour": defaultdict(int), "by_status": defaultdict(int)})
+        tour = tours.setdefault(tour_id, {"tour_id": tour_id, "total_bookings": 0, "total_revenue": 0.0,
+                                          "by_date": defaultdict(int), "by_status": defaultdict(int)})
+        for doc in (day, tour):
+            doc["total_bookings"] += 1
+            doc["total_revenue"] += revenue
+            doc["by_status"][status] += 1
+        day["by_tour"][tour_id] += 1
+        tour["by_date"][date_key] += 1
+
+    for doc in list(daily.values()) + list(tours.values()):
+        for key, value in doc.items():
+            if isinstance(value, defaultdict):
+                doc[key] = dict(value)
+        doc["updated_at"] = now
+    return {"daily": daily, "tours": tours}
+
+
+async def existing_rollup_ids() -> Dict[str, List[str]]:
+    return {
+        "daily": [doc.id async for doc in db_firestore.collection(DAILY_ROLLUPS_COLLECTION).select([]).stream()],
+        "tours": [doc.id async for doc in db_firestore.collection(TOUR_ROLLUPS_COLLECTION).select([]).stream()],
+    }
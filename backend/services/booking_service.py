@@ -1,70 +1,650 @@
-from config.firestore_db import db as db_firestore
-from datetime import datetime
+from config.firestore_db import async_db as db_firestore
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+from datetime import date, datetime
 from models.booking import BookingCreate, Booking
-from typing import Dict
-import uuid # Adicionado uuid
+from services.booking_rollups import (
+    DAILY_ROLLUPS_COLLECTION, TOUR_ROLLUPS_COLLECTION, UNKNOWN_STATUS, booking_amount, build_rollup_documents,
+    existing_rollup_ids, record_rollup_change
+)
+from services.capacity_service import (
+    CAPACITY_COLLECTION, CapacityExceeded, capacity_ref, get_capacity, release_in_transaction, reserve_in_transaction,
+    shard_refs
+)
+from services.idempotency import idempotency_store
+from services.tour_availability import (
+    AVAILABILITY_COLLECTION, booking_participants, build_month_documents, record_day_change
+)
+from services.tour_calendar import calendar_bitmaps
+from services.tour_catalog import get_tours_by_ids
+from typing import Dict, Iterable, List, Optional
 from fastapi import HTTPException
 
 
-def create_booking(booking_data: BookingCreate) -> Dict:
+# ================================
+# 🧾 PIPELINE ÚNICO DE CRIAÇÃO DE RESERVAS
+# ================================
+# Todos os endpoints de criação são adaptadores de place_booking: validação,
+# disponibilidade e escrita com um só esquema de reserva:
+#   {id, tour_id, selected_date 'YYYY-MM-DD', participants, customer_name,
+#    customer_email, customer_phone, special_requests, payment_method,
+#    total_amount, status, payment_status, source, created_at, updated_at}
+# Reservas antigas (tourId/dateString/numParticipants) continuam a ser lidas
+# por booking_tour_id, booking_date_key e booking_participants.
+
+class BookingRejected(Exception):
+    """Pedido de reserva recusado (status_code HTTP e mensagem para o cliente)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_selected_date(value: str) -> str:
+    """'YYYY-MM-DD' ou data ISO 8601 -> 'YYYY-MM-DD' (BookingRejected se inválida)"""
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        raise BookingRejected(400, f"Formato de data inválido: {value}. Use YYYY-MM-DD ou ISO 8601.")
+
+
+# Vaga exclusiva de cada data (tours sem lotação): booking_slots/{tour_id}_{data} =
+#   {tour_id, date, booking_id, created_at}
+# É o único cadeado da data: create() na reserva confirmada direta e leitura na
+# transação de confirmação (pagamento, admin); apagada quando a reserva deixa de
+# ocupar a data. Reservas antigas sem vaga são cobertas por repair_occupied_dates.
+SLOTS_COLLECTION = "booking_slots"
+
+
+def slot_id(tour_id: str, date_key: str) -> str:
+    return f"{tour_id}_{date_key}"
+
+
+def slot_ref(tour_id: str, date_key: str):
+    return db_firestore.collection(SLOTS_COLLECTION).document(slot_id(tour_id, date_key))
+
+
+def slot_document(tour_id: str, date_key: str, booking_id: str) -> Dict:
+    return {"tour_id": tour_id, "date": date_key, "booking_id": booking_id, "created_at": datetime.utcnow()}
+
+
+def booking_occupies(booking: Dict) -> bool:
+    """A reserva ocupa a data? (reservas antigas sem status contam como ocupadas)"""
+    return booking.get('status', 'confirmed') in OCCUPYING_STATUSES
+
+
+async def _create_exclusive_booking(booking_ref, tour_ref, booking: Dict) -> bool:
+    """Reserva exclusiva confirmada: vaga, reserva, occupied_dates e contadores num só commit.
+
+    create() só escreve se a vaga '{tour_id}_{data}' não existir: o conflito é
+    detetado pelo servidor numa única ida ao Firestore, sem leitura, transação
+    nem novas tentativas. occupied_dates e o documento mensal vão com
+    ArrayUnion/Increment, sem pré-condição no tour (reservas de outras datas não
+    se invalidam). False se a data já estiver tomada; o batch é atómico.
+    """
+    tour_id, date_key = booking['tour_id'], booking['selected_date']
+    batch = db_firestore.batch()
+    batch.create(slot_ref(tour_id, date_key), slot_document(tour_id, date_key, booking_ref.id))
+    batch.create(booking_ref, booking)
+    batch.update(tour_ref, {
+        'occupied_dates': firestore.ArrayUnion([date_key]),
+        'updated_at': datetime.utcnow()
+    })
+    record_day_change(batch, tour_id, date_key, 1, booking['participants'], occupied=True)
+    record_rollup_change(batch, tour_id, date_key, booking['total_amount'], None, booking['status'])
+    try:
+        await batch.commit()
+    except AlreadyExists:
+        return False
+    return True
+
+
+@firestore.async_transactional
+async def _create_capacity_booking(transaction, booking_ref, booking: Dict, max_participants: int):
+    """Reserva confirmada num tour com lotação: lugares nos shards, reserva, documento
+    mensal, contadores e, se a data encher, a vista de lotação e occupied_dates num só
+    commit (os contadores também vão para shards, por isso reservas simultâneas da
+    mesma data não voltam a concentrar-se num documento)"""
+    tour_id, date_key = booking['tour_id'], booking['selected_date']
+    booking['capacityShards'], full = await reserve_in_transaction(
+        transaction, tour_id, date_key, max_participants, booking['participants'])
+    transaction.set(booking_ref, booking)
+    record_day_change(transaction, tour_id, date_key, 1, booking['participants'], occupied=True if full else None)
+    record_rollup_change(transaction, tour_id, date_key, booking['total_amount'], None, booking['status'])
+
+
+async def _capacity_after_commit(tour_id: str, date_key: str, max_participants: Optional[int]) -> Optional[Dict]:
+    """Lotação da data para a resposta (só leitura; a vista já foi gravada no commit).
+    Uma falha aqui não pode falhar o pedido: a reserva já está gravada e, com
+    Idempotency-Key, a repetição criaria outra reserva."""
+    if not max_participants:
+        return None
     try:
-        tour_doc = db_firestore.collection('tours').document(booking_data.tour_id).get()
-        if not tour_doc.exists:
-            raise ValueError("Tour não encontrado")
-        
-        tour = tour_doc.to_dict()
-        total_amount = tour["price"] * booking_data.participants
-        
-        booking_id = str(uuid.uuid4())
-        booking_dict = {
-            "id": booking_id,
-            "tour_id": booking_data.tour_id,
-            "customer_name": booking_data.customer_name,
-            "customer_email": booking_data.customer_email,
-            "customer_phone": booking_data.customer_phone,
-            "selected_date": booking_data.selected_date,
-            "participants": booking_data.participants,
-            "total_amount": total_amount,
-            "special_requests": booking_data.special_requests,
-            "payment_method": booking_data.payment_method,
-            "status": "pending",
-            "payment_status": "pending",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        db_firestore.collection('bookings').document(booking_id).set(booking_dict)
-        return booking_dict
+        return await get_capacity(tour_id, date_key, max_participants)
     except Exception as e:
-        raise ValueError(str(e))
+        print(f"❌ Erro ao ler a lotação de {tour_id} em {date_key}: {e}")
+        return None
 
-def handle_successful_payment(booking_id: str, tour_id: str, selected_date: str) -> bool:
+
+def date_rejection(tour: Optional[Dict], date_key: str, occupied_days: Iterable[str] = ()) -> Optional[BookingRejected]:
+    """Porque é que a data não se pode reservar (None se pode), a partir do tour do
+    catálogo: data passada, tour inativo, fora de available_dates ou já ocupada.
+    occupied_days junta outras datas ocupadas conhecidas (ex.: de tour_availability).
+    Usada por place_booking e pelas verificações de disponibilidade."""
+    if date.fromisoformat(date_key) < date.today():
+        return BookingRejected(400, f"A data {date_key} já passou.")
+    if not tour or not tour.get('active'):
+        return BookingRejected(404, "Tour não encontrado ou inativo")
+    occupied, available = calendar_bitmaps(tour)
+    if available is not None and date_key not in available:
+        return BookingRejected(400, f"A data {date_key} não está disponível para este tour.")
+    if date_key in occupied or date_key in occupied_days:
+        return BookingRejected(409, f"Esta data ({date_key}) para o tour selecionado já está reservada.")
+    return None
+
+
+async def place_booking(tour_id: str, selected_date: str, participants: int, customer: Dict,
+                        confirm: bool = False, source: str = "api") -> Dict:
+    """Validar, verificar a disponibilidade e gravar uma reserva.
+
+    confirm=False (fluxo de pagamento): reserva pendente, um commit; a data (ou os
+    lugares, em tours com max_participants) só fica ocupada na confirmação
+    (update_booking_status), que volta a verificar a disponibilidade.
+    confirm=True: a reserva ocupa já a data — lugares nos shards em tours com
+    max_participants, senão a vaga exclusiva '{tour_id}_{data}'
+    (_create_exclusive_booking).
+
+    Devolve {"booking": reserva, "capacity": lotação da data ou None}.
+    BookingRejected: 400 pedido inválido, 404 tour inexistente/inativo, 409 data ocupada.
+    """
+    date_key = parse_selected_date(selected_date)
     try:
-        tour_ref = db_firestore.collection('tours').document(tour_id)
-        tour_doc = tour_ref.get()
-        
-        if not tour_doc.exists:
-            return False
-        
-        tour_data = tour_doc.to_dict()
-        occupied_dates = tour_data.get('occupied_dates', [])
-        
-        if selected_date not in occupied_dates:
-            occupied_dates.append(selected_date)
-            tour_ref.update({
-                'occupied_dates': occupied_dates,
-                'updated_at': datetime.utcnow()
-            })
-        
-        # Atualizar booking
-        booking_ref = db_firestore.collection('bookings').document(booking_id)
-        booking_ref.update({
-            'payment_status': "paid",
-            'status': "confirmed",
-            'updated_at': datetime.utcnow()
-        })
-        
+        participants = int(participants)
+    except (TypeError, ValueError):
+        participants = 0
+    if participants < 1:
+        raise BookingRejected(400, "O número de participantes tem de ser pelo menos 1.")
+
+    # Do catálogo em memória (sem ida ao Firestore se o cache estiver pronto)
+    tour = (await get_tours_by_ids([tour_id])).get(tour_id)
+    rejection = date_rejection(tour, date_key)
+    if rejection is not None:
+        raise rejection
+
+    now = datetime.utcnow()
+    booking = {
+        "tour_id": tour_id,
+        "selected_date": date_key,
+        "participants": participants,
+        "customer_name": (customer.get('name') or '').strip(),
+        "customer_email": customer.get('email'),
+        "customer_phone": customer.get('phone'),
+        "special_requests": customer.get('special_requests'),
+        "payment_method": customer.get('payment_method'),
+        "total_amount": float(tour.get('price') or 0) * participants,
+        "status": "confirmed" if confirm else "pending",
+        "payment_status": "pending",
+        "source": source,
+        "created_at": now,
+        "updated_at": now
+    }
+
+    bookings = db_firestore.collection('bookings')
+    capacity = None
+    max_participants = tour.get('max_participants')
+    if confirm and max_participants:
+        booking_ref = bookings.document()
+        booking["id"] = booking_ref.id
+        try:
+            await _create_capacity_booking(db_firestore.transaction(), booking_ref, booking, max_participants)
+        except CapacityExceeded as e:
+            raise BookingRejected(409, f"Não há lugares suficientes em {date_key} (restam {e.remaining}).")
+        capacity = await _capacity_after_commit(tour_id, date_key, max_participants)
+    elif confirm:
+        booking_ref = bookings.document()
+        booking["id"] = booking_ref.id
+        created = await _create_exclusive_booking(booking_ref, db_firestore.collection('tours').document(tour_id), booking)
+        if not created:
+            raise BookingRejected(409, f"Esta data ({date_key}) para o tour selecionado já está reservada.")
+    else:
+        booking_ref = bookings.document()
+        booking["id"] = booking_ref.id
+        batch = db_firestore.batch()
+        batch.set(booking_ref, booking)
+        record_rollup_change(batch, tour_id, date_key, booking['total_amount'], None, booking['status'])
+        await batch.commit()
+
+    return {"booking": booking, "capacity": capacity}
+
+
+async def create_booking(booking_data: BookingCreate, idempotency_key: Optional[str] = None) -> Dict:
+    """Criar uma reserva pendente; com idempotency_key, as repetições devolvem a primeira reserva"""
+    async def create():
+        placed = await place_booking(
+            booking_data.tour_id, booking_data.selected_date, booking_data.participants, {
+                "name": booking_data.customer_name,
+                "email": booking_data.customer_email,
+                "phone": booking_data.customer_phone,
+                "special_requests": booking_data.special_requests,
+                "payment_method": booking_data.payment_method,
+            }
+        )
+        return 201, placed["booking"]
+
+    try:
+        result = await idempotency_store.run("booking_service.create_booking", idempotency_key, booking_data.dict(), create)
+    except BookingRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return result["body"]
+
+async def handle_successful_payment(booking_id: str, tour_id: str, selected_date: str) -> bool:
+    try:
+        # Mesma transição de estado que o admin: tour, reserva e documento mensal
+        # de disponibilidade (tour_availability) atualizados num só commit
+        await update_booking_status(booking_id, "confirmed", {'payment_status': "paid"})
         return True
+    except NotFound:
+        return False
+    except BookingRejected as e:
+        # Pago, mas a data encheu ou foi ocupada entretanto: a reserva fica pendente
+        print(f"❌ Reserva {booking_id} paga sem lugar em {selected_date}: {e.detail}")
+        return False
     except Exception as e:
         print(f"Erro ao handle payment: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+# ================================
+# 🔁 DATAS OCUPADAS A PARTIR DAS TRANSIÇÕES DE ESTADO
+# ================================
+# Estados de reserva que ocupam a data do tour
+OCCUPYING_STATUSES = {"confirmed", "completed"}
+BOOKING_STATUSES = {"pending", "confirmed", "cancelled", "refunded", "completed"}
+# Limite de operações por WriteBatch do Firestore
+MAX_BATCH_WRITES = 500
+
+
+def booking_tour_id(booking: Dict) -> Optional[str]:
+    """tour_id da reserva (os dois formatos de reserva em uso)"""
+    return booking.get('tour_id') or booking.get('tourId')
+
+
+def booking_date_key(booking: Dict) -> Optional[str]:
+    """Data da reserva como 'YYYY-MM-DD'"""
+    value = booking.get('selected_date') or booking.get('dateString') or booking.get('bookingDate')
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    return None
+
+
+def group_occupied_dates(bookings: Iterable[Dict], full_capacity: Iterable[Dict] = ()) -> Dict[str, List[str]]:
+    """{tour_id: [datas ordenadas]} a partir de reservas confirmadas.
+
+    Reservas com lotação (capacityShards) não ocupam a data sozinhas: contam as
+    vistas de lotação esgotada (full_capacity, documentos de tour_date_capacity).
+    """
+    grouped: Dict[str, set] = {}
+    for booking in bookings:
+        if booking.get('capacityShards'):
+            continue
+        tour_id, date_key = booking_tour_id(booking), booking_date_key(booking)
+        if tour_id and date_key:
+            grouped.setdefault(tour_id, set()).add(date_key)
+    for view in full_capacity:
+        grouped.setdefault(view['tour_id'], set()).add(view['date'])
+    return {tour_id: sorted(dates) for tour_id, dates in grouped.items()}
+
+
+async def _date_still_occupied(transaction, tour_id: str, date_key: str, booking_id: Optional[str],
+                               selected_date=None) -> bool:
+    """Outra reserva confirmada ocupa a data? (datas sem vaga: reservas antigas)"""
+    others = db_firestore.collection('bookings') \
+        .where('tour_id', '==', tour_id) \
+        .where('selected_date', '==', selected_date or date_key) \
+        .where('status', 'in', list(OCCUPYING_STATUSES)) \
+        .limit(2)
+    async for other in others.stream(transaction=transaction):
+        if other.id != booking_id:
+            return True
+    # Reservas V1 usam o id '{tour_id}_{data}' em vez do campo selected_date
+    v1_id = f"{tour_id}_{date_key}"
+    if v1_id == booking_id:
+        return False
+    v1_booking = await db_firestore.collection('bookings').document(v1_id).get(transaction=transaction)
+    return v1_booking.exists and booking_occupies(v1_booking.to_dict() or {})
+
+
+@firestore.async_transactional
+async def _transition_booking_status(transaction, booking_ref, new_status: str, extra_fields: Dict) -> Dict:
+    """Mudar o estado da reserva e ocupar/libertar a data do tour na mesma transação.
+
+    Ao passar a ocupar a data (ex.: pendente confirmada pelo pagamento): em tours
+    com max_participants, lugares nos shards; nos outros, a vaga '{tour_id}_{data}'
+    é lida e tomada na transação, o mesmo cadeado do create() das reservas
+    exclusivas. BookingRejected(409) se a data já estiver tomada ou sem lugares.
+    O tour vem do catálogo em memória (max_participants): o documento do tour
+    só é escrito, com ArrayUnion/ArrayRemove, e não fica bloqueado.
+    """
+    snapshot = await booking_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise NotFound("Reserva não encontrada")
+
+    booking = snapshot.to_dict()
+    previous_status = booking.get('status')
+    tour_id, date_key = booking_tour_id(booking), booking_date_key(booking)
+    was_occupying = previous_status in OCCUPYING_STATUSES
+    occupies = new_status in OCCUPYING_STATUSES
+    booking_update = {**extra_fields, 'status': new_status, 'updated_at': datetime.utcnow()}
+
+    tour_update, max_participants = None, None
+    reserved = released = False
+    # Lotação esgotada (True) ou de novo com lugares (False) neste commit
+    capacity_full = None
+    if tour_id and date_key and occupies and not was_occupying:
+        tour = (await get_tours_by_ids([tour_id])).get(tour_id) or {}
+        max_participants = tour.get('max_participants')
+        if max_participants:
+            # A data só fica ocupada quando a lotação esgota (no mesmo commit)
+            try:
+                booking_update['capacityShards'], full = await reserve_in_transaction(
+                    transaction, tour_id, date_key, max_participants, booking_participants(booking))
+            except CapacityExceeded as e:
+                raise BookingRejected(409, f"Não há lugares suficientes em {date_key} (restam {e.remaining}).")
+            reserved = True
+            capacity_full = True if full else None
+        else:
+            slot = await slot_ref(tour_id, date_key).get(transaction=transaction)
+            holder = (slot.to_dict() or {}).get('booking_id') if slot.exists else None
+            # Sem vaga, uma data em occupied_dates é de uma reserva antiga (antes das vagas)
+            if (holder and holder != snapshot.id) or (holder is None and date_key in calendar_bitmaps(tour)[0]):
+                raise BookingRejected(409, f"Esta data ({date_key}) para o tour selecionado já está reservada.")
+            transaction.set(slot_ref(tour_id, date_key), slot_document(tour_id, date_key, snapshot.id))
+            tour_update = firestore.ArrayUnion([date_key])
+            if booking.get('capacityShards'):
+                # Lugares de uma lotação que o tour já não tem
+                booking_update['capacityShards'] = firestore.DELETE_FIELD
+    elif booking.get('capacityShards') and was_occupying and not occupies:
+        if await release_in_transaction(transaction, booking, tour_id, date_key):
+            capacity_full = False
+        released = True
+        max_participants = ((await get_tours_by_ids([tour_id])).get(tour_id) or {}).get('max_participants')
+    elif tour_id and date_key and was_occupying and not occupies:
+        slot = await slot_ref(tour_id, date_key).get(transaction=transaction)
+        if slot.exists:
+            # A vaga diz quem ocupa a data: só esta reserva a liberta
+            still_occupied = (slot.to_dict() or {}).get('booking_id') != snapshot.id
+        else:
+            still_occupied = await _date_still_occupied(transaction, tour_id, date_key, snapshot.id,
+                                                        booking.get('selected_date'))
+        if not still_occupied:
+            if slot.exists:
+                transaction.delete(slot.reference)
+            tour_update = firestore.ArrayRemove([date_key])
+
+    if tour_update is not None:
+        transaction.update(db_firestore.collection('tours').document(tour_id), {
+            'occupied_dates': tour_update,
+            'updated_at': datetime.utcnow()
+        })
+    if tour_id and date_key and occupies != was_occupying:
+        # Documento mensal de disponibilidade: contadores e ocupação do dia no mesmo commit
+        sign = 1 if occupies else -1
+        occupied = capacity_full if tour_update is None else isinstance(tour_update, firestore.ArrayUnion)
+        record_day_change(transaction, tour_id, date_key, sign, sign * booking_participants(booking), occupied)
+    if tour_id and date_key:
+        record_rollup_change(transaction, tour_id, date_key, booking_amount(booking),
+                             previous_status or UNKNOWN_STATUS, new_status)
+    transaction.update(booking_ref, booking_update)
+
+    return {
+        "booking_id": snapshot.id,
+        "tour_id": tour_id,
+        "date": date_key,
+        "previous_status": previous_status,
+        "status": new_status,
+        "date_occupied": isinstance(tour_update, firestore.ArrayUnion) or capacity_full is True,
+        "date_released": isinstance(tour_update, firestore.ArrayRemove) or capacity_full is False,
+        "capacity_reserved": reserved,
+        "capacity_released": released,
+        "max_participants": max_participants,
+    }
+
+
+async def update_booking_status(booking_id: str, new_status: str, extra_fields: Optional[Dict] = None) -> Dict:
+    """Transição de estado de uma reserva (confirmed/completed ocupam a data, cancelled/refunded libertam-na).
+
+    BookingRejected(409) se a reserva passar a ocupar uma data já ocupada ou sem lugares.
+    """
+    if new_status not in BOOKING_STATUSES:
+        raise ValueError(f"Estado inválido: {new_status}")
+    booking_ref = db_firestore.collection('bookings').document(booking_id)
+    result = await _transition_booking_status(db_firestore.transaction(), booking_ref, new_status, extra_fields or {})
+    max_participants = result.pop("max_participants")
+    if result["capacity_reserved"] or result["capacity_released"]:
+        result["capacity"] = await _capacity_after_commit(result["tour_id"], result["date"], max_participants)
+    return result
+
+
+@firestore.async_transactional
+async def _release_tour_date(transaction, tour_id: str, date_key: str) -> Dict:
+    """Tirar a data de occupied_dates só se nada a ocupar (leituras e escritas numa transação)"""
+    tour_doc = await db_firestore.collection('tours').document(tour_id).get(transaction=transaction)
+    if not tour_doc.exists:
+        raise BookingRejected(404, "Tour não encontrado")
+    if date_key not in ((tour_doc.to_dict() or {}).get('occupied_dates') or []):
+        raise BookingRejected(404, f"A data {date_key} não estava ocupada")
+
+    # Mesmas verificações que a libertação por cancelamento (_transition_booking_status)
+    slot = await slot_ref(tour_id, date_key).get(transaction=transaction)
+    holder = (slot.to_dict() or {}).get('booking_id') if slot.exists else None
+    if holder:
+        holder_doc = await db_firestore.collection('bookings').document(holder).get(transaction=transaction)
+        if holder_doc.exists and booking_occupies(holder_doc.to_dict() or {}):
+            raise BookingRejected(409, f"A data {date_key} está ocupada pela reserva {holder}; cancele a reserva.")
+    elif await _date_still_occupied(transaction, tour_id, date_key, None):
+        raise BookingRejected(409, f"A data {date_key} ainda tem reservas confirmadas; cancele as reservas.")
+
+    view_ref = capacity_ref(tour_id, date_key)
+    view = await view_ref.get(transaction=transaction)
+    if view.exists:
+        booked = 0
+        async for shard in db_firestore.get_all(shard_refs(tour_id, date_key), transaction=transaction):
+            booked += (shard.to_dict() or {}).get('participants', 0) if shard.exists else 0
+        if booked > 0:
+            raise BookingRejected(409, f"A data {date_key} ainda tem {booked} participantes; cancele as reservas.")
+
+    transaction.update(db_firestore.collection('tours').document(tour_id), {
+        'occupied_dates': firestore.ArrayRemove([date_key]),
+        'updated_at': datetime.utcnow()
+    })
+    record_day_change(transaction, tour_id, date_key, occupied=False)
+    if slot.exists:
+        transaction.delete(slot.reference)
+    if view.exists and (view.to_dict() or {}).get('full'):
+        transaction.set(view_ref, {'full': False, 'updated_at': datetime.utcnow()}, merge=True)
+    return {"tour_id": tour_id, "date": date_key, "slot_removed": slot.exists}
+
+
+async def release_tour_date(tour_id: str, date_key: str) -> Dict:
+    """Libertar à mão uma data ocupada (admin).
+
+    BookingRejected(404) se o tour não existir ou a data não estiver ocupada;
+    BookingRejected(409) se uma reserva confirmada ou lugares na lotação ainda a ocuparem.
+    """
+    return await _release_tour_date(db_firestore.transaction(), tour_id, parse_selected_date(date_key))
+
+
+async def repair_occupied_dates() -> Dict:
+    """Reparação completa de occupied_dates (rara: o dia a dia é incremental).
+
+    Uma única passagem pelas reservas confirmadas, agrupadas por tour em memória,
+    e escrita só dos tours que mudaram, em WriteBatches de até MAX_BATCH_WRITES.
+    Também reconstrói os documentos mensais de tour_availability e as vagas
+    exclusivas de booking_slots (backfill).
+    """
+    confirmed = db_firestore.collection('bookings').where('status', 'in', list(OCCUPYING_STATUSES))
+    full_capacity = db_firestore.collection(CAPACITY_COLLECTION).where('full', '==', True)
+    confirmed_docs = [(doc.id, doc.to_dict()) async for doc in confirmed.stream()]
+    bookings = [booking for _, booking in confirmed_docs]
+    expected = group_occupied_dates(bookings, [doc.to_dict() async for doc in full_capacity.stream()])
+
+    # Vagas das reservas exclusivas (também as antigas, de antes das vagas);
+    # uma vaga cuja reserva ainda ocupa a data fica como está
+    holders: Dict[str, tuple] = {}
+    for booking_id, booking in confirmed_docs:
+        tour_id, date_key = booking_tour_id(booking), booking_date_key(booking)
+        if tour_id and date_key and not booking.get('capacityShards'):
+            holders.setdefault(slot_id(tour_id, date_key), (tour_id, date_key, booking_id))
+    occupying_ids = {booking_id for booking_id, _ in confirmed_docs}
+    slots = {doc.id: (doc.to_dict() or {}).get('booking_id')
+             async for doc in db_firestore.collection(SLOTS_COLLECTION).stream()}
+    missing_slots = [(doc_id, slot_document(*holder)) for doc_id, holder in holders.items()
+                     if slots.get(doc_id) not in occupying_ids]
+    stale_slots = [doc_id for doc_id, holder_id in slots.items()
+                   if doc_id not in holders and holder_id not in occupying_ids]
+
+    # Documentos mensais de tour_availability reconstruídos a partir do mesmo estado
+    # (os contadores ficam todos no documento principal; os shards são apagados)
+    months = build_month_documents(
+        [(booking_tour_id(booking), booking_date_key(booking), booking_participants(booking))
+         for booking in bookings if booking_tour_id(booking) and booking_date_key(booking)],
+        expected
+    )
+    stale_months = [doc.id async for doc in db_firestore.collection(AVAILABILITY_COLLECTION).select([]).stream()
+                    if doc.id not in months]
+
+    # Lido do Firestore (não do cache) porque a reparação tem de partir do estado real
+    tours_query = db_firestore.collection('tours').select(['name', 'occupied_dates'])
+    tours = [dict(doc.to_dict() or {}, id=doc.id) async for doc in tours_query.stream()]
+
+    results, changed = [], []
+    for tour in tours:
+        occupied_dates = expected.get(tour['id'], [])
+        if sorted(set(tour.get('occupied_dates') or [])) != occupied_dates:
+            changed.append((tour['id'], occupied_dates))
+        results.append({
+            "tour_id": tour['id'],
+            "tour_name": tour.get('name', {}),
+            "occupied_dates": occupied_dates,
+            "total_occupied": len(occupied_dates)
+        })
+
+    writes = [('tour', tour_id, occupied_dates) for tour_id, occupied_dates in changed]
+    writes += [('month', month_id, document) for month_id, document in months.items()]
+    writes += [('stale', month_id, None) for month_id in stale_months]
+    writes += [('slot', doc_id, document) for doc_id, document in missing_slots]
+    writes += [('stale_slot', doc_id, None) for doc_id in stale_slots]
+
+    batches = 0
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db_firestore.batch()
+        for kind, doc_id, value in writes[start:start + MAX_BATCH_WRITES]:
+            if kind == 'tour':
+                batch.update(db_firestore.collection('tours').document(doc_id), {
+                    'occupied_dates': value,
+                    'updated_at': datetime.utcnow()
+                })
+            elif kind == 'month':
+                batch.set(db_firestore.collection(AVAILABILITY_COLLECTION).document(doc_id), value)
+            elif kind == 'slot':
+                batch.set(db_firestore.collection(SLOTS_COLLECTION).document(doc_id), value)
+            elif kind == 'stale_slot':
+                batch.delete(db_firestore.collection(SLOTS_COLLECTION).document(doc_id))
+            else:
+                batch.delete(db_firestore.collection(AVAILABILITY_COLLECTION).document(doc_id))
+        await batch.commit()
+        batches += 1
+
+    known = {tour['id'] for tour in tours}
+    return {
+        "success": True,
+        "message": "Sincronização concluída",
+        "tours_processed": len(results),
+        "tours_updated": len(changed),
+        "availability_months": len(months),
+        "availability_months_removed": len(stale_months),
+        "slots_written": len(missing_slots),
+        "slots_removed": len(stale_slots),
+        "batches": batches,
+        "orphan_tour_ids": sorted(set(expected) - known),
+        "results": results,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+async def backfill_booking_created_at() -> Dict:
+    """Copiar createdAt para created_at nas reservas V1 (backfill, corre uma vez).
+
+    A listagem paginada de reservas ordena por created_at e o Firestore deixa de
+    fora os documentos sem esse campo; as reservas V1 só tinham createdAt.
+    """
+    pending = []
+    without_timestamp = []
+    async for doc in db_firestore.collection('bookings').select(['created_at', 'createdAt']).stream():
+        booking = doc.to_dict() or {}
+        if booking.get('created_at') is not None:
+            continue
+        if booking.get('createdAt') is None:
+            without_timestamp.append(doc.id)
+        else:
+            pending.append((doc.id, booking['createdAt']))
+
+    batches = 0
+    for start in range(0, len(pending), MAX_BATCH_WRITES):
+        batch = db_firestore.batch()
+        for booking_id, created_at in pending[start:start + MAX_BATCH_WRITES]:
+            batch.update(db_firestore.collection('bookings').document(booking_id), {'created_at': created_at})
+        await batch.commit()
+        batches += 1
+
+    return {
+        "success": True,
+        "bookings_updated": len(pending),
+        "batches": batches,
+        "without_timestamp": sorted(without_timestamp),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+async def rebuild_booking_rollups() -> Dict:
+    """Reconstruir os contadores de booking_rollups a partir das reservas, sem shards
+    (rara: backfill ou depois de apagar reservas à mão; o dia a dia é incremental)"""
+    fields = ['tour_id', 'tourId', 'selected_date', 'dateString', 'bookingDate', 'status', 'total_amount']
+    bookings = []
+    async for doc in db_firestore.collection('bookings').select(fields).stream():
+        booking = doc.to_dict() or {}
+        tour_id, date_key = booking_tour_id(booking), booking_date_key(booking)
+        if tour_id and date_key:
+            bookings.append({"tour_id": tour_id, "date": date_key, "amount": booking_amount(booking),
+                             "status": booking.get('status') or UNKNOWN_STATUS})
+
+    documents = build_rollup_documents(bookings)
+    existing = await existing_rollup_ids()
+    collections = {"daily": DAILY_ROLLUPS_COLLECTION, "tours": TOUR_ROLLUPS_COLLECTION}
+    writes = [(collections[kind], doc_id, document)
+              for kind, kind_documents in documents.items() for doc_id, document in kind_documents.items()]
+    writes += [(collections[kind], doc_id, None)
+               for kind, doc_ids in existing.items() for doc_id in doc_ids if doc_id not in documents[kind]]
+
+    batches = 0
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db_firestore.batch()
+        for collection, doc_id, document in writes[start:start + MAX_BATCH_WRITES]:
+            if document is None:
+                batch.delete(db_firestore.collection(collection).document(doc_id))
+            else:
+                batch.set(db_firestore.collection(collection).document(doc_id), document)
+        await batch.commit()
+        batches += 1
+
+    return {
+        "success": True,
+        "bookings_processed": len(bookings),
+        "daily_documents": len(documents["daily"]),
+        "tour_documents": len(documents["tours"]),
+        "batches": batches,
+        "timestamp": datetime.utcnow().isoformat()
+    }
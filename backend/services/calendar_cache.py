@@ -0,0 +1,278 @@
+# backend/services/calendar_cache.py
+# Horários ocupados do Google Calendar em memória, indexados por dia. Um
+# thread em segundo plano mantém o cache com sincronização incremental
+# (syncToken): depois da primeira leitura completa só os eventos alterados
+# vêm da API, e os pedidos de disponibilidade nunca esperam pelo Google.
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+from utils.slot_availability import BusyIntervals
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre sincronizações incrementais
+CALENDAR_REFRESH_SECONDS = int(os.environ.get('GOOGLE_CALENDAR_REFRESH_SECONDS', '60'))
+# Os horários dos tours são locais: os eventos com hora são convertidos para este fuso
+CALENDAR_TIMEZONE = ZoneInfo(os.environ.get('GOOGLE_CALENDAR_TIMEZONE', 'Europe/Lisbon'))
+# Eventos que acabaram há mais do que isto não são guardados
+PAST_DAYS_KEPT = 1
+
+
+def parse_event_time(value: Dict[str, str]) -> datetime:
+    """start/end de um evento -> datetime local sem fuso (dia inteiro = meia-noite)"""
+    if 'dateTime' in value:
+        moment = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(CALENDAR_TIMEZONE).replace(tzinfo=None)
+        return moment
+    return datetime.fromisoformat(value['date'])
+
+
+def event_days(start: datetime, end: datetime) -> List[str]:
+    """Dias 'YYYY-MM-DD' tocados por [start, end) (o fim é exclusivo)"""
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    days, current = [], start.date()
+    while current <= last:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+    return days
+
+
+def public_slot(slot: Dict[str, Any]) -> Dict[str, Any]:
+    """Horário ocupado no formato de get_busy_slots (start, end, summary)"""
+    return {'start': slot['start'], 'end': slot['end'], 'summary': slot['summary']}
+
+
+class CalendarBusyCache:
+    def __init__(self, calendar_id: Optional[str], service_factory: Callable[[], Any],
+                 refresh_seconds: int = CALENDAR_REFRESH_SECONDS, name: str = "google_calendar"):
+        """Inicializar o cache (a sincronização só começa em start())"""
+        self.calendar_id = calendar_id
+        self.name = name
+        self.refresh_seconds = refresh_seconds
+        self._service_factory = service_factory
+        self._service = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sync_token: Optional[str] = None
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._by_day: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._intervals: Optional[BusyIntervals] = None
+        self._listeners: List[Callable[["CalendarBusyCache"], None]] = []
+        self._ready = threading.Event()
+
+        self.last_sync_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida do thread de sincronização
+    # ------------------------------------------------------------------
+    def start(self):
+        """Ligar o thread de sincronização (não espera pela primeira leitura)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self.refresh_seconds)
+
+    def is_ready(self) -> bool:
+        """Primeira sincronização feita (ou nenhum calendário configurado): os dados já valem"""
+        return not self.calendar_id or self.last_sync_at is not None
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Esperar até timeout segundos pela primeira sincronização; devolve is_ready()"""
+        if not self.is_ready():
+            self._ready.wait(timeout)
+        return self.is_ready()
+
+    def is_fresh(self) -> bool:
+        """Sincronizado há menos de três intervalos"""
+        return self.last_sync_at is not None and time.monotonic() - self.last_sync_at < 3 * self.refresh_seconds
+
+    # ------------------------------------------------------------------
+    # Sincronização
+    # ------------------------------------------------------------------
+    def _get_service(self):
+        """O cliente da API é criado uma vez e reutilizado"""
+        if self._service is None:
+            try:
+                self._service = self._service_factory()
+            except Exception as e:
+                logger.error(f"❌ Erro ao criar o serviço de '{self.name}': {e}")
+        return self._service
+
+    def sync(self) -> bool:
+        """Uma sincronização: completa sem syncToken, incremental com ele"""
+        if not self.calendar_id:
+            return False
+        service = self._get_service()
+        if service is None:
+            self.last_error = "Serviço do Calendar indisponível"
+            return False
+
+        full = self._sync_token is None
+        try:
+            items, next_token = self._list_events(service, self._sync_token)
+        except HttpError as e:
+            if e.resp.status == 410 and not full:
+                # syncToken expirado: o Google pede uma sincronização completa
+                logger.warning(f"⚠️ syncToken de '{self.name}' expirado; a sincronizar de novo.")
+                self._sync_token = None
+                return self.sync()
+            self.last_error = str(e)
+            logger.error(f"❌ Erro ao sincronizar '{self.name}': {e}")
+            return False
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ Erro ao sincronizar '{self.name}': {e}")
+            return False
+
+        with self._lock:
+            if full:
+                self._events.clear()
+                self._by_day.clear()
+            for event in items:
+                self._apply(event)
+            self._prune()
+            self._sync_token = next_token
+            changed = full or bool(items)
+            if changed:
+                self._intervals = None
+
+        if full:
+            self.full_syncs += 1
+        else:
+            self.incremental_syncs += 1
+        self.last_sync_at = time.monotonic()
+        self.last_error = None
+        self._ready.set()
+
+        if changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(self)
+                except Exception as e:
+                    logger.error(f"❌ Erro num listener de '{self.name}': {e}")
+        return True
+
+    def add_listener(self, callback: Callable[["CalendarBusyCache"], None]):
+        """Registar um callback(cache) chamado após cada sincronização com alterações"""
+        self._listeners.append(callback)
+
+    def _list_events(self, service, sync_token: Optional[str]):
+        """Todas as páginas de events.list; devolve (eventos, nextSyncToken)"""
+        items: List[Dict[str, Any]] = []
+        page_token = None
+        while True:
+            params = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": 2500}
+            if sync_token:
+                params["syncToken"] = sync_token
+            if page_token:
+                params["pageToken"] = page_token
+            result = service.events().list(**params).execute()
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    def _apply(self, event: Dict[str, Any]):
+        """Aplicar um evento novo, alterado ou cancelado ao índice por dia"""
+        event_id = event.get('id')
+        previous = self._events.pop(event_id, None)
+        if previous is not None:
+            for day in previous['days']:
+                day_slots = self._by_day.get(day)
+                if day_slots is not None:
+                    day_slots.pop(event_id, None)
+                    if not day_slots:
+                        del self._by_day[day]
+
+        if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+            return
+        try:
+            start, end = parse_event_time(event['start']), parse_event_time(event['end'])
+        except (KeyError, ValueError):
+            return
+
+        slot = {'start': start, 'end': end, 'summary': event.get('summary', 'Ocupado'), 'days': event_days(start, end)}
+        self._events[event_id] = slot
+        for day in slot['days']:
+            self._by_day.setdefault(day, {})[event_id] = slot
+
+    def _prune(self):
+        """Esquecer eventos que já acabaram"""
+        cutoff = datetime.combine(date.today() - timedelta(days=PAST_DAYS_KEPT), datetime.min.time())
+        for event_id in [event_id for event_id, slot in self._events.items() if slot['end'] < cutoff]:
+            self._apply({'id': event_id, 'status': 'cancelled'})
+
+    # ------------------------------------------------------------------
+    # Leitura (só memória)
+    # ------------------------------------------------------------------
+    def _days_in_range(self, start_date: str, end_date: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{dia: {event_id: slot}} para os dias de [start_date, end_date] com eventos"""
+        first, last = date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10])
+        result = {}
+        with self._lock:
+            current = first
+            while current <= last:
+                day_slots = self._by_day.get(current.isoformat())
+                if day_slots:
+                    result[current.isoformat()] = dict(day_slots)
+                current += timedelta(days=1)
+        return result
+
+    def busy_by_day(self, start_date: str, end_date: str) -> Dict[str, List[Dict[str, Any]]]:
+        """{dia: [horários ocupados]} para os dias de [start_date, end_date] com eventos"""
+        return {
+            day: sorted((public_slot(slot) for slot in day_slots.values()), key=lambda slot: slot['start'])
+            for day, day_slots in self._days_in_range(start_date, end_date).items()
+        }
+
+    def busy_slots(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Horários ocupados em [start_date, end_date], sem repetir eventos de vários dias"""
+        events: Dict[str, Dict[str, Any]] = {}
+        for day_slots in self._days_in_range(start_date, end_date).values():
+            events.update(day_slots)
+        return sorted((public_slot(slot) for slot in events.values()), key=lambda slot: slot['start'])
+
+    def busy_intervals(self) -> BusyIntervals:
+        """Todos os horários ocupados, ordenados e fundidos uma vez por sincronização com alterações"""
+        with self._lock:
+            if self._intervals is None:
+                self._intervals = BusyIntervals.from_slots(self._events.values())
+            return self._intervals
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "fresh": self.is_fresh(),
+            "events": len(self._events),
+            "days": len(self._by_day),
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "seconds_since_sync": round(time.monotonic() - self.last_sync_at, 1) if self.last_sync_at else None,
+            "last_error": self.last_error,
+        }
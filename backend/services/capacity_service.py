@@ -0,0 +1,195 @@
+# backend/services/capacity_service.py
+# Lotação por tour/data com contadores de participantes distribuídos por
+# shards: tour_date_capacity/{tour_id}_{data}/shards/{0..SHARD_COUNT-1}.
+# Cada shard aceita uma fatia de max_participants, por isso reservas
+# simultâneas no mesmo dia escrevem em documentos diferentes em vez de
+# disputarem o limite de escrita de um só documento.
+#
+# O documento pai é a vista agregada lida pelas verificações de
+# disponibilidade: só é escrito quando a data enche ou volta a ter lugares, na
+# mesma transação da reserva ou do cancelamento que mudou os shards.
+
+import random
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+
+from config.firestore_db import async_db as db_firestore
+from services.tour_availability import record_day_change
+
+CAPACITY_COLLECTION = "tour_date_capacity"
+SHARD_COUNT = 5
+
+
+class CapacityExceeded(Exception):
+    """Não há lugares suficientes na data pedida"""
+
+    def __init__(self, remaining: int):
+        super().__init__(f"Restam {remaining} lugares")
+        self.remaining = remaining
+
+
+def capacity_id(tour_id: str, date_key: str) -> str:
+    return f"{tour_id}_{date_key}"
+
+
+def capacity_ref(tour_id: str, date_key: str):
+    return db_firestore.collection(CAPACITY_COLLECTION).document(capacity_id(tour_id, date_key))
+
+
+def shard_refs(tour_id: str, date_key: str) -> List:
+    shards = capacity_ref(tour_id, date_key).collection("shards")
+    return [shards.document(str(index)) for index in range(SHARD_COUNT)]
+
+
+def shard_capacities(max_participants: int) -> List[int]:
+    """Fatias de max_participants por shard (somam max_participants)"""
+    base, extra = divmod(max(max_participants, 0), SHARD_COUNT)
+    return [base + (1 if index < extra else 0) for index in range(SHARD_COUNT)]
+
+
+def allocate(free: Dict[int, int], participants: int) -> Optional[Dict[int, int]]:
+    """Distribuir o grupo pelos shards com lugares livres; None se não couber"""
+    if sum(free.values()) < participants:
+        return None
+    allocation: Dict[int, int] = {}
+    remaining = participants
+    for index, space in sorted(free.items(), key=lambda item: -item[1]):
+        if remaining == 0:
+            break
+        taken = min(space, remaining)
+        if taken > 0:
+            allocation[index] = taken
+            remaining -= taken
+    return allocation
+
+
+def mark_full_in_transaction(transaction, tour_id: str, date_key: str, max_participants: int, full: bool):
+    """Vista agregada e occupied_dates quando a data enche ou volta a ter lugares (só escritas;
+    a ocupação do dia no documento mensal vai no record_day_change de quem chama)"""
+    view = {"tour_id": tour_id, "date": date_key, "full": full, "updated_at": datetime.utcnow()}
+    if max_participants:
+        view["max_participants"] = max_participants
+    transaction.set(capacity_ref(tour_id, date_key), view, merge=True)
+    transaction.update(db_firestore.collection('tours').document(tour_id), {
+        'occupied_dates': firestore.ArrayUnion([date_key]) if full else firestore.ArrayRemove([date_key]),
+        'updated_at': datetime.utcnow()
+    })
+
+
+async def reserve_in_transaction(transaction, tour_id: str, date_key: str, max_participants: int,
+                                 participants: int) -> Tuple[Dict[str, int], bool]:
+    """Ocupar lugares num shard aleatório; se não couber, espalhar o grupo pelos outros.
+
+    Lê os shards na transação e acrescenta os incrementos: pode ir em qualquer
+    transação, depois das outras leituras. Se o shard escolhido ficar com lugares,
+    a data não enche; senão todos os shards são lidos e, se a reserva esgotar a
+    lotação, a vista e occupied_dates são marcados no mesmo commit.
+    Devolve (capacityShards da reserva, a data ficou cheia).
+    CapacityExceeded se a data não tiver lugares.
+    """
+    if participants > max_participants:
+        raise CapacityExceeded(max_participants)
+    refs, capacities = shard_refs(tour_id, date_key), shard_capacities(max_participants)
+    first = random.randrange(SHARD_COUNT)
+    snapshot = await refs[first].get(transaction=transaction)
+    used = (snapshot.to_dict() or {}).get("participants", 0) if snapshot.exists else 0
+
+    full = False
+    if capacities[first] - used > participants:
+        allocation = {first: participants}
+    else:
+        # Caso raro (data quase cheia ou grupo grande): ler todos os shards de uma vez
+        free = {}
+        async for shard in db_firestore.get_all(refs, transaction=transaction):
+            index = int(shard.id)
+            used = (shard.to_dict() or {}).get("participants", 0) if shard.exists else 0
+            free[index] = max(capacities[index] - used, 0)
+        allocation = allocate(free, participants)
+        if allocation is None:
+            raise CapacityExceeded(sum(free.values()))
+        full = sum(free.values()) == participants
+
+    for index, taken in allocation.items():
+        transaction.set(refs[index], {"participants": firestore.Increment(taken)}, merge=True)
+    if full:
+        mark_full_in_transaction(transaction, tour_id, date_key, max_participants, True)
+    return {str(index): taken for index, taken in allocation.items()}, full
+
+
+async def release_in_transaction(transaction, booking: Dict, tour_id: str, date_key: str) -> bool:
+    """Devolver os lugares de uma reserva; se a data estava cheia, volta a ter lugares
+    no mesmo commit. Lê a vista: chamar antes das escritas da transação.
+    Devolve True se a data deixou de estar cheia."""
+    view = await capacity_ref(tour_id, date_key).get(transaction=transaction)
+    was_full = view.exists and bool((view.to_dict() or {}).get("full"))
+    refs = shard_refs(tour_id, date_key)
+    for index, taken in (booking.get("capacityShards") or {}).items():
+        transaction.set(refs[int(index)], {"participants": firestore.Increment(-taken)}, merge=True)
+    if was_full:
+        mark_full_in_transaction(transaction, tour_id, date_key, None, False)
+    return was_full
+
+
+async def booked_participants(tour_id: str, date_key: str) -> int:
+    """Soma dos shards numa agregação do servidor (sem ler reservas)"""
+    result = await capacity_ref(tour_id, date_key).collection("shards").sum("participants", alias="total").get()
+    return int(result[0][0].value or 0)
+
+
+def capacity_summary(tour_id: str, date_key: str, max_participants: int, booked: int) -> Dict:
+    remaining = max(max_participants - booked, 0)
+    return {
+        "tour_id": tour_id,
+        "date": date_key,
+        "max_participants": max_participants,
+        "booked": booked,
+        "remaining": remaining,
+        "full": remaining == 0,
+    }
+
+
+@firestore.async_transactional
+async def _refresh_capacity_view(transaction, tour_id: str, date_key: str, max_participants: Optional[int]) -> Dict:
+    view_ref = capacity_ref(tour_id, date_key)
+    view = await view_ref.get(transaction=transaction)
+    view = view.to_dict() or {}
+    booked = 0
+    async for shard in db_firestore.get_all(shard_refs(tour_id, date_key), transaction=transaction):
+        booked += (shard.to_dict() or {}).get("participants", 0) if shard.exists else 0
+    if max_participants is None:
+        max_participants = view.get("max_participants", 0)
+
+    full = booked >= max_participants
+    if view.get("full") != full or view.get("max_participants") != max_participants:
+        transaction.set(view_ref, {
+            "tour_id": tour_id,
+            "date": date_key,
+            "max_participants": max_participants,
+            "full": full,
+            "updated_at": datetime.utcnow()
+        }, merge=True)
+        if view.get("full", False) != full:
+            transaction.update(db_firestore.collection('tours').document(tour_id), {
+                'occupied_dates': firestore.ArrayUnion([date_key]) if full else firestore.ArrayRemove([date_key]),
+                'updated_at': datetime.utcnow()
+            })
+            record_day_change(transaction, tour_id, date_key, occupied=full)
+
+    return capacity_summary(tour_id, date_key, max_participants, booked)
+
+
+async def refresh_capacity_view(tour_id: str, date_key: str, max_participants: Optional[int] = None) -> Dict:
+    """Recalcular a vista agregada e occupied_dates a partir dos shards (reparação:
+    ex.: max_participants alterado; as reservas atualizam a vista na sua transação).
+
+    Shards e vista lidos e escritos na mesma transação: duas reservas simultâneas
+    não gravam um full antigo nem tiram a data de occupied_dates por engano.
+    """
+    return await _refresh_capacity_view(db_firestore.transaction(), tour_id, date_key, max_participants)
+
+
+async def get_capacity(tour_id: str, date_key: str, max_participants: int) -> Dict:
+    """Lugares ocupados e livres de uma data"""
+    return capacity_summary(tour_id, date_key, max_participants, await booked_participants(tour_id, date_key))
@@ -0,0 +1,202 @@
+# backend/services/idempotency.py
+# Chaves de idempotência (cabeçalho Idempotency-Key) para a criação de reservas.
+# A primeira resposta de cada chave fica guardada em idempotency_keys durante
+# IDEMPOTENCY_TTL_SECONDS e é devolvida tal e qual aos pedidos repetidos.
+#
+# - Pedidos repetidos em simultâneo na mesma instância esperam pelo pedido em
+#   curso (um único Future por chave) em vez de irem ao Firestore.
+# - Entre instâncias, o registo é criado com create(), que falha se já existir:
+#   só um pedido executa a operação; os outros recebem a resposta guardada ou 409.
+# - expires_at é o campo da política TTL do Firestore (configurada uma vez):
+#   gcloud firestore fields ttls update expires_at --collection-group=idempotency_keys
+#   Como a remoção pelo TTL pode demorar, os registos expirados são ignorados na leitura.
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud import firestore
+
+from config.firestore_db import async_db as db_firestore
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Tempo durante o qual uma resposta é devolvida aos pedidos repetidos
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+# Um pedido em curso que não termine neste tempo (instância caída) liberta a chave
+IN_PROGRESS_SECONDS = 120
+MAX_KEY_LENGTH = 255
+
+# Operação protegida: devolve (status_code, corpo JSON)
+Operation = Callable[[], Awaitable[Tuple[int, Any]]]
+
+
+class IdempotencyError(Exception):
+    """Chave inválida, reutilizada com outro pedido ou com um pedido ainda em curso"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Hash do corpo do pedido: a mesma chave com outro corpo é um erro do cliente"""
+    canonical = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def record_id(scope: str, key: str) -> str:
+    """Id do documento: a chave vem do cliente, por isso é usada só através de um hash"""
+    return hashlib.sha256(f"{scope}:{key}".encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, collection_name: str = IDEMPOTENCY_COLLECTION, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+        self.executed = 0
+        self.replayed = 0
+        self.collapsed = 0
+
+    def _collection(self):
+        return db_firestore.collection(self.collection_name)
+
+    async def run(self, scope: str, key: Optional[str], payload: Any, operation: Operation) -> Dict[str, Any]:
+        """Executar a operação uma só vez por (scope, key).
+
+        Devolve {"status_code", "body", "replayed"}. Sem chave, executa sempre.
+        Se a operação falhar, a chave é libertada e o erro propaga-se (também aos
+        pedidos que estavam à espera), para que o cliente possa tentar de novo.
+        """
+        if not key:
+            status_code, body = await operation()
+            return {"status_code": status_code, "body": body, "replayed": False}
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(400, f"{IDEMPOTENCY_HEADER} demasiado longa (máximo {MAX_KEY_LENGTH} caracteres)")
+
+        doc_id, fingerprint = record_id(scope, key), request_fingerprint(payload)
+
+        inflight = self._inflight.get(doc_id)
+        if inflight is not None:
+            self._check_fingerprint(inflight[0], fingerprint)
+            self.collapsed += 1
+            status_code, body = await asyncio.shield(inflight[1])
+            return {"status_code": status_code, "body": body, "replayed": True}
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[doc_id] = (fingerprint, future)
+        try:
+            stored = await self._claim(doc_id, scope, fingerprint)
+            if stored is not None:
+                future.set_result(stored)
+                self.replayed += 1
+                return {"status_code": stored[0], "body": stored[1], "replayed": True}
+
+            try:
+                status_code, body = await operation()
+            except BaseException:
+                await self._release(doc_id)
+                raise
+            await self._complete(doc_id, status_code, body)
+            future.set_result((status_code, body))
+            self.executed += 1
+            return {"status_code": status_code, "body": body, "replayed": False}
+        except BaseException as e:
+            if future.done():
+                pass
+            elif isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Sem pedidos à espera, o erro não fica por recolher
+            raise
+        finally:
+            self._inflight.pop(doc_id, None)
+
+    @staticmethod
+    def _check_fingerprint(stored: Optional[str], fingerprint: str):
+        if stored != fingerprint:
+            raise IdempotencyError(422, f"{IDEMPOTENCY_HEADER} já usada com um pedido diferente")
+
+    async def _claim(self, doc_id: str, scope: str, fingerprint: str) -> Optional[Tuple[int, Any]]:
+        """Reservar a chave; devolve a resposta guardada se a chave já tiver sido usada"""
+        now = datetime.now(timezone.utc)
+        record = {
+            "scope": scope,
+            "fingerprint": fingerprint,
+            "state": "in_progress",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=IN_PROGRESS_SECONDS),
+        }
+        ref = self._collection().document(doc_id)
+        try:
+            await ref.create(record)
+            return None
+        except AlreadyExists:
+            pass
+
+        snapshot = await ref.get()
+        existing = snapshot.to_dict() or {}
+        expires_at = existing.get("expires_at")
+        if not snapshot.exists or (expires_at is not None and expires_at <= now):
+            # Expirado (ainda não removido pelo TTL): fica com a chave se ninguém a alterou entretanto
+            try:
+                if snapshot.exists:
+                    stale = {"status_code": firestore.DELETE_FIELD, "response": firestore.DELETE_FIELD,
+                             "completed_at": firestore.DELETE_FIELD}
+                    await ref.update({**record, **stale},
+                                     option=db_firestore.write_option(last_update_time=snapshot.update_time))
+                else:
+                    await ref.create(record)
+                return None
+            except (AlreadyExists, FailedPrecondition):
+                raise IdempotencyError(409, "Pedido com esta chave ainda em curso; tente de novo dentro de momentos")
+
+        self._check_fingerprint(existing.get("fingerprint"), fingerprint)
+        if existing.get("state") != "completed":
+            raise IdempotencyError(409, "Pedido com esta chave ainda em curso; tente de novo dentro de momentos")
+        return existing.get("status_code", 200), existing.get("response")
+
+    async def _complete(self, doc_id: str, status_code: int, body: Any):
+        now = datetime.now(timezone.utc)
+        try:
+            await self._collection().document(doc_id).update({
+                "state": "completed",
+                "status_code": status_code,
+                "response": body,
+                "completed_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            })
+        except Exception as e:
+            # A operação já foi feita: a resposta segue, só as repetições deixam de ser protegidas
+            logger.error(f"❌ Erro ao guardar a resposta idempotente {doc_id}: {e}")
+
+    async def _release(self, doc_id: str):
+        try:
+            await self._collection().document(doc_id).delete()
+        except NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Erro ao libertar a chave idempotente {doc_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "collapsed": self.collapsed,
+        }
+
+
+# Instância global
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,218 @@
+# backend/services/snapshot_cache.py
+# Cache em memória de uma coleção pequena do Firestore, mantido atualizado por
+# um listener on_snapshot. Usado para coleções que mudam poucas vezes por dia
+# mas são lidas milhares de vezes por minuto (tours, hero images).
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre tentativas de religar o listener depois de uma falha
+LISTENER_RETRY_SECONDS = 30
+
+
+class SnapshotCache:
+    def __init__(self, collection, name: str):
+        """Inicializar o cache (o listener só é ligado em start())"""
+        self._collection = collection
+        self.name = name
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._last_start_attempt = 0.0
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._update_times: Dict[str, datetime] = {}
+        self._listeners: List[Callable[["SnapshotCache", Set[str]], None]] = []
+        self._fingerprint: Tuple[int, str, Optional[datetime]] = (-1, "", None)
+
+        self.version = 0
+        self.last_change_at: Optional[float] = None
+        self.last_read_time: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida do listener
+    # ------------------------------------------------------------------
+    def start(self, wait_seconds: float = 10.0) -> bool:
+        """Ligar o listener on_snapshot e esperar pelo primeiro snapshot completo"""
+        if self._collection is None:
+            return False
+
+        with self._lock:
+            if self._watch is None or not self._watch.is_active:
+                self._last_start_attempt = time.monotonic()
+                if self._watch is not None:
+                    self._close_watch()
+                try:
+                    self._watch = self._collection.on_snapshot(self._on_snapshot)
+                    logger.info(f"✅ Listener da coleção '{self.name}' ligado.")
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"❌ Falha ao ligar o listener da coleção '{self.name}': {e}")
+                    return False
+
+        return self._ready.wait(wait_seconds)
+
+    def stop(self):
+        """Desligar o listener (o conteúdo em memória é mantido)"""
+        with self._lock:
+            self._close_watch()
+
+    def _close_watch(self):
+        try:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao desligar o listener da coleção '{self.name}': {e}")
+        finally:
+            self._watch = None
+
+    def _ensure_listener(self):
+        """Religar o listener se tiver morrido, sem bloquear o pedido atual"""
+        if self._collection is None:
+            return
+        if self._watch is not None and self._watch.is_active:
+            return
+        if time.monotonic() - self._last_start_attempt < LISTENER_RETRY_SECONDS:
+            return
+        self.start(wait_seconds=0)
+
+    @property
+    def listener_active(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def is_fresh(self) -> bool:
+        """O cache só responde se já recebeu o snapshot inicial e o listener está vivo"""
+        self._ensure_listener()
+        return self._ready.is_set() and self.listener_active
+
+    # ------------------------------------------------------------------
+    # Atualização a partir do Firestore
+    # ------------------------------------------------------------------
+    def _on_snapshot(self, docs, changes, read_time):
+        """Callback do listener: aplica apenas as alterações recebidas"""
+        changed_ids: Set[str] = set()
+        try:
+            with self._lock:
+                for change in changes:
+                    doc = change.document
+                    changed_ids.add(doc.id)
+                    if change.type.name == "REMOVED":
+                        self._docs.pop(doc.id, None)
+                        self._update_times.pop(doc.id, None)
+                    else:
+                        data = doc.to_dict() or {}
+                        data["id"] = doc.id
+                        self._docs[doc.id] = data
+                        if doc.update_time is not None:
+                            self._update_times[doc.id] = doc.update_time
+
+                self.version += 1
+                self.last_change_at = time.time()
+                self.last_read_time = read_time
+                self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ Erro ao aplicar snapshot da coleção '{self.name}': {e}")
+            return
+
+        first_load = not self._ready.is_set()
+        self._ready.set()
+        if first_load:
+            logger.info(f"✅ Coleção '{self.name}' carregada em memória ({len(self._docs)} documentos).")
+
+        for listener in list(self._listeners):
+            try:
+                listener(self, changed_ids)
+            except Exception as e:
+                logger.error(f"❌ Erro num listener da coleção '{self.name}': {e}")
+
+    def add_listener(self, callback: Callable[["SnapshotCache", Set[str]], None]):
+        """Registar um callback(catalog, changed_ids) chamado após cada snapshot"""
+        self._listeners.append(callback)
+        if self._ready.is_set():
+            callback(self, set(self._docs.keys()))
+
+    # ------------------------------------------------------------------
+    # Leituras (devolvem None quando o cache não pode responder)
+    # ------------------------------------------------------------------
+    def list(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Documentos (ordenados por id) que satisfazem predicate, ou None se o cache não estiver pronto"""
+        if not self.is_fresh():
+            self.misses += 1
+            return None
+
+        with self._lock:
+            docs = [
+                dict(doc) for _, doc in sorted(self._docs.items())
+                if predicate is None or predicate(doc)
+            ]
+        self.hits += 1
+        return docs
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Documento por id; None se não existir ou se o cache não estiver pronto (distinguir com is_fresh())"""
+        if not self.is_fresh():
+            self.misses += 1
+            return None
+
+        with self._lock:
+            doc = self._docs.get(doc_id)
+        self.hits += 1
+        return dict(doc) if doc is not None else None
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._docs)
+
+    def peek(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Documento por id sem verificar a frescura (para os listeners, que correm dentro do snapshot)"""
+        with self._lock:
+            doc = self._docs.get(doc_id)
+        return dict(doc) if doc is not None else None
+
+    def update_time(self, doc_id: str) -> Optional[datetime]:
+        return self._update_times.get(doc_id)
+
+    def fingerprint(self) -> Tuple[str, Optional[datetime]]:
+        """Hash dos (id, update_time) de todos os documentos e o update_time mais recente.
+
+        Ao contrário de version, é igual em todas as instâncias para o mesmo
+        conteúdo, por isso serve de base a ETags. Recalculado uma vez por versão.
+        """
+        with self._lock:
+            version, digest, last_modified = self._fingerprint
+            if version != self.version:
+                hasher = hashlib.sha1()
+                for doc_id in sorted(self._docs):
+                    update_time = self._update_times.get(doc_id)
+                    hasher.update(f"{doc_id}@{update_time.isoformat() if update_time else ''};".encode("utf-8"))
+                digest = hasher.hexdigest()
+                last_modified = max(self._update_times.values(), default=None)
+                self._fingerprint = (self.version, digest, last_modified)
+            return digest, last_modified
+
+    def stats(self) -> Dict[str, Any]:
+        """Números de hit/miss e de frescura do cache"""
+        lookups = self.hits + self.misses
+        return {
+            "ready": self._ready.is_set(),
+            "listener_active": self.listener_active,
+            "collection": self.name,
+            "documents": len(self._docs),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "last_change_at": datetime.utcfromtimestamp(self.last_change_at).isoformat() if self.last_change_at else None,
+            "seconds_since_last_change": round(time.time() - self.last_change_at, 1) if self.last_change_at else None,
+            "last_read_time": self.last_read_time.isoformat() if self.last_read_time else None,
+            "last_error": self.last_error,
+        }
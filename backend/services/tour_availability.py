@@ -0,0 +1,144 @@
+# backend/services/tour_availability.py
+# Documento de disponibilidade por tour e por mês:
+#   tour_availability/{tour_id}_{YYYY-MM} =
+#     {tour_id, month, days: {"YYYY-MM-DD": {bookings, participants, occupied}}}
+# Só conta reservas confirmadas ou concluídas (OCCUPYING_STATUSES). Todos os
+# caminhos que confirmam, cancelam ou ocupam datas escrevem aqui (incrementos
+# no servidor, sem leitura prévia), por isso datas ocupadas e estatísticas são
+# uma leitura de poucos documentos em vez de percorrer a coleção bookings com
+# os vários formatos de reserva.
+#
+# Os contadores de cada reserva vão para um de AVAILABILITY_SHARDS documentos
+# do mês (o principal ou {tour_id}_{YYYY-MM}_{1..}), escolhido ao acaso, como
+# os shards de lotação: reservas simultâneas do mesmo tour não disputam um só
+# documento. A ocupação do dia (rara) fica sempre no documento principal. A
+# leitura junta os shards do mês (load_months).
+
+import random
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.cloud import firestore
+
+from config.firestore_db import async_db as db_firestore
+
+AVAILABILITY_COLLECTION = "tour_availability"
+AVAILABILITY_SHARDS = 5
+
+
+def month_key(date_key: str) -> str:
+    return date_key[:7]
+
+
+def availability_id(tour_id: str, month: str, shard: int = 0) -> str:
+    """Id do documento do mês (shard 0, o principal) ou de um shard de contadores"""
+    return f"{tour_id}_{month}" if shard == 0 else f"{tour_id}_{month}_{shard}"
+
+
+def availability_ref(tour_id: str, month: str, shard: int = 0):
+    return db_firestore.collection(AVAILABILITY_COLLECTION).document(availability_id(tour_id, month, shard))
+
+
+def booking_participants(booking: Dict) -> int:
+    """Participantes da reserva (os dois formatos de reserva em uso)"""
+    return int(booking.get('participants') or booking.get('numParticipants') or 0)
+
+
+def record_day_change(writer, tour_id: str, date_key: str, bookings: int = 0, participants: int = 0,
+                      occupied: Optional[bool] = None):
+    """Acrescentar a alteração de um dia a um batch ou transação (set com merge + Increment).
+
+    Só contadores: um shard ao acaso. Com occupied: o documento principal.
+    """
+    day: Dict[str, Any] = {}
+    if bookings:
+        day["bookings"] = firestore.Increment(bookings)
+    if participants:
+        day["participants"] = firestore.Increment(participants)
+    if occupied is not None:
+        day["occupied"] = occupied
+    if not day:
+        return
+    month = month_key(date_key)
+    shard = 0 if occupied is not None else random.randrange(AVAILABILITY_SHARDS)
+    writer.set(availability_ref(tour_id, month, shard), {
+        "tour_id": tour_id,
+        "month": month,
+        "days": {date_key: day},
+        "updated_at": datetime.utcnow()
+    }, merge=True)
+
+
+def merge_month_shards(docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Um documento por mês com os contadores de todos os shards somados"""
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for doc in docs:
+        month = merged.setdefault((doc.get("tour_id"), doc.get("month")),
+                                  {"tour_id": doc.get("tour_id"), "month": doc.get("month"), "days": {}})
+        for day, info in (doc.get("days") or {}).items():
+            target = month["days"].setdefault(day, {"bookings": 0, "participants": 0, "occupied": False})
+            target["bookings"] += info.get("bookings", 0)
+            target["participants"] += info.get("participants", 0)
+            target["occupied"] = target["occupied"] or bool(info.get("occupied"))
+    return list(merged.values())
+
+
+async def load_tour_months(pairs: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """Documentos mensais de vários (tour_id, 'YYYY-MM'), shards já juntos, num só get_all"""
+    refs = [availability_ref(tour_id, month, shard=shard)
+            for tour_id, month in dict.fromkeys(pairs) for shard in range(AVAILABILITY_SHARDS)]
+    if not refs:
+        return []
+    return merge_month_shards([doc.to_dict() async for doc in db_firestore.get_all(refs) if doc.exists])
+
+
+async def load_months(tour_id: str, month: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Documentos mensais de um tour, shards já juntos (um get_all com month,
+    senão uma consulta por tour_id)"""
+    if month:
+        return await load_tour_months([(tour_id, month)])
+    query = db_firestore.collection(AVAILABILITY_COLLECTION).where("tour_id", "==", tour_id)
+    return merge_month_shards([doc.to_dict() async for doc in query.stream()])
+
+
+def occupied_dates(months: Iterable[Dict[str, Any]]) -> List[str]:
+    return sorted(day for doc in months for day, info in (doc.get("days") or {}).items() if info.get("occupied"))
+
+
+def booking_stats(months: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    total_bookings, total_participants, dates_booked = 0, 0, []
+    for doc in months:
+        for day, info in (doc.get("days") or {}).items():
+            if info.get("bookings", 0) > 0:
+                total_bookings += info["bookings"]
+                total_participants += info.get("participants", 0)
+                dates_booked.append(day)
+    return {
+        "total_bookings": total_bookings,
+        "total_participants": total_participants,
+        "unique_dates_booked": len(dates_booked),
+        "dates_booked": sorted(dates_booked),
+    }
+
+
+def build_month_documents(confirmed: Iterable[tuple], occupied: Dict[str, Iterable[str]]) -> Dict[str, Dict[str, Any]]:
+    """Documentos mensais completos (só os principais, sem shards) a partir de
+    (tour_id, data, participantes) das reservas confirmadas e de {tour_id: datas ocupadas}"""
+    days: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: {"bookings": 0, "participants": 0, "occupied": False})
+    for tour_id, date_key, participants in confirmed:
+        day = days[(tour_id, date_key)]
+        day["bookings"] += 1
+        day["participants"] += participants
+    for tour_id, dates in occupied.items():
+        for date_key in dates:
+            days[(tour_id, date_key)]["occupied"] = True
+
+    documents: Dict[str, Dict[str, Any]] = {}
+    for (tour_id, date_key), day in days.items():
+        month = month_key(date_key)
+        doc = documents.setdefault(availability_id(tour_id, month), {
+            "tour_id": tour_id, "month": month, "days": {}, "updated_at": datetime.utcnow()
+        })
+        doc["days"][date_key] = day
+    return documents
@@ -0,0 +1,74 @@
+# backend/services/tour_calendar.py
+# Bitmaps de datas ocupadas (occupied_dates) e de datas oferecidas
+# (available_dates) por tour, derivados do catálogo em cache. Cada alteração
+# num tour só reconstrói os bitmaps desse tour.
+
+import threading
+from datetime import date
+from typing import Any, Dict, Optional, Set
+
+from services.tour_catalog import tour_catalog
+from utils.date_bitmap import DateBitmap
+
+# Janela máxima pedida de uma vez ao endpoint de calendário
+MAX_CALENDAR_DAYS = 366
+
+# Codificação de um dia na matriz de disponibilidade (um carácter por dia)
+AVAILABLE, OCCUPIED, NOT_OFFERED = "A", "O", "X"
+
+
+class TourCalendarIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bitmaps: Dict[str, DateBitmap] = {}
+        self._available: Dict[str, Optional[DateBitmap]] = {}
+
+    def on_catalog_change(self, catalog, changed_ids: Set[str]):
+        """Listener do catálogo: reconstruir só os bitmaps dos tours alterados"""
+        for tour_id in changed_ids:
+            tour = catalog.peek(tour_id)
+            with self._lock:
+                if tour is None:
+                    self._bitmaps.pop(tour_id, None)
+                    self._available.pop(tour_id, None)
+                else:
+                    self._bitmaps[tour_id], self._available[tour_id] = calendar_bitmaps(tour)
+
+    def get(self, tour_id: str) -> Optional[DateBitmap]:
+        return self._bitmaps.get(tour_id)
+
+    def available(self, tour_id: str) -> Optional[DateBitmap]:
+        """Datas oferecidas; None quando o tour não tem available_dates (todos os dias)"""
+        return self._available.get(tour_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tours": len(self._bitmaps)}
+
+
+def calendar_bitmaps(tour: Dict[str, Any]):
+    """(ocupadas, oferecidas ou None) a partir de um documento de tour"""
+    available_dates = tour.get("available_dates")
+    return (DateBitmap.from_dates(tour.get("occupied_dates")),
+            DateBitmap.from_dates(available_dates) if available_dates else None)
+
+
+def availability_row(occupied: DateBitmap, available: Optional[DateBitmap], start: date, end: date) -> str:
+    """Uma linha da matriz: um carácter por dia de [start, end] (A, O ou X)"""
+    total = (end - start).days + 1
+    occupied_window = occupied.window(start, end)
+    available_window = available.window(start, end) if available is not None else None
+    row = []
+    for index in range(total):
+        mask = 1 << (index & 7)
+        if available_window is not None and not available_window[index >> 3] & mask:
+            row.append(NOT_OFFERED)
+        elif occupied_window[index >> 3] & mask:
+            row.append(OCCUPIED)
+        else:
+            row.append(AVAILABLE)
+    return "".join(row)
+
+
+# Instância global, ligada ao catálogo em cache
+tour_calendar = TourCalendarIndex()
+tour_catalog.add_listener(tour_calendar.on_catalog_change)
@@ -0,0 +1,53 @@
+# backend/services/tour_catalog.py
+# Cache em memória do catálogo de tours, mantido atualizado por um listener
+# on_snapshot na coleção 'tours'. O catálogo tem poucas centenas de documentos
+# e muda poucas vezes por dia, por isso as leituras são servidas da memória.
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.firestore_db import async_db, tours_collection
+from services.snapshot_cache import SnapshotCache
+
+
+class TourCatalogCache(SnapshotCache):
+    def list_tours(self, active_only: bool = False, featured: bool = False,
+                   limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Tours filtrados por active/featured, ou None se o cache não estiver pronto"""
+        tours = self.list(lambda tour: (not active_only or tour.get("active") is True)
+                          and (not featured or tour.get("featured") is True))
+        if tours is None:
+            return None
+        return tours[:limit] if limit is not None else tours
+
+
+# Instância global
+tour_catalog = TourCatalogCache(tours_collection, "tours")
+
+# Limite de ids por pedido de lote (carrinho, páginas de reservas, SEO)
+MAX_BATCH_SIZE = 50
+
+
+async def get_tours_by_ids(tour_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Vários tours de uma vez: do cache se estiver pronto, senão num único get_all.
+
+    Devolve {id: tour ou None}; ids inexistentes ficam explicitamente a None.
+    """
+    tour_ids = list(dict.fromkeys(tour_id for tour_id in tour_ids if tour_id))
+    if not tour_ids:
+        return {}
+
+    if tour_catalog.is_fresh():
+        return {tour_id: tour_catalog.get(tour_id) for tour_id in tour_ids}
+
+    if async_db is None:
+        raise RuntimeError("Firestore não disponível")
+
+    # Uma única ida ao Firestore (BatchGetDocuments) em vez de N document().get()
+    refs = [async_db.collection("tours").document(tour_id) for tour_id in tour_ids]
+    found: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(tour_ids)
+    async for doc in async_db.get_all(refs):
+        if doc.exists:
+            data = doc.to_dict()
+            data["id"] = doc.id
+            found[doc.id] = data
+    return found
@@ -0,0 +1,217 @@
+# backend/services/tour_facets.py
+# Filtragem por facetas sobre o catálogo em cache: tour_type, location,
+# price e duration_hours. As facetas categóricas são conjuntos de ids por
+# valor; as numéricas são arrays ordenados, e um intervalo resolve-se com
+# bisect. As contagens de cada faceta aplicam todos os filtros menos o dela,
+# para o utilizador ver quantos tours ganha ao mudar essa faceta.
+# tour_type é normalizado para as chaves dos filtros ("Gastronómico" ->
+# "gastronomic") e os números guardados como texto ("49.99") são convertidos.
+
+import bisect
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from services.tour_catalog import tour_catalog
+from utils.text import fold_text, tokenize
+
+# Intervalos [min, max) apresentados na página de filtros (None = sem limite)
+PRICE_BUCKETS: Sequence[Tuple[float, Optional[float]]] = ((0, 50), (50, 100), (100, 200), (200, None))
+DURATION_BUCKETS: Sequence[Tuple[float, Optional[float]]] = ((0, 4), (4, 8), (8, None))
+# Nomes de tipos em português/espanhol -> chave do filtro (config_routes.TOUR_FILTERS)
+TOUR_TYPE_ALIASES = {
+    "gastronomico": "gastronomic",
+    "gastronomia": "gastronomic",
+    "aventura": "adventure",
+    "natureza": "nature",
+    "naturaleza": "nature",
+}
+
+
+def tour_type_key(value: Any) -> str:
+    """Chave do filtro de um tour_type ("Gastronómico" -> "gastronomic", "Vinho e Mar" -> "vinho_e_mar")"""
+    if not isinstance(value, str):
+        return ""
+    key = "_".join(tokenize(value))
+    return TOUR_TYPE_ALIASES.get(key, key)
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Preço ou duração como float, também quando guardado como texto ("49.99", "49,99")"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip().replace(",", "."))
+        except ValueError:
+            return None
+    return None
+
+
+class NumericFacet:
+    """Array ordenado de (valor, id) para filtrar intervalos com bisect"""
+
+    def __init__(self, pairs: Iterable[Tuple[float, str]]):
+        ordered = sorted(pairs)
+        self.values = [value for value, _ in ordered]
+        self.ids = [tour_id for _, tour_id in ordered]
+
+    def range_ids(self, low: Optional[float] = None, high: Optional[float] = None,
+                  include_high: bool = True) -> Set[str]:
+        start = bisect.bisect_left(self.values, low) if low is not None else 0
+        if high is None:
+            end = len(self.values)
+        elif include_high:
+            end = bisect.bisect_right(self.values, high)
+        else:
+            end = bisect.bisect_left(self.values, high)
+        return set(self.ids[start:end])
+
+    def bounds(self, candidates: Set[str]) -> Tuple[Optional[float], Optional[float]]:
+        values = [value for value, tour_id in zip(self.values, self.ids) if tour_id in candidates]
+        return (values[0], values[-1]) if values else (None, None)
+
+
+class TourFacetIndex:
+    def __init__(self):
+        self._all: FrozenSet[str] = frozenset()
+        self._by_type: Dict[str, Set[str]] = {}
+        self._type_labels: Dict[str, str] = {}
+        self._locations: Dict[str, str] = {}
+        self._by_location: Dict[str, Set[str]] = {}
+        self._price = NumericFacet([])
+        self._duration = NumericFacet([])
+        self.rebuilds = 0
+
+    def rebuild(self, tours: Iterable[Dict[str, Any]]):
+        """Reconstruir as facetas a partir dos tours ativos (troca atómica do estado)"""
+        by_type: Dict[str, Set[str]] = {}
+        type_labels: Dict[str, str] = {}
+        by_location: Dict[str, Set[str]] = {}
+        locations: Dict[str, str] = {}
+        prices, durations, all_ids = [], [], set()
+
+        for tour in tours:
+            if tour.get("active") is not True:
+                continue
+            tour_id = tour["id"]
+            all_ids.add(tour_id)
+            type_key = tour_type_key(tour.get("tour_type"))
+            if type_key:
+                type_labels.setdefault(type_key, tour["tour_type"].strip())
+                by_type.setdefault(type_key, set()).add(tour_id)
+            location = tour.get("location")
+            if isinstance(location, str) and location:
+                locations.setdefault(fold_text(location), location)
+                by_location.setdefault(fold_text(location), set()).add(tour_id)
+            price, duration = to_number(tour.get("price")), to_number(tour.get("duration_hours"))
+            if price is not None:
+                prices.append((price, tour_id))
+            if duration is not None:
+                durations.append((duration, tour_id))
+
+        (self._all, self._by_type, self._type_labels, self._by_location, self._locations,
+         self._price, self._duration) = (frozenset(all_ids), by_type, type_labels, by_location, locations,
+                                         NumericFacet(prices), NumericFacet(durations))
+        self.rebuilds += 1
+
+    def on_catalog_change(self, catalog, changed_ids):
+        tours = [catalog.peek(doc_id) for doc_id in catalog.ids()]
+        self.rebuild(tour for tour in tours if tour)
+
+    # ------------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------------
+    def _type_ids(self, tour_types: Optional[List[str]]) -> Optional[Set[str]]:
+        if not tour_types:
+            return None
+        return set().union(*(self._by_type.get(tour_type_key(tour_type), set()) for tour_type in tour_types))
+
+    def _location_ids(self, location: Optional[str]) -> Optional[Set[str]]:
+        if not location:
+            return None
+        # Como o filtro antigo: a localização pedida pode ser só parte ("sintra")
+        wanted = fold_text(location)
+        return set().union(*(ids for key, ids in self._by_location.items() if wanted in key))
+
+    def search(self, tour_types: Optional[List[str]] = None, location: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               min_duration: Optional[float] = None, max_duration: Optional[float] = None) -> Dict[str, Any]:
+        """Ids dos tours que passam em todos os filtros e as contagens de cada faceta"""
+        filters = {
+            "tour_type": self._type_ids(tour_types),
+            "location": self._location_ids(location),
+            "price": self._price.range_ids(min_price, max_price)
+            if min_price is not None or max_price is not None else None,
+            "duration_hours": self._duration.range_ids(min_duration, max_duration)
+            if min_duration is not None or max_duration is not None else None,
+        }
+
+        def matching(excluded: Optional[str] = None) -> Set[str]:
+            ids = set(self._all)
+            for name, allowed in filters.items():
+                if name != excluded and allowed is not None:
+                    ids &= allowed
+            return ids
+
+        type_base = matching("tour_type")
+        location_base = matching("location")
+        price_base = matching("price")
+        duration_base = matching("duration_hours")
+
+        return {
+            "ids": matching(),
+            "facets": {
+                "tour_type": sorted(
+                    ({"key": key, "count": len(ids & type_base)} for key, ids in self._by_type.items()),
+                    key=lambda facet: (-facet["count"], facet["key"]),
+                ),
+                "location": sorted(
+                    ({"value": self._locations[key], "count": len(ids & location_base)}
+                     for key, ids in self._by_location.items()),
+                    key=lambda facet: (-facet["count"], facet["value"]),
+                ),
+                "price": self._numeric_facet(self._price, PRICE_BUCKETS, price_base),
+                "duration_hours": self._numeric_facet(self._duration, DURATION_BUCKETS, duration_base),
+            },
+        }
+
+    @staticmethod
+    def _numeric_facet(facet: NumericFacet, buckets, candidates: Set[str]) -> Dict[str, Any]:
+        low, high = facet.bounds(candidates)
+        return {
+            "min": low,
+            "max": high,
+            "buckets": [
+                {"min": start, "max": end,
+                 "count": len(facet.range_ids(start, end, include_high=False) & candidates)}
+                for start, end in buckets
+            ],
+        }
+
+    def type_counts(self) -> Dict[str, int]:
+        """Número de tours ativos por tour_type (para a lista de filtros)"""
+        return {tour_type: len(ids) for tour_type, ids in self._by_type.items()}
+
+    def type_label(self, key: str) -> str:
+        """tour_type como está nos tours (com acentos) para uma chave normalizada"""
+        return self._type_labels.get(key, key.replace("_", " ").capitalize())
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self._all), "tour_types": len(self._by_type),
+                "locations": len(self._by_location), "rebuilds": self.rebuilds}
+
+
+def build_facet_index(tours: Iterable[Dict[str, Any]]) -> TourFacetIndex:
+    """Índice temporário a partir de uma lista de tours (quando o catálogo não está em cache)"""
+    index = TourFacetIndex()
+    index.rebuild(tours)
+    return index
+
+
+# Instância global, ligada ao catálogo em cache
+tour_facets = TourFacetIndex()
+tour_catalog.add_listener(tour_facets.on_catalog_change)
@@ -0,0 +1,145 @@
+# backend/services/tour_search.py
+# Índice invertido em memória para pesquisa de texto nos tours.
+# Indexa name, short_description, description (pt/en/es) e location, sem
+# acentos nem maiúsculas, e é atualizado incrementalmente pelo listener do
+# catálogo: uma alteração num tour só reindexa esse tour.
+
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.tour_catalog import tour_catalog
+from utils.text import tokenize
+
+# Peso de cada campo na pontuação (um termo no nome vale mais que na descrição)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "location": 2.0,
+    "short_description": 1.5,
+    "description": 1.0,
+}
+
+# Palavras demasiado comuns em pt/en/es para distinguirem tours
+STOPWORDS = frozenset({
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "um", "uma", "com", "por", "para", "ao", "the", "of", "and", "in", "to", "an", "on", "with",
+    "for", "el", "la", "los", "las", "del", "y", "en", "con", "un", "una",
+})
+
+MAX_SEARCH_RESULTS = 50
+
+
+def _field_text(value: Any) -> Iterable[str]:
+    """Textos de um campo, seja string simples ou dict multilingue {pt, en, es}"""
+    if isinstance(value, dict):
+        return [text for text in value.values() if isinstance(text, str)]
+    if isinstance(value, str):
+        return [value]
+    return []
+
+
+def index_terms(tour: Dict[str, Any]) -> Dict[str, float]:
+    """Termos de um tour e o respetivo peso (soma dos pesos dos campos onde aparecem)"""
+    weights: Dict[str, float] = defaultdict(float)
+    for field, weight in FIELD_WEIGHTS.items():
+        terms = {
+            term
+            for text in _field_text(tour.get(field))
+            for term in tokenize(text)
+            if term not in STOPWORDS
+        }
+        for term in terms:
+            weights[term] += weight
+    return weights
+
+
+def query_terms(query: str) -> List[str]:
+    terms = [term for term in tokenize(query) if term not in STOPWORDS]
+    # Se a pesquisa só tiver stopwords, usá-las em vez de não devolver nada
+    return list(dict.fromkeys(terms or tokenize(query)))
+
+
+class TourSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._active: Dict[str, bool] = {}
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def index_tour(self, tour_id: str, tour: Optional[Dict[str, Any]]):
+        """(Re)indexar um tour; tour=None remove-o do índice"""
+        with self._lock:
+            for term in self._doc_terms.pop(tour_id, ()):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(tour_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._active.pop(tour_id, None)
+
+            if tour is None:
+                return
+
+            terms = index_terms(tour)
+            for term, weight in terms.items():
+                self._postings.setdefault(term, {})[tour_id] = weight
+            self._doc_terms[tour_id] = set(terms)
+            self._active[tour_id] = tour.get("active") is True
+
+    def on_catalog_change(self, catalog, changed_ids: Set[str]):
+        """Listener do catálogo: reindexar apenas os tours alterados"""
+        for tour_id in changed_ids:
+            self.index_tour(tour_id, catalog.peek(tour_id))
+        self.rebuilds += 1
+
+    def search(self, query: str, active_only: bool = True,
+               limit: int = MAX_SEARCH_RESULTS) -> List[Tuple[str, float]]:
+        """[(tour_id, pontuação)] dos tours que contêm todos os termos, por relevância"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            total = max(len(self._doc_terms), 1)
+            postings = [self._postings.get(term) for term in terms]
+            if any(not posting for posting in postings):
+                return []
+
+            # Interseção a partir da lista mais curta
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            if active_only:
+                candidates = {tour_id for tour_id in candidates if self._active.get(tour_id)}
+
+            scores = {}
+            for tour_id in candidates:
+                scores[tour_id] = sum(
+                    posting[tour_id] * math.log(1 + total / len(posting))
+                    for posting in postings
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self._doc_terms), "terms": len(self._postings), "rebuilds": self.rebuilds}
+
+
+def build_index(tours: Iterable[Dict[str, Any]]) -> TourSearchIndex:
+    """Índice temporário a partir de uma lista de tours (quando o catálogo não está em cache)"""
+    index = TourSearchIndex()
+    for tour in tours:
+        index.index_tour(tour["id"], tour)
+    return index
+
+
+# Instância global, ligada ao catálogo em cache
+tour_search = TourSearchIndex()
+tour_catalog.add_listener(tour_search.on_catalog_change)
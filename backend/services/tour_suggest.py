@@ -0,0 +1,119 @@
+# backend/services/tour_suggest.py
+# Sugestões por prefixo (autocomplete) para nomes de tours e localizações.
+# Cada nome/localização entra num array ordenado uma vez por palavra
+# ("sintra magica", "magica"), e um prefixo resolve-se com bisect no array.
+# O array é reconstruído quando o catálogo muda e trocado de uma só vez,
+# por isso as leituras não precisam de lock.
+
+import bisect
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.tour_catalog import tour_catalog
+from utils.text import tokenize
+from utils.tour_projection import localize
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+# Limite de entradas percorridas por prefixo (prefixos de 1 letra casam com muitas)
+MAX_SCAN = 500
+
+
+class SuggestEntry(NamedTuple):
+    key: str            # texto normalizado a partir de uma palavra
+    word_position: int  # 0 quando o prefixo casa com o início do texto
+    kind: str           # "tour" ou "location"
+    value: str          # tour_id (tour) ou localização original (location)
+
+
+def _entries_for(tour: Dict[str, Any]) -> Iterable[SuggestEntry]:
+    names = tour.get("name")
+    texts = names.values() if isinstance(names, dict) else [names]
+    for text in {text for text in texts if isinstance(text, str) and text}:
+        yield from _word_entries(text, "tour", tour["id"])
+
+    location = tour.get("location")
+    if isinstance(location, str) and location:
+        yield from _word_entries(location, "location", location)
+
+
+def _word_entries(text: str, kind: str, value: str) -> Iterable[SuggestEntry]:
+    words = tokenize(text)
+    for position in range(len(words)):
+        yield SuggestEntry(" ".join(words[position:]), position, kind, value)
+
+
+class TourSuggestIndex:
+    def __init__(self):
+        self._keys: List[str] = []
+        self._entries: List[SuggestEntry] = []
+        self.rebuilds = 0
+
+    def rebuild(self, tours: Iterable[Dict[str, Any]]):
+        """Reconstruir o array ordenado a partir dos tours ativos"""
+        entries = sorted(
+            entry for tour in tours if tour.get("active") is True
+            for entry in _entries_for(tour)
+        )
+        # Troca atómica: um pedido concorrente vê o array antigo ou o novo
+        self._keys, self._entries = [entry.key for entry in entries], entries
+        self.rebuilds += 1
+
+    def on_catalog_change(self, catalog, changed_ids):
+        tours = [catalog.peek(doc_id) for doc_id in catalog.ids()]
+        self.rebuild(tour for tour in tours if tour)
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Tuple[str, str]]:
+        """[(kind, value)] cujo nome/localização tem uma palavra a começar pelo prefixo"""
+        prefix = " ".join(tokenize(query))
+        if not prefix:
+            return []
+
+        keys, entries = self._keys, self._entries
+        start = bisect.bisect_left(keys, prefix)
+        matches = []
+        for entry in entries[start:start + MAX_SCAN]:
+            if not entry.key.startswith(prefix):
+                break
+            matches.append(entry)
+
+        # Início do texto antes de palavras intermédias, tours antes de localizações
+        matches.sort(key=lambda entry: (entry.word_position, entry.kind != "tour", entry.key))
+        results: List[Tuple[str, str]] = []
+        seen = set()
+        for entry in matches:
+            if (entry.kind, entry.value) in seen:
+                continue
+            seen.add((entry.kind, entry.value))
+            results.append((entry.kind, entry.value))
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "rebuilds": self.rebuilds}
+
+
+def format_suggestions(matches: List[Tuple[str, str]], tours: Dict[str, Optional[Dict[str, Any]]],
+                       language: str) -> List[Dict[str, Any]]:
+    """Converter (kind, value) no formato da API, com o nome no idioma pedido"""
+    suggestions = []
+    for kind, value in matches:
+        if kind == "tour":
+            tour = tours.get(value)
+            if tour:
+                suggestions.append({"type": "tour", "text": localize(tour.get("name"), language), "tour_id": value})
+        else:
+            suggestions.append({"type": "location", "text": value})
+    return suggestions
+
+
+def build_suggest_index(tours: Iterable[Dict[str, Any]]) -> TourSuggestIndex:
+    """Índice temporário a partir de uma lista de tours (quando o catálogo não está em cache)"""
+    index = TourSuggestIndex()
+    index.rebuild(tours)
+    return index
+
+
+# Instância global, ligada ao catálogo em cache
+tour_suggest = TourSuggestIndex()
+tour_catalog.add_listener(tour_suggest.on_catalog_change)
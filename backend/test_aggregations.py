@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+📊 9 Rocks Tours - Teste das contagens agregadas
+
+Corre count_documents e o AggregationCache contra uma consulta falsa, local,
+que implementa query.count(alias).get() como o AsyncClient e conta quantos
+pedidos chegam ao "servidor". Não precisa de credenciais nem de rede:
+    python test_aggregations.py
+"""
+
+import asyncio
+
+from services.aggregations import AggregationCache, count_documents
+
+
+class FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeCountQuery:
+    """Consulta em memória: count() devolve o número de documentos, sem os transferir"""
+
+    def __init__(self, docs, delay: float = 0.0):
+        self.docs = docs
+        self.delay = delay
+        self.requests = 0
+        self.alias = None
+
+    def count(self, alias=None):
+        self.alias = alias
+        return self
+
+    async def get(self):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        return [[FakeAggregationResult(self.alias, len(self.docs))]]
+
+
+def check(label: str, condition: bool):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    assert condition, label
+
+
+async def main():
+    print("=" * 60)
+    print("📊 TESTE: contagens agregadas com cache curto")
+    print("=" * 60)
+
+    print("\n1) count_documents")
+    query = FakeCountQuery([{"id": i} for i in range(1250)])
+    check("conta todos os documentos", await count_documents(query) == 1250)
+    check("um só pedido de agregação", query.requests == 1)
+    check("coleção vazia conta 0", await count_documents(FakeCountQuery([])) == 0)
+
+    print("\n2) Cache: a segunda leitura não vai ao servidor")
+    cache = AggregationCache(ttl_seconds=60)
+    query = FakeCountQuery([{"id": i} for i in range(10)])
+    first = await cache.get(("seo", "bookings"), lambda: count_documents(query))
+    query.docs.append({"id": 10})
+    second = await cache.get(("seo", "bookings"), lambda: count_documents(query))
+    check("valor em cache reutilizado", first == second == 10 and query.requests == 1)
+    check("TTL por pedido: 0 segundos volta a contar",
+          await cache.get(("seo", "bookings"), lambda: count_documents(query), 0) == 11)
+    cache.invalidate(("seo", "bookings"))
+    check("invalidate esquece a chave", await cache.get(("seo", "bookings"), lambda: count_documents(query)) == 11
+          and query.requests == 3)
+
+    print("\n3) Pedidos simultâneos partilham um cálculo")
+    cache = AggregationCache(ttl_seconds=60)
+    query = FakeCountQuery([{"id": i} for i in range(5)], delay=0.05)
+    values = await asyncio.gather(*(cache.get(("seo", "active_tours"), lambda: count_documents(query))
+                                    for _ in range(50)))
+    check("todos recebem a mesma contagem", set(values) == {5})
+    check("um só pedido de agregação para 50 leituras", query.requests == 1)
+    check("estatísticas do cache", cache.stats()["misses"] == 1 and cache.stats()["hits"] == 49)
+
+    print("\n4) Erros não ficam em cache")
+    cache = AggregationCache(ttl_seconds=60)
+
+    async def failing():
+        raise RuntimeError("Firestore indisponível")
+
+    try:
+        await cache.get(("seo", "bookings"), failing)
+        failed = False
+    except RuntimeError:
+        failed = True
+    check("o erro chega a quem pediu", failed)
+    check("o pedido seguinte volta a calcular",
+          await cache.get(("seo", "bookings"), lambda: count_documents(FakeCountQuery([{}]))) == 1)
+
+    print("\n✅ Todos os testes passaram")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🗓️ 9 Rocks Tours - Teste do cache do Google Calendar
+
+Corre o CalendarBusyCache contra um serviço Calendar falso, local, que
+implementa events().list() com paginação, syncToken e o erro 410 de um
+token expirado. Não precisa de credenciais nem de rede:
+    python test_calendar_cache.py
+"""
+
+from datetime import date, timedelta
+
+from googleapiclient.errors import HttpError
+
+from services.calendar_cache import CalendarBusyCache
+
+
+class FakeResponse(dict):
+    """Resposta HTTP mínima para construir um HttpError"""
+
+    def __init__(self, status: int):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "Gone"
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self._result
+
+
+class FakeCalendarService:
+    """Calendário em memória: cada alteração incrementa a versão; o syncToken é a versão"""
+
+    PAGE_SIZE = 2
+
+    def __init__(self):
+        self.version = 0
+        self.stored = {}  # id -> (versão da última alteração, evento)
+        self.expired_tokens = set()
+        self.calls = []
+
+    # API de teste
+    def put(self, event_id, start, end, summary="Ocupado", **extra):
+        self.version += 1
+        self.stored[event_id] = (self.version, {"id": event_id, "status": "confirmed", "summary": summary,
+                                                "start": start, "end": end, **extra})
+
+    def cancel(self, event_id):
+        self.version += 1
+        self.stored[event_id] = (self.version, {"id": event_id, "status": "cancelled"})
+
+    # API do Google
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents, maxResults, syncToken=None, pageToken=None):
+        self.calls.append({"syncToken": syncToken, "pageToken": pageToken})
+        if syncToken in self.expired_tokens:
+            return FakeRequest(HttpError(FakeResponse(410), b"Sync token is no longer valid"))
+
+        since = int(syncToken) if syncToken else 0
+        changed = sorted((item for item in self.stored.values() if item[0] > since), key=lambda item: item[0])
+        # Numa sincronização completa os eventos cancelados não aparecem
+        items = [event for _, event in changed if syncToken or event["status"] != "cancelled"]
+
+        offset = int(pageToken or 0)
+        page = items[offset:offset + self.PAGE_SIZE]
+        result = {"items": page}
+        if offset + self.PAGE_SIZE < len(items):
+            result["nextPageToken"] = str(offset + self.PAGE_SIZE)
+        else:
+            result["nextSyncToken"] = str(self.version)
+        return FakeRequest(result)
+
+
+def day(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def timed(offset: int, hour: int) -> dict:
+    return {"dateTime": f"{day(offset)}T{hour:02d}:00:00Z"}
+
+
+def check(label: str, condition: bool):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    assert condition, label
+
+
+def main():
+    print("=" * 60)
+    print("🗓️ TESTE: cache do Google Calendar com syncToken")
+    print("=" * 60)
+
+    service = FakeCalendarService()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return service
+
+    service.put("reuniao", timed(3, 9), timed(3, 11), "Reunião")
+    service.put("ferias", {"date": day(5)}, {"date": day(7)}, "Férias")
+    service.put("livre", timed(4, 9), timed(4, 10), "Disponível", transparency="transparent")
+    service.put("antigo", {"date": day(-30)}, {"date": day(-29)}, "Antigo")
+
+    cache = CalendarBusyCache("fake@calendar", factory, refresh_seconds=3600, name="fake_calendar")
+
+    print("\n1) Sincronização completa (com paginação)")
+    check("sem sincronização ainda não está pronto", not cache.wait_ready(0.01))
+    check("sincronização completa concluída", cache.sync())
+    check("pronto depois da primeira sincronização", cache.wait_ready(0.01))
+    check("duas páginas pedidas", len(service.calls) == 2)
+    busy = cache.busy_by_day(day(0), day(10))
+    check("reunião no dia 3", [slot["summary"] for slot in busy.get(day(3), [])] == ["Reunião"])
+    check("férias nos dias 5 e 6 (fim exclusivo)", day(5) in busy and day(6) in busy and day(7) not in busy)
+    check("eventos transparentes ignorados", day(4) not in busy)
+    check("eventos passados não guardados", cache.stats()["events"] == 2)
+    check("evento de vários dias aparece uma vez em busy_slots",
+          [slot["summary"] for slot in cache.busy_slots(day(0), day(10))] == ["Reunião", "Férias"])
+
+    print("\n2) Sincronização incremental: só as alterações")
+    service.calls.clear()
+    service.put("reuniao", timed(3, 14), timed(3, 15), "Reunião (adiada)")
+    service.cancel("ferias")
+    service.put("visita", timed(8, 10), timed(8, 12), "Visita")
+    check("sincronização incremental concluída", cache.sync())
+    check("pedido com syncToken", service.calls[0]["syncToken"] is not None)
+    busy = cache.busy_by_day(day(0), day(10))
+    check("reunião movida", busy[day(3)][0]["start"].hour != 9 and busy[day(3)][0]["summary"] == "Reunião (adiada)")
+    check("férias canceladas removidas", day(5) not in busy and day(6) not in busy)
+    check("evento novo adicionado", day(8) in busy)
+    check("cliente da API criado uma só vez", len(builds) == 1)
+
+    print("\n3) syncToken expirado (410): nova sincronização completa")
+    service.expired_tokens.add(cache._sync_token)
+    service.put("tarde", timed(9, 15), timed(9, 16), "Tarde")
+    check("sincronização recuperada", cache.sync())
+    check("contadores", cache.full_syncs == 2 and cache.incremental_syncs == 1)
+    check("estado completo depois da recuperação",
+          sorted(cache.busy_by_day(day(0), day(10))) == sorted([day(3), day(8), day(9)]))
+
+    print("\n4) Leituras só em memória")
+    service.calls.clear()
+    for _ in range(1000):
+        cache.busy_slots(day(0), day(30))
+    check("nenhuma chamada à API durante as leituras", not service.calls)
+    cache.stop()
+
+    print("\n✅ Todos os testes passaram")
+
+
+if __name__ == "__main__":
+    main()
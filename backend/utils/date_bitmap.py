@@ -0,0 +1,143 @@
+# backend/utils/date_bitmap.py
+# Calendário compacto de datas ocupadas: um bitmap por ano, com um bit por
+# dia (bit n = dia n do ano, a contar de 0). Um ano ocupa 46 bytes em vez de
+# uma lista de strings "YYYY-MM-DD" que cresce sem limite.
+#
+# Os bits são LSB-first dentro de cada byte: o dia n está no byte n // 8,
+# bit n % 8. O mesmo formato é usado nas janelas devolvidas pela API.
+
+import base64
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+YEAR_BYTES = 46  # 366 dias arredondados para cima
+
+
+def parse_day(value) -> Optional[date]:
+    """'YYYY-MM-DD' (ou ISO com hora), date ou datetime -> date; None se inválido"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def parse_window(start: Optional[str], end: Optional[str], max_days: int,
+                 default_days: int = 30) -> Tuple[date, date]:
+    """Janela [start, end] de um pedido; hoje e start + default_days por omissão"""
+    first_day = parse_day(start) if start else date.today()
+    last_day = parse_day(end) if end else first_day and first_day + timedelta(days=default_days)
+    if first_day is None or last_day is None:
+        raise HTTPException(status_code=400, detail="Datas inválidas (use YYYY-MM-DD)")
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="O fim da janela tem de ser igual ou posterior ao início")
+    if (last_day - first_day).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"Janela máxima de {max_days} dias")
+    return first_day, last_day
+
+
+def day_of_year(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+class DateBitmap:
+    """Conjunto de dias guardado como um bytearray por ano"""
+
+    def __init__(self, years: Optional[Dict[int, bytes]] = None):
+        self._years: Dict[int, bytearray] = {year: bytearray(data) for year, data in (years or {}).items()}
+
+    @classmethod
+    def from_dates(cls, values: Iterable) -> "DateBitmap":
+        bitmap = cls()
+        for value in values or ():
+            day = parse_day(value)
+            if day is not None:
+                bitmap.add(day)
+        return bitmap
+
+    def _year(self, year: int, create: bool = False) -> Optional[bytearray]:
+        data = self._years.get(year)
+        if data is None and create:
+            data = self._years[year] = bytearray(YEAR_BYTES)
+        return data
+
+    def add(self, day: date):
+        offset = day_of_year(day)
+        self._year(day.year, create=True)[offset >> 3] |= 1 << (offset & 7)
+
+    def remove(self, day: date):
+        data = self._year(day.year)
+        if data is not None:
+            offset = day_of_year(day)
+            data[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+    def __contains__(self, value) -> bool:
+        """Pertença em O(1)"""
+        day = parse_day(value)
+        if day is None:
+            return False
+        data = self._years.get(day.year)
+        if data is None:
+            return False
+        offset = day_of_year(day)
+        return bool(data[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self) -> int:
+        return sum(bin(byte).count("1") for data in self._years.values() for byte in data)
+
+    # ------------------------------------------------------------------
+    # Janelas de datas
+    # ------------------------------------------------------------------
+    def window(self, start: date, end: date) -> bytearray:
+        """Bitmap dos dias [start, end], com o bit i a representar start + i"""
+        total = (end - start).days + 1
+        result = bytearray((total + 7) // 8)
+        position = 0
+        current = start
+        while current <= end:
+            # Copiar o ano de uma vez: bit a bit só dentro do intervalo desse ano
+            year_end = min(end, date(current.year, 12, 31))
+            data = self._years.get(current.year)
+            if data is not None and any(data):
+                offset = day_of_year(current)
+                for index in range((year_end - current).days + 1):
+                    bit = offset + index
+                    if data[bit >> 3] & (1 << (bit & 7)):
+                        target = position + index
+                        result[target >> 3] |= 1 << (target & 7)
+            position += (year_end - current).days + 1
+            current = year_end + timedelta(days=1)
+        return result
+
+    def days_in_range(self, start: date, end: date, occupied: bool = True) -> List[date]:
+        """Dias ocupados (ou livres, com occupied=False) em [start, end]"""
+        window = self.window(start, end)
+        total = (end - start).days + 1
+        return [
+            start + timedelta(days=index)
+            for index in range(total)
+            if bool(window[index >> 3] & (1 << (index & 7))) == occupied
+        ]
+
+    def run_lengths(self, start: date, end: date) -> List[Tuple[bool, int]]:
+        """Codificação run-length da janela: [(ocupado, número de dias), ...]"""
+        window = self.window(start, end)
+        runs: List[Tuple[bool, int]] = []
+        for index in range((end - start).days + 1):
+            state = bool(window[index >> 3] & (1 << (index & 7)))
+            if runs and runs[-1][0] == state:
+                runs[-1] = (state, runs[-1][1] + 1)
+            else:
+                runs.append((state, 1))
+        return runs
+
+
+def encode_bitmap(data: bytes) -> str:
+    return base64.b64encode(bytes(data)).decode("ascii")
@@ -0,0 +1,84 @@
+# backend/utils/http_cache.py
+# GET condicional (ETag / If-None-Match / Last-Modified) e políticas de
+# Cache-Control por rota. O 304 é decidido antes de qualquer serialização.
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+# Políticas de Cache-Control por rota (o CDN à frente do Cloud Run respeita s-maxage)
+CACHE_POLICIES: Dict[str, str] = {
+    "tours": "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+    "tour_detail": "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+    "hero_images": "public, max-age=300, s-maxage=900, stale-while-revalidate=3600",
+    # Os filtros trazem contagens de tours, que mudam com o catálogo
+    "tour_filters": "public, max-age=300, s-maxage=900, stale-while-revalidate=3600",
+    "home": "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+    # Datas ocupadas mudam com cada pagamento: o browser revalida sempre (304 barato)
+    "occupied_dates": "public, no-cache",
+}
+
+# Rotas cujo corpo depende do Accept-Language (projeção de idioma dos tours)
+VARY_ACCEPT_LANGUAGE = {"tours", "tour_detail", "home"}
+
+
+def make_etag(*parts) -> str:
+    """ETag forte a partir de versões/update_times e dos parâmetros do pedido"""
+    hasher = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, datetime):
+            part = part.isoformat()
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"|")
+    return f'"{hasher.hexdigest()[:32]}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match tem precedência; If-Modified-Since só é usado sem ele (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # A comparação para If-None-Match é fraca: ignora o prefixo W/ (CDNs com gzip)
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # A data HTTP tem resolução de segundos
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: str, policy: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    if policy in VARY_ACCEPT_LANGUAGE:
+        headers["Vary"] = "Accept-Language"
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def conditional_response(request: Request, response: Response, etag: str, policy: str,
+                         last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Devolve um 304 pronto se o cliente já tem esta versão; senão aplica os cabeçalhos à resposta"""
+    headers = cache_headers(etag, policy, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,53 @@
+# backend/utils/pagination.py
+# Paginação por cursor opaco para os endpoints de listagem.
+# O cursor é o JSON com os valores de ordenação do último item devolvido,
+# codificado em base64 url-safe para o cliente o tratar como opaco.
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Codificar os valores de ordenação do último item num cursor opaco"""
+    payload = {
+        key: {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Descodificar um cursor; 400 se tiver sido adulterado ou truncado"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, dict):
+            raise ValueError("cursor não é um objeto")
+        return {
+            key: datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+            for key, value in payload.items()
+        }
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Cursor inválido: {e}")
+
+
+def paginate_in_memory(items: List[Dict[str, Any]], sort_key: Callable[[Dict[str, Any]], Tuple],
+                       cursor_fields: Callable[[Dict[str, Any]], Dict[str, Any]],
+                       limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Paginar uma lista já em memória (ex.: catálogo em cache) com o mesmo contrato do Firestore"""
+    ordered = sorted(items, key=sort_key)
+    if cursor:
+        after = sort_key(decode_cursor(cursor))
+        ordered = [item for item in ordered if sort_key(item) > after]
+
+    page = ordered[:limit]
+    next_cursor = encode_cursor(cursor_fields(page[-1])) if len(ordered) > limit else None
+    return {"items": page, "next_cursor": next_cursor}
@@ -0,0 +1,118 @@
+# backend/utils/slot_availability.py
+# Motor de disponibilidade por horários. Os intervalos ocupados do calendário
+# são ordenados e fundidos uma só vez; os horários dos tours (vários por dia
+# da semana) são percorridos por ordem cronológica num único varrimento,
+# sem strptime por dia nem comparações com todos os eventos de cada dia.
+#
+# Os instantes são minutos inteiros desde 0001-01-01 (toordinal() * 1440 +
+# minutos do dia), por isso todas as comparações são entre inteiros.
+
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 1440
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# {dia da semana 0-6: [(início, fim, 'HH:MM', 'HH:MM')]} com minutos desde a meia-noite
+WeeklySlots = Dict[int, List[Tuple[int, int, str, str]]]
+
+
+def to_minutes(moment: datetime) -> int:
+    return moment.toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def parse_clock(value: Any) -> Optional[int]:
+    """'HH:MM' -> minutos desde a meia-noite; None se inválido ('24:00' é o fim do dia)"""
+    try:
+        hours, minutes = str(value).split(':')[:2]
+        total = int(hours) * 60 + int(minutes)
+    except (TypeError, ValueError):
+        return None
+    return total if 0 <= total <= MINUTES_PER_DAY else None
+
+
+class BusyIntervals:
+    """Intervalos ocupados [início, fim) ordenados e fundidos (disjuntos)"""
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        merged: List[List[int]] = []
+        for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[Dict[str, Any]]) -> "BusyIntervals":
+        """A partir de horários ocupados {'start': datetime, 'end': datetime}"""
+        return cls((to_minutes(slot['start']), to_minutes(slot['end'])) for slot in slots)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """[start, end) interseta algum intervalo ocupado? O(log n)"""
+        index = bisect_right(self.ends, start)  # primeiro intervalo que acaba depois de start
+        return index < len(self.starts) and self.starts[index] < end
+
+
+def normalize_schedule(schedule: Dict[str, Any]) -> WeeklySlots:
+    """Horário semanal de um tour -> WeeklySlots, ordenado por início.
+
+    Cada dia aceita o formato antigo {'active', 'start', 'end'} ou vários
+    horários: {'active', 'slots': [{'start', 'end'}, ...]}.
+    """
+    weekly: WeeklySlots = {}
+    for weekday, name in enumerate(WEEKDAYS):
+        day = (schedule or {}).get(name) or {}
+        if not day.get('active', False):
+            continue
+        slots = []
+        for slot in day.get('slots') or [day]:
+            start, end = parse_clock(slot.get('start')), parse_clock(slot.get('end'))
+            if start is not None and end is not None and end > start:
+                slots.append((start, end, slot['start'][:5], slot['end'][:5]))
+        if slots:
+            weekly[weekday] = sorted(slots)
+    return weekly
+
+
+def available_slots(weekly: WeeklySlots, busy: BusyIntervals, start: date, end: date) -> List[Dict[str, str]]:
+    """Horários livres de um tour em [start, end]: [{'date', 'start_time', 'end_time'}].
+
+    Varrimento único: os horários são gerados por ordem cronológica e o cursor
+    sobre os intervalos ocupados só avança, por isso o custo é O(horários + eventos).
+    """
+    results: List[Dict[str, str]] = []
+    if not weekly:
+        return results
+
+    starts, ends, total = busy.starts, busy.ends, len(busy.starts)
+    first_ordinal, first_weekday = start.toordinal(), start.weekday()
+    cursor = bisect_right(ends, first_ordinal * MINUTES_PER_DAY)
+    for offset in range((end - start).days + 1):
+        slots = weekly.get((first_weekday + offset) % 7)
+        if not slots:
+            continue
+        base = (first_ordinal + offset) * MINUTES_PER_DAY
+        date_str = None
+        for slot_start, slot_end, start_label, end_label in slots:
+            slot_start += base
+            while cursor < total and ends[cursor] <= slot_start:
+                cursor += 1
+            if cursor < total and starts[cursor] < base + slot_end:
+                continue
+            if date_str is None:
+                date_str = date.fromordinal(first_ordinal + offset).isoformat()
+            results.append({'date': date_str, 'start_time': start_label, 'end_time': end_label})
+    return results
+
+
+def available_slots_for_tours(schedules: Dict[str, Dict[str, Any]], busy: BusyIntervals,
+                              start: date, end: date) -> Dict[str, List[Dict[str, str]]]:
+    """{tour_id: horários livres} para vários tours sobre os mesmos intervalos ocupados"""
+    return {tour_id: available_slots(normalize_schedule(schedule), busy, start, end)
+            for tour_id, schedule in schedules.items()}
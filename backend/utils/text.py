@@ -0,0 +1,22 @@
+# backend/utils/text.py
+# Normalização de texto para pesquisa: sem acentos e sem maiúsculas, para que
+# "Évora", "evora" e "ÉVORA" sejam o mesmo termo.
+
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold_text(text: str) -> str:
+    """Remover diacríticos e normalizar maiúsculas ("São Pedro" -> "sao pedro")"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos alfanuméricos do texto já normalizado"""
+    return _TOKEN_RE.findall(fold_text(text))
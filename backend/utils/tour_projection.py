@@ -0,0 +1,95 @@
+# backend/utils/tour_projection.py
+# Projeção de idioma e de campos nas respostas de tours.
+# Os documentos têm name/short_description/description em pt/en/es, além de
+# map_locations, available_dates e occupied_dates; a listagem só precisa de
+# um idioma e de meia dúzia de campos.
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+SUPPORTED_LANGUAGES = ["pt", "en", "es"]
+DEFAULT_LANGUAGE = "pt"
+
+MULTILINGUAL_FIELDS = ("name", "short_description", "description")
+
+# Forma compacta para cartões de listagem (mobile)
+CARD_FIELDS = ("id", "name", "short_description", "price", "duration_hours",
+               "location", "tour_type", "featured", "image")
+
+
+def parse_accept_language(header: Optional[str]) -> Optional[str]:
+    """Primeiro idioma suportado do Accept-Language, respeitando os pesos q="""
+    if not header:
+        return None
+
+    candidates = []
+    for position, part in enumerate(header.split(",")):
+        pieces = part.strip().split(";")
+        tag = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if tag and quality > 0:
+            candidates.append((-quality, position, tag.split("-")[0]))
+
+    for _, _, language in sorted(candidates):
+        if language in SUPPORTED_LANGUAGES:
+            return language
+    return None
+
+
+def resolve_language(lang: Optional[str], accept_language: Optional[str]) -> str:
+    """Idioma pedido: parâmetro lang, depois Accept-Language, depois pt"""
+    if lang:
+        lang = lang.lower()
+        if lang not in SUPPORTED_LANGUAGES:
+            raise HTTPException(status_code=400, detail="Idioma não suportado")
+        return lang
+    return parse_accept_language(accept_language) or DEFAULT_LANGUAGE
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def localize(value: Any, language: str) -> Any:
+    """Reduzir um dict {pt, en, es} ao idioma pedido (com fallback para pt)"""
+    if not isinstance(value, dict):
+        return value
+    return value.get(language) or value.get(DEFAULT_LANGUAGE) or next((v for v in value.values() if v), "")
+
+
+def project_tour(tour: Dict[str, Any], language: str, fields: Optional[Iterable[str]] = None,
+                 shape: Optional[str] = None) -> Dict[str, Any]:
+    """Achatar os campos multilingues e manter apenas os campos pedidos"""
+    if shape == "card":
+        images = tour.get("images") or []
+        source = dict(tour, image=images[0] if images else None)
+        wanted = list(CARD_FIELDS)
+    else:
+        source = tour
+        wanted = list(fields) if fields else list(tour.keys())
+
+    if "id" not in wanted:
+        wanted.insert(0, "id")
+
+    projected = {}
+    for field in wanted:
+        if field not in source:
+            continue
+        value = source[field]
+        projected[field] = localize(value, language) if field in MULTILINGUAL_FIELDS else value
+    return projected
+
+
+def wants_projection(lang: Optional[str], fields: Optional[str], shape: Optional[str]) -> bool:
+    """Sem lang/fields/shape a resposta mantém o formato multilingue completo"""
+    return bool(lang or fields or shape)